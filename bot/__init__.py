@@ -8,9 +8,26 @@ import topgg
 from discord.ext import commands, pages
 from discord.ext.prettyhelp import PrettyHelp
 
-from bot import db
-from bot.db import models
+from bot import cache, db, invalidation, metrics, welcome_card
+from bot.enums import MessageStage
 from bot.errors import DBLVoteRequired
+from bot.event_loop import (
+    FAST_EVENT_LOOP,
+    LOOP_LAG_INTERVAL,
+    LOOP_LAG_THRESHOLD,
+    LoopLagMonitor,
+    new_event_loop,
+)
+from bot.pipeline import MessageContext, MessagePipeline
+from bot.scheduler import SCHEDULER_HORIZON, Scheduler
+from bot.shards import (
+    CLUSTER_ID,
+    CLUSTERED,
+    SHARD_COUNT,
+    SHARD_IDS,
+    ShardStats,
+    report_stats,
+)
 
 THEME = discord.Color.purple()
 
@@ -21,23 +38,128 @@ TESTING_GUILDS = (
 )
 HELP_EMBEDS: list[discord.Embed] = []
 
+# The bot and its clients bind to the current loop when they're created
+asyncio.set_event_loop(new_event_loop(FAST_EVENT_LOOP))
+
 intents = discord.Intents.default()
 intents.members = True
 intents.reactions = True
 intents.message_content = True
 
 
-class MyBot(commands.Bot):
+class MyBot(commands.AutoShardedBot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # A cluster only knows its own guilds, so the supervisor posts the
+        # total instead
         self.topgg_client = topgg.DBLClient(
-            bot=self, token=os.environ["DBL_TOKEN"], autopost=True
+            bot=self, token=os.environ["DBL_TOKEN"], autopost=not CLUSTERED
+        )
+        self.scheduler = Scheduler(SCHEDULER_HORIZON)
+        self.message_pipeline = MessagePipeline()
+        self.shard_stats = ShardStats()
+        self.cluster_id = CLUSTER_ID
+        # Shared with the cluster launcher, which sets it to the guild count
+        # of every cluster
+        self.total_guilds = None
+        self.loop_lag = LoopLagMonitor(LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD)
+        self.metrics_server = (
+            metrics.MetricsServer(
+                metrics.METRICS_HOST, metrics.METRICS_PORT + self.cluster_id
+            )
+            if metrics.METRICS_PORT
+            else None
         )
+        metrics.register_bot_gauges(self)
+
+        # Workers are forked before any thread starts, e.g. the loop lag
+        # monitor's, and kept across reloads of the welcome cog
+        welcome_card.renderer.start()
+
+    async def start(self, *args, **kwargs):
+        # Jobs that became due while the bot was down are run once it's
+        # ready, since their handlers look up guilds and members
+        self.scheduler.start(self.wait_until_ready)
+        invalidation.bus.start()
+        self.loop_lag.start()
+
+        if self.metrics_server:
+            await self.metrics_server.start()
+
+        await super().start(*args, **kwargs)
+
+    async def close(self):
+        await super().close()
+        welcome_card.renderer.close()
+
+        if self.metrics_server:
+            await self.metrics_server.stop()
+
+    async def _run_event(self, coro, event_name: str, *args, **kwargs):
+        # Every listener and on_ event handler is run by this, which is the
+        # library's implementation with the handler tracked
+        try:
+            with metrics.track("listener", coro.__qualname__):
+                await coro(*args, **kwargs)
+        except asyncio.CancelledError:
+            pass
+        except Exception:
+            try:
+                await self.on_error(event_name, *args, **kwargs)
+            except asyncio.CancelledError:
+                pass
+
+    async def invoke(self, ctx: commands.Context):
+        if ctx.command is None:
+            await super().invoke(ctx)
+            return
+
+        name = ctx.command.qualified_name
+
+        with metrics.track("command", name):
+            await super().invoke(ctx)
+
+        # Command errors are handled by the library instead of raised
+        if ctx.command_failed:
+            metrics.handler_errors.inc(("command", name))
+
+    async def invoke_application_command(
+        self, ctx: discord.ApplicationContext
+    ):
+        name = ctx.command.qualified_name
+
+        with metrics.track("application_command", name):
+            await super().invoke_application_command(ctx)
+
+        if getattr(ctx, "command_failed", False):
+            metrics.handler_errors.inc(("application_command", name))
+
+    def guild_count(self) -> int:
+        """
+        Number of guilds the bot is in, across all clusters once each of
+        them reported its stats to the launcher.
+        """
+
+        if self.total_guilds is not None and self.total_guilds.value:
+            return self.total_guilds.value
+
+        return len(self.guilds)
 
     async def on_ready(self):
         guild_count = len(self.guilds)
         print(f"Bot logged into {guild_count} guilds...")
 
+        # Create the rows of guilds that joined while the bot was offline
+        await db.ensure_guilds(guild.id for guild in self.guilds)
+
+    async def on_shard_connect(self, shard_id: int):
+        print(f"Shard {shard_id} connected")
+        self.shard_stats.watch(self.get_shard(shard_id))
+
+    async def on_shard_resumed(self, shard_id: int):
+        print(f"Shard {shard_id} resumed")
+        self.shard_stats.watch(self.get_shard(shard_id))
+
 
 async def get_prefix(
     client: commands.Bot, message: discord.Message
@@ -45,19 +167,8 @@ async def get_prefix(
     if not message.guild:
         return commands.when_mentioned_or("s!")(client, message)
 
-    async with db.async_session() as session:
-        guild_data: models.Guild | None = await session.get(
-            models.Guild, message.guild.id
-        )
-
-        if guild_data:
-            prefix = guild_data.prefix
-        else:
-            new_guild_data = models.Guild(id=message.guild.id)
-            session.add(new_guild_data)
-            await session.commit()
-
-            prefix = new_guild_data.prefix
+    guild_data = await cache.guilds.get(message.guild.id)
+    prefix = guild_data.prefix
 
     return commands.when_mentioned_or(prefix)(client, message)
 
@@ -81,6 +192,8 @@ bot = MyBot(
     intents=intents,
     case_insensitive=True,
     help_command=help_cmd,
+    shard_count=SHARD_COUNT,
+    shard_ids=SHARD_IDS,
 )
 
 
@@ -206,31 +319,26 @@ async def on_application_command_error(
 
 @bot.event
 async def on_message(message: discord.Message):
+    await bot.message_pipeline.run(message)
+
+
+async def process_commands(ctx: MessageContext):
+    message = ctx.message
+
     if (
-        message.content == f"<@!{bot.user.id}>"
-        and message.author != bot.user
+        message.content in (f"<@{bot.user.id}>", f"<@!{bot.user.id}>")
         and not message.reference
-        and not message.author.bot
     ):
-        prefixes = get_prefix(bot, message)
-        prefixes.remove(f"{bot.user.mention} ")
-        prefixes.remove(f"<@!{bot.user.id}> ")
+        prefix = ctx.guild_config.prefix if ctx.guild_config else "s!"
+        await message.channel.send(
+            f"{message.author.mention}, my prefix in this server "
+            f"is `{prefix}`"
+        )
 
-        prefix_count = len(prefixes)
-        prefixes_string = ", ".join(prefixes)
+    await bot.process_commands(message)
 
-        if prefix_count == 1:
-            await message.channel.send(
-                f"{message.author.mention}, my prefix in this server "
-                f"is `{prefixes_string}`"
-            )
-        else:
-            await message.channel.send(
-                f"{message.author.mention}, my prefixes in this server "
-                f"are `{prefixes_string}`"
-            )
 
-    await bot.process_commands(message)
+bot.message_pipeline.add_stage(MessageStage.COMMANDS, process_commands)
 
 
 @bot.slash_command(guild_ids=TESTING_GUILDS)
@@ -343,7 +451,13 @@ def generate_help_embeds():
     print("Generated Help Embeds!")
 
 
-def main():
+def main(stats=None, total_guilds=None):
+    """
+    Run the bot. When started by the cluster launcher, `stats` is the queue
+    the launcher collects shard stats from, and `total_guilds` the shared
+    value it writes the guild count of all clusters to.
+    """
+
     loop = asyncio.get_event_loop()
     token = os.environ["TOKEN"]
 
@@ -351,10 +465,17 @@ def main():
         db.init_engine()
         add_cogs()
         generate_help_embeds()
+
+        if stats is not None:
+            loop.create_task(report_stats(bot, stats))
+
+        bot.total_guilds = total_guilds
+
         loop.run_until_complete(bot.start(token))
     except KeyboardInterrupt or SystemExit:
         pass
     finally:
         print("Exiting...")
         loop.run_until_complete(bot.close())
+        loop.run_until_complete(invalidation.bus.stop())
         loop.run_until_complete(db.close_db())
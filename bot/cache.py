@@ -0,0 +1,664 @@
+import abc
+import asyncio
+import os
+import re
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Generic, Hashable, Iterable, TypeVar
+
+import wavelink
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from bot import db, invalidation, lavalink
+from bot.db import models
+from bot.enums import AutoResponseMatch
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Mapping whose entries expire `ttl` seconds after they were set. When
+    `max_size` is given, the least recently used entries are evicted first.
+
+    Args:
+        ttl (float): Seconds after which an entry expires.
+        max_size (int, optional): Maximum number of entries. Defaults to None.
+    """
+
+    def __init__(self, ttl: float, max_size: int | None = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: K) -> tuple[float, V] | None:
+        item = self._data.get(key)
+
+        if item is None:
+            return None
+
+        if item[0] <= time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return item
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        item = self._lookup(key)
+        return default if item is None else item[1]
+
+    def set(self, key: K, value: V, ttl: float | None = None):
+        """
+        Set an entry, which expires after `ttl` seconds if given instead of
+        the cache's TTL.
+        """
+
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        if self.max_size is not None:
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+
+class ReadThroughCache(abc.ABC, Generic[K, V]):
+    """
+    Cache that loads missing entries with `_fetch`. Concurrent misses for the
+    same key share a single load, and a load that finishes after the key was
+    updated or invalidated is discarded instead of caching stale data.
+
+    When a `topic` is given, keys published to it on the invalidation bus by
+    other processes are invalidated.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int | None = None,
+        topic: str | None = None,
+        bus: invalidation.LocalBus | None = None,
+    ):
+        self._cache: TTLCache[K, V] = TTLCache(ttl, max_size)
+        self._loading: dict[K, asyncio.Task] = {}
+        self.topic = topic
+        self.bus = bus or invalidation.bus
+
+        if topic is not None:
+            self.bus.subscribe(topic, self._on_invalidated)
+
+    @abc.abstractmethod
+    async def _fetch(self, key: K) -> V:
+        pass
+
+    def _ttl(self, value: V) -> float | None:
+        # Seconds to cache a fetched value, None for the cache's TTL
+        return None
+
+    def _parse_key(self, key: str) -> K:
+        # Guild IDs, unless overridden
+        return int(key)
+
+    def _on_invalidated(self, key: str | None):
+        if key is None:
+            self.clear()
+        else:
+            self.invalidate(self._parse_key(key))
+
+    def _on_fetched(self, key: K, task: asyncio.Task):
+        if self._loading.get(key) is not task:
+            return
+
+        del self._loading[key]
+
+        if not task.cancelled() and task.exception() is None:
+            value = task.result()
+            self._cache.set(key, value, self._ttl(value))
+
+    async def get(self, key: K) -> V:
+        value = self._cache.get(key, _MISSING)
+
+        if value is not _MISSING:
+            return value
+
+        task = self._loading.get(key)
+
+        if task is None:
+            task = asyncio.create_task(self._fetch(key))
+            self._loading[key] = task
+            task.add_done_callback(lambda t: self._on_fetched(key, t))
+
+        return await asyncio.shield(task)
+
+    def put(self, key: K, value: V):
+        self._loading.pop(key, None)
+        self._cache.set(key, value)
+
+    def invalidate(self, key: K):
+        self._loading.pop(key, None)
+        self._cache.pop(key)
+
+    def clear(self):
+        self._loading.clear()
+        self._cache.clear()
+
+    async def publish(self, key: K):
+        """
+        Tell other processes that a key changed, after updating or
+        invalidating it here.
+        """
+
+        await self.bus.publish(self.topic, key)
+
+
+class GuildConfigCache(ReadThroughCache[int, models.Guild]):
+    """
+    Cache of `models.Guild` rows. Getting a guild creates its row if it
+    doesn't exist. Everything that writes to the `guilds` table must go
+    through `update`, so cached settings never go stale in any process.
+    """
+
+    async def _fetch(self, guild_id: int) -> models.Guild:
+        return await db.get_or_create_guild(guild_id)
+
+    async def update(self, guild_id: int, **fields) -> models.Guild:
+        """
+        Write the given columns of a guild's row and refresh the cache.
+        """
+
+        guild_data = await db.upsert_guild(guild_id, **fields)
+        self.put(guild_id, guild_data)
+        await self.publish(guild_id)
+        return guild_data
+
+
+class AutoResponseMatcher:
+    """
+    Matches message content against all the auto responses of a guild.
+    Exact activations are a dictionary lookup, while word and substring
+    activations are compiled into one regex so a single scan of the message
+    covers all of them.
+    """
+
+    def __init__(self, auto_responses: Iterable[models.AutoResponse]):
+        self.exact: dict[str, str] = {}
+        self.partial: dict[str, str] = {}
+        words: list[str] = []
+        substrings: list[str] = []
+
+        for ar in auto_responses:
+            mode = AutoResponseMatch[ar.match_mode.upper()]
+
+            if mode is AutoResponseMatch.EXACT:
+                self.exact[ar.activation] = ar.response
+                continue
+
+            self.partial[ar.activation] = ar.response
+
+            if mode is AutoResponseMatch.WORD:
+                words.append(ar.activation)
+            else:
+                substrings.append(ar.activation)
+
+        alternatives = []
+
+        if words:
+            alternatives.append(rf"(?<!\w)(?:{self._union(words)})(?!\w)")
+
+        if substrings:
+            alternatives.append(self._union(substrings))
+
+        self.pattern = (
+            re.compile("|".join(alternatives)) if alternatives else None
+        )
+
+    @staticmethod
+    def _union(phrases: list[str]) -> str:
+        # Longer phrases first, so that the longest activation wins when one
+        # activation is a prefix of another
+        phrases = sorted(phrases, key=len, reverse=True)
+        return "|".join(re.escape(phrase) for phrase in phrases)
+
+    def match(self, content: str) -> str | None:
+        """
+        Get the response for the given message content, if any.
+        """
+
+        if response := self.exact.get(content):
+            return response
+
+        if self.pattern and (m := self.pattern.search(content)):
+            return self.partial[m.group(0)]
+
+        return None
+
+
+class AutoResponseIndex(ReadThroughCache[int, AutoResponseMatcher | None]):
+    """
+    Auto response matchers of each guild, loaded lazily. Guilds without any
+    auto responses are cached as `None`, so messages in them only cost a
+    dictionary lookup. Must be invalidated and published whenever a guild's
+    auto responses change.
+    """
+
+    async def _fetch(self, guild_id: int) -> AutoResponseMatcher | None:
+        async with db.async_session() as session:
+            q = select(models.AutoResponse).where(
+                models.AutoResponse.guild_id == guild_id
+            )
+            auto_resps = (await session.scalars(q)).all()
+
+        return AutoResponseMatcher(auto_resps) if auto_resps else None
+
+
+class AutoModCache(ReadThroughCache[int, models.AutoMod | None]):
+    """
+    Auto mod settings of each guild, `None` for guilds that never set them
+    up. Must be updated and published whenever a guild's auto mod settings
+    are saved.
+    """
+
+    async def _fetch(self, guild_id: int) -> models.AutoMod | None:
+        async with db.async_session() as session:
+            return await session.get(models.AutoMod, guild_id)
+
+
+class AFKUsers:
+    """
+    IDs of all the users that are currently AFK, so messages that don't
+    mention an AFK user never have to touch the database. Must be kept in
+    sync by everything that sets or unsets an AFK status, which must also
+    publish the user's ID so other processes reload it.
+    """
+
+    topic = "afk"
+
+    def __init__(self, bus: invalidation.LocalBus | None = None):
+        self.user_ids: set[int] = set()
+        self.loaded = False
+        self.bus = bus or invalidation.bus
+        self.bus.subscribe(self.topic, self.refresh)
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.user_ids
+
+    async def _query(self, *where) -> set[int]:
+        async with db.async_session() as session:
+            q = select(models.AFK.user_id).where(*where)
+            return set((await session.scalars(q)).all())
+
+    async def load(self):
+        user_ids = await self._query()
+
+        # Merge rather than replace, so users who went AFK while loading are
+        # kept. A stale ID only costs one query that finds nothing.
+        self.user_ids.update(user_ids)
+        self.loaded = True
+
+    async def refresh(self, user_id: str | None):
+        """
+        Reload whether a user that another process changed is AFK, or every
+        AFK user when `user_id` is None.
+        """
+
+        if user_id is None:
+            self.user_ids = await self._query()
+            self.loaded = True
+        elif await self._query(models.AFK.user_id == int(user_id)):
+            self.user_ids.add(int(user_id))
+        else:
+            self.user_ids.discard(int(user_id))
+
+    async def publish(self, user_id: int):
+        await self.bus.publish(self.topic, user_id)
+
+    def add(self, user_id: int):
+        self.user_ids.add(user_id)
+
+    def discard(self, user_id: int):
+        self.user_ids.discard(user_id)
+
+    async def get_messages(self, user_ids: Iterable[int]) -> dict[int, str]:
+        """
+        Get the AFK messages of the given users that are AFK, in one query.
+        Until the set of AFK users is loaded, every given user is queried.
+        """
+
+        if self.loaded:
+            user_ids = [u for u in user_ids if u in self.user_ids]
+        else:
+            user_ids = list(user_ids)
+
+        if not user_ids:
+            return {}
+
+        async with db.async_session() as session:
+            q = select(models.AFK).where(models.AFK.user_id.in_(user_ids))
+            afks = await session.scalars(q)
+            return {afk.user_id: afk.message for afk in afks}
+
+
+class ReactionRoleIndex:
+    """
+    Role IDs of every reaction role, keyed by message ID and emoji, so
+    reactions on messages without reaction roles are ignored without any
+    I/O. Loaded once at startup and kept in sync by everything that adds or
+    removes reaction roles, which must also publish the reaction role's ID
+    so other processes reload it. Until it's loaded, reactions are looked up
+    in the database.
+    """
+
+    topic = "reaction_roles"
+
+    def __init__(self, bus: invalidation.LocalBus | None = None):
+        self._roles: dict[tuple[int, str], dict[str, int]] = {}
+        self._keys: dict[str, tuple[int, str]] = {}
+        self.loaded = False
+        self.bus = bus or invalidation.bus
+        self.bus.subscribe(self.topic, self.refresh)
+
+    async def _query(self, *where) -> list[models.ReactionRole]:
+        async with db.async_session() as session:
+            q = select(models.ReactionRole).where(*where)
+            return (await session.scalars(q)).all()
+
+    async def load(self, max_delay: float = 60, max_attempts: int = 10):
+        """
+        Load every reaction role, retrying with a doubling delay of up to
+        `max_delay` seconds while the database is unreachable. After
+        `max_attempts` failures, reactions keep being looked up in the
+        database.
+        """
+
+        delay = min(1.0, max_delay)
+
+        for attempt in range(1, max_attempts + 1):
+            try:
+                reaction_roles = await self._query()
+                break
+            except Exception as e:
+                if attempt == max_attempts:
+                    print(
+                        f"Failed to load reaction roles {attempt} times, "
+                        f"giving up: {e!r}"
+                    )
+                    return
+
+                print(
+                    f"Failed to load reaction roles (attempt {attempt}/"
+                    f"{max_attempts}), retrying in {delay:.0f}s: {e!r}"
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, max_delay)
+
+        for rr in reaction_roles:
+            self.add(rr)
+
+        self.loaded = True
+
+    async def refresh(self, rr_id: str | None):
+        """
+        Reload a reaction role that another process added or removed, or
+        all of them when `rr_id` is None.
+        """
+
+        if rr_id is None:
+            reaction_roles = await self._query()
+            self._roles.clear()
+            self._keys.clear()
+        else:
+            reaction_roles = await self._query(models.ReactionRole.id == rr_id)
+            self.remove(rr_id)
+
+        for rr in reaction_roles:
+            self.add(rr)
+
+        if rr_id is None:
+            self.loaded = True
+
+    async def publish(self, rr_id: str):
+        await self.bus.publish(self.topic, rr_id)
+
+    def add(self, rr: models.ReactionRole):
+        key = (rr.message_id, rr.emoji)
+        self._roles.setdefault(key, {})[rr.id] = rr.role_id
+        self._keys[rr.id] = key
+
+    def remove(self, rr_id: str):
+        if (key := self._keys.pop(rr_id, None)) is None:
+            return
+
+        roles = self._roles[key]
+        del roles[rr_id]
+
+        if not roles:
+            del self._roles[key]
+
+    async def get_role_ids(
+        self, guild_id: int, channel_id: int, message_id: int, emoji: str
+    ) -> list[int]:
+        """
+        Get the IDs of the roles given for reacting to a message with an
+        emoji. Until the index is loaded, they are queried directly, by
+        every column the reaction roles index starts with.
+        """
+
+        if not self.loaded:
+            reaction_roles = await self._query(
+                models.ReactionRole.guild_id == guild_id,
+                models.ReactionRole.channel_id == channel_id,
+                models.ReactionRole.message_id == message_id,
+                models.ReactionRole.emoji == emoji,
+            )
+            return [rr.role_id for rr in reaction_roles]
+
+        return list(self._roles.get((message_id, emoji), {}).values())
+
+
+class TrackCache(ReadThroughCache[str, wavelink.YouTubeTrack | None]):
+    """
+    Tracks found by searching Lavalink, keyed by YouTube URL or normalized
+    search query, so searching for a song again doesn't need a round trip
+    to Lavalink. Every track found by a search is cached under its URL as
+    well, which is what playlists store. When `persist` is set, tracks are
+    also stored in the `cached_tracks` table for `persist_ttl` seconds, so
+    they outlive restarts and are shared between processes. Expired rows
+    are deleted when storing a track, at most every `prune_interval`
+    seconds. Searches that found nothing are only cached in memory, for
+    `not_found_ttl` seconds, so a Lavalink hiccup doesn't make a song
+    unplayable for long.
+
+    Args:
+        ttl (float): Seconds to keep a track in memory.
+        max_size (int, optional): Maximum number of tracks in memory.
+            Defaults to None.
+        persist (bool, optional): Whether to store tracks in the database.
+            Defaults to False.
+        persist_ttl (float, optional): Seconds after which stored tracks
+            are searched for again. Defaults to 30 days.
+        prune_interval (float, optional): Minimum seconds between deletes
+            of expired tracks. Defaults to 1 hour.
+        not_found_ttl (float, optional): Seconds to remember that a search
+            found nothing. Defaults to 60.
+    """
+
+    YOUTUBE_URL = re.compile(
+        r"^(https?\:\/\/)?(www\.youtube\.com|youtu\.be)\/.+$"
+    )
+
+    def __init__(
+        self,
+        ttl: float,
+        max_size: int | None = None,
+        persist: bool = False,
+        persist_ttl: float = 30 * 24 * 60 * 60,
+        prune_interval: float = 60 * 60,
+        not_found_ttl: float = 60,
+    ):
+        super().__init__(ttl, max_size)
+        self.not_found_ttl = not_found_ttl
+        self.persist = persist
+        self.persist_ttl = persist_ttl
+        self.prune_interval = prune_interval
+        self._next_prune = 0.0
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        query = query.strip()
+
+        if cls.YOUTUBE_URL.match(query):
+            return query
+
+        return " ".join(query.lower().split())
+
+    async def search(self, query: str) -> wavelink.YouTubeTrack | None:
+        """
+        Find the track with the given YouTube URL, or the first result of
+        a search.
+        """
+
+        return await self.get(self.normalize(query))
+
+    def _ttl(self, track: wavelink.YouTubeTrack | None) -> float | None:
+        return self.not_found_ttl if track is None else None
+
+    async def _fetch(self, query: str) -> wavelink.YouTubeTrack | None:
+        track = await self._load(query) if self.persist else None
+
+        if track is None:
+            track = await self._search(query)
+
+            if track is not None and self.persist:
+                await self._store(query, track)
+
+        if track is not None and track.uri and track.uri != query:
+            self.put(track.uri, track)
+
+        return track
+
+    async def _search(self, query: str) -> wavelink.YouTubeTrack | None:
+        search_results = await lavalink.pool.search(
+            wavelink.YouTubeTrack, query
+        )
+
+        if self.YOUTUBE_URL.match(query):
+            return next((t for t in search_results if t.uri == query), None)
+
+        return search_results[0] if search_results else None
+
+    async def _load(self, query: str) -> wavelink.YouTubeTrack | None:
+        q = select(models.CachedTrack).where(
+            models.CachedTrack.query == query,
+            models.CachedTrack.cached_at > self._expiry(),
+        )
+
+        # Fall back to searching, the table is only an optimization
+        try:
+            async with db.async_session() as session:
+                row: models.CachedTrack | None = await session.scalar(q)
+        except Exception as e:
+            print(f"Failed to load cached track {query!r}: {e!r}")
+            return None
+
+        if row is None:
+            return None
+
+        return wavelink.YouTubeTrack(
+            row.track_id,
+            {
+                "title": row.title,
+                "author": row.author,
+                "length": row.length,
+                "identifier": row.identifier,
+                "uri": row.uri,
+                "isStream": row.is_stream,
+            },
+        )
+
+    def _expiry(self) -> Any:
+        return func.now() - timedelta(seconds=self.persist_ttl)
+
+    async def _store(self, query: str, track: wavelink.YouTubeTrack):
+        fields = {
+            "track_id": track.id,
+            "title": track.title,
+            "author": track.author,
+            "length": int(track.info.get("length", 0)),
+            "identifier": track.identifier,
+            "uri": track.uri,
+            "is_stream": bool(track.is_stream()),
+        }
+        queries = {query, track.uri} - {None}
+
+        q = insert(models.CachedTrack).values(
+            [{"query": key, **fields} for key in queries]
+        )
+        q = q.on_conflict_do_update(
+            index_elements=[models.CachedTrack.query],
+            set_={
+                **{column: q.excluded[column] for column in fields},
+                "cached_at": func.now(),
+            },
+        )
+
+        try:
+            async with db.async_session() as session:
+                await session.execute(q)
+
+                if (now := time.monotonic()) >= self._next_prune:
+                    self._next_prune = now + self.prune_interval
+                    await session.execute(
+                        delete(models.CachedTrack).where(
+                            models.CachedTrack.cached_at <= self._expiry()
+                        )
+                    )
+
+                await session.commit()
+        except Exception as e:
+            print(f"Failed to store cached track {query!r}: {e!r}")
+
+
+GUILD_CACHE_TTL = float(os.getenv("GUILD_CACHE_TTL", 600))
+GUILD_CACHE_SIZE = int(os.getenv("GUILD_CACHE_SIZE", 10_000))
+
+guilds = GuildConfigCache(GUILD_CACHE_TTL, GUILD_CACHE_SIZE, "guilds")
+auto_responses = AutoResponseIndex(
+    GUILD_CACHE_TTL, GUILD_CACHE_SIZE, "auto_responses"
+)
+automod = AutoModCache(GUILD_CACHE_TTL, GUILD_CACHE_SIZE, "automod")
+afk = AFKUsers()
+reaction_roles = ReactionRoleIndex()
+
+TRACK_CACHE_TTL = float(os.getenv("TRACK_CACHE_TTL", 3600))
+TRACK_CACHE_SIZE = int(os.getenv("TRACK_CACHE_SIZE", 10_000))
+TRACK_CACHE_NOT_FOUND_TTL = float(os.getenv("TRACK_CACHE_NOT_FOUND_TTL", 60))
+TRACK_CACHE_PERSIST = (
+    os.getenv("TRACK_CACHE_PERSIST", "true").lower() == "true"
+)
+
+tracks = TrackCache(
+    TRACK_CACHE_TTL,
+    TRACK_CACHE_SIZE,
+    TRACK_CACHE_PERSIST,
+    not_found_ttl=TRACK_CACHE_NOT_FOUND_TTL,
+)
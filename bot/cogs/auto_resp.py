@@ -2,9 +2,10 @@ import asyncio
 import discord
 from uuid import uuid4
 from discord.ext import commands
+from sqlalchemy import delete
 from sqlalchemy.future import select
 
-from bot import MyBot, db
+from bot import MyBot, cache, db
 from bot.db import models
 from bot.utils import dbl_vote_required
 
@@ -32,7 +33,7 @@ class AutoResponse(commands.Cog):
         activation = options_split[0].strip()
         response = options_split[1].strip()
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = (
                 select(models.AutoResponse)
                 .where(models.AutoResponse.guild_id == ctx.guild.id)
@@ -81,6 +82,9 @@ class AutoResponse(commands.Cog):
 
             await session.commit()
 
+        cache.auto_responses.invalidate(ctx.guild.id)
+        await cache.auto_responses.publish(ctx.guild.id)
+
         await ctx.send(
             f"New auto response added with\n\nActivation Phrase:```{activation}```\nResponse:```{response}```"
         )
@@ -95,7 +99,7 @@ class AutoResponse(commands.Cog):
         self, ctx: commands.Context, id: str = None
     ):
         if id:
-            async with db.async_session() as session:
+            async with db.scoped_session() as session:
                 auto_resp: models.AutoResponse | None = await session.get(
                     models.AutoResponse, id
                 )
@@ -109,6 +113,9 @@ class AutoResponse(commands.Cog):
                 await session.delete(auto_resp)
                 await session.commit()
 
+                cache.auto_responses.invalidate(auto_resp.guild_id)
+                await cache.auto_responses.publish(auto_resp.guild_id)
+
                 await ctx.send(
                     f"Auto response with\nactivation: `{auto_resp.activation}`\nresponse: `{auto_resp.response}`\nhas been removed"
                 )
@@ -131,17 +138,19 @@ class AutoResponse(commands.Cog):
                 )
 
                 if confirmation.content.lower() == "yes":
-                    async with db.async_session() as session:
-                        q = select(models.AutoResponse).where(
+                    async with db.scoped_session() as session:
+                        q = delete(models.AutoResponse).where(
                             models.AutoResponse.guild_id == ctx.guild.id
                         )
-                        results = await session.execute(q)
-                        tasks = [session.delete(r) for r in results.scalars()]
-                        await asyncio.gather(*tasks)
+                        result = await session.execute(q)
                         await session.commit()
 
+                    cache.auto_responses.invalidate(ctx.guild.id)
+                    await cache.auto_responses.publish(ctx.guild.id)
+
                     await ctx.send(
-                        "All auto responses in this server have been deleted"
+                        f"All {result.rowcount} auto responses in this "
+                        "server have been deleted"
                     )
                 else:
                     await ctx.send("Aborting!")
@@ -155,7 +164,7 @@ class AutoResponse(commands.Cog):
         help="See all the auto responses in your server",
     )
     async def view_auto_responses(self, ctx: commands.Context):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.AutoResponse).where(
                 models.AutoResponse.guild_id == ctx.guild.id
             )
@@ -1,7 +1,7 @@
 import discord
 from discord.ext import commands
 
-from bot import MyBot, db
+from bot import MyBot, cache, db
 from bot.db import models
 
 
@@ -22,7 +22,7 @@ class AutoMod(commands.Cog):
                 and message.author == ctx.message.author
             )
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             auto_mod_data = await session.get(models.AutoMod, ctx.guild.id)
 
             if not auto_mod_data:
@@ -44,6 +44,8 @@ class AutoMod(commands.Cog):
                     setattr(auto_mod_data, feature, value)
 
                 await session.commit()
+                cache.automod.put(ctx.guild.id, auto_mod_data)
+                await cache.automod.publish(ctx.guild.id)
 
             mod_embed = discord.Embed(
                 title="Auto Mod",
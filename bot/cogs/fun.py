@@ -1,6 +1,6 @@
-import asyncio
 import random
 import string
+from datetime import datetime, timedelta
 from uuid import uuid4
 
 import discord
@@ -14,6 +14,8 @@ from bot.db import models
 class Fun(commands.Cog):
     def __init__(self, bot):
         self.bot: MyBot = bot
+        self.polls: dict[str, tuple[discord.Message, discord.Embed]] = {}
+        self.bot.scheduler.register("reaction_poll", self.end_poll)
         self.description = (
             "Commands to have some fun and relieve stress (or induce it)"
         )
@@ -66,6 +68,25 @@ class Fun(commands.Cog):
             9: "9️⃣",
         }
 
+    async def end_poll(self, message_id: str):
+        if not (poll := self.polls.get(message_id)):
+            return
+
+        # Only forgotten once it's ended, so a failure is retried
+        m, embed = poll
+        m = await m.channel.fetch_message(m.id)
+
+        results = []
+
+        for r in m.reactions:
+            results.append((r.emoji, r.count))
+
+        results.sort(key=lambda t: t[1], reverse=True)
+
+        embed = embed.copy().add_field(name="Result", value=results[0][0])
+        await m.edit(embed=embed)
+        del self.polls[message_id]
+
     @commands.command(name="poll", brief="Makes a poll!")
     async def make_poll(
         self, ctx: commands.Context, length: float, *, poll: str
@@ -111,20 +132,12 @@ class Fun(commands.Cog):
         for i in range(len(options)):
             await m.add_reaction(self.emoji_numbers[i + 1])
 
-        wait_time_seconds = length * 60
-        await asyncio.sleep(wait_time_seconds)
-
-        m = await ctx.channel.fetch_message(m.id)
-
-        results = []
-
-        for r in m.reactions:
-            results.append((r.emoji, r.count))
-
-        results.sort(key=lambda t: t[1], reverse=True)
-
-        embed = embed.add_field(name="Result", value=results[0][0])
-        await m.edit(embed=embed)
+        self.polls[str(m.id)] = (m, embed)
+        self.bot.scheduler.schedule(
+            "reaction_poll",
+            str(m.id),
+            datetime.now() + timedelta(minutes=length),
+        )
 
     @commands.command(
         name="coinflip", aliases=["coin", "flip"], help="Flip a coin!"
@@ -221,7 +234,7 @@ class Fun(commands.Cog):
     async def impersonate(
         self, ctx: commands.Context, member: discord.Member, *, message: str
     ):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             webhook_data: models.Webhook = await session.get(
                 models.Webhook, ctx.channel.id
             )
@@ -261,7 +274,7 @@ class Fun(commands.Cog):
             wait=True,
         )
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             new_imp_log = models.ImpersonationLog(
                 id=uuid4().hex,
                 guild_id=ctx.guild.id,
@@ -0,0 +1,201 @@
+import asyncio
+
+import discord
+from discord.ext import commands
+
+from bot import MyBot, db, lavalink, metrics
+
+
+class Metrics(commands.Cog):
+    def __init__(self, bot):
+        self.bot: MyBot = bot
+        self.description = "Commands to check how the bot is performing"
+        self.theme_color = discord.Color.purple()
+
+    @commands.command(
+        name="dbpool",
+        help="Show the state of the database connection pool",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def db_pool(self, ctx: commands.Context):
+        stats = db.pool_stats()
+
+        pool_embed = discord.Embed(
+            title="Database Pool", color=self.theme_color
+        )
+        pool_embed.add_field(
+            name="Connections",
+            value=(
+                f"{stats['checked_out']} checked out, "
+                f"{stats['size']} pooled, "
+                f"{max(stats['overflow'], 0)} overflow"
+            ),
+            inline=False,
+        )
+        pool_embed.add_field(
+            name="Checkouts",
+            value=f"{stats['checkouts']} ({stats['timeouts']} timed out)",
+            inline=False,
+        )
+        pool_embed.add_field(
+            name="Checkout Wait",
+            value=(
+                f"{stats['avg_wait'] * 1000:.2f}ms average, "
+                f"{stats['max_wait'] * 1000:.2f}ms max"
+            ),
+            inline=False,
+        )
+
+        await ctx.send(embed=pool_embed)
+
+    @commands.command(
+        name="looplag",
+        help="Show how long the event loop was blocked for",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def loop_lag(self, ctx: commands.Context):
+        monitor = self.bot.loop_lag
+        loop = asyncio.get_running_loop()
+
+        lag_embed = discord.Embed(title="Event Loop", color=self.theme_color)
+        lag_embed.add_field(
+            name="Loop",
+            value=f"{type(loop).__module__}.{type(loop).__name__}",
+            inline=False,
+        )
+        lag_embed.add_field(
+            name="Lag",
+            value=(
+                f"{monitor.last_lag * 1000:.2f}ms last, "
+                f"{monitor.avg_lag * 1000:.2f}ms average, "
+                f"{monitor.max_lag * 1000:.2f}ms max"
+            ),
+            inline=False,
+        )
+        lag_embed.add_field(
+            name="Blocked",
+            value=(
+                f"{monitor.blocked} of {monitor.samples} samples were over "
+                f"{monitor.threshold * 1000:.0f}ms"
+            ),
+            inline=False,
+        )
+
+        await ctx.send(embed=lag_embed)
+
+    @commands.command(
+        name="shards",
+        help="Show the latency, event rate and guild count of each shard",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def shards(self, ctx: commands.Context):
+        shards_embed = discord.Embed(
+            title="Shards",
+            color=self.theme_color,
+            description=(
+                f"Event rates are averaged over the last "
+                f"{self.bot.shard_stats.window} seconds"
+            ),
+        )
+
+        current_shard = ctx.guild.shard_id if ctx.guild else 0
+
+        # Embeds can't have more than 25 fields
+        for shard in self.bot.shard_stats.report(self.bot)[:25]:
+            state = "Disconnected" if shard["closed"] else "Connected"
+            field_name = f"Shard {shard['id']}"
+
+            if shard["id"] == current_shard:
+                field_name += " (this server)"
+
+            shards_embed.add_field(
+                name=field_name,
+                value=(
+                    f"{state}\n"
+                    f"{shard['latency'] * 1000:.0f}ms latency\n"
+                    f"{shard['event_rate']:.2f} events/s\n"
+                    f"{shard['guilds']} servers"
+                ),
+            )
+
+        await ctx.send(embed=shards_embed)
+
+    @commands.command(
+        name="nodes",
+        help="Show the health and load of each Lavalink node",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def nodes(self, ctx: commands.Context):
+        nodes_embed = discord.Embed(
+            title="Lavalink Nodes", color=self.theme_color
+        )
+
+        # Embeds can't have more than 25 fields
+        for node in lavalink.pool.report()[:25]:
+            if node["connected"]:
+                state = "Connected"
+            else:
+                state = f"Disconnected for {node['down_for']:.0f}s"
+
+            nodes_embed.add_field(
+                name=node["id"],
+                value=(
+                    f"{state}\n"
+                    f"{node['players']} players, {node['playing']} playing\n"
+                    f"{node['cpu'] * 100:.0f}% CPU, {node['load']:.1f} load\n"
+                    f"{node['disconnects']} disconnects, "
+                    f"{node['migrated_players']} players moved away"
+                ),
+            )
+
+        if not nodes_embed.fields:
+            nodes_embed.description = "No Lavalink nodes are configured"
+
+        await ctx.send(embed=nodes_embed)
+
+    @commands.command(
+        name="handlers",
+        help="Show the listeners and commands that took the most time",
+        hidden=True,
+    )
+    @commands.is_owner()
+    async def handlers(self, ctx: commands.Context, kind: str = None):
+        histogram = metrics.handler_seconds
+        rows = sorted(
+            (
+                (labels, item)
+                for labels, item in histogram.values.items()
+                if kind is None or labels[0] == kind
+            ),
+            key=lambda row: row[1].sum,
+            reverse=True,
+        )
+
+        if not rows:
+            await ctx.send("No handlers have run yet")
+            return
+
+        lines = [
+            f"{'Handler':<40} {'Calls':>8} {'Errors':>6} "
+            f"{'Avg ms':>8} {'p95 ms':>8} {'Total s':>8}"
+        ]
+
+        for labels, item in rows[:15]:
+            errors = metrics.handler_errors.values.get(labels, 0)
+            p95 = histogram.quantile(labels, 0.95)
+            lines.append(
+                f"{labels[1][:40]:<40} {item.count:>8} {errors:>6.0f} "
+                f"{item.sum / item.count * 1000:>8.2f} "
+                f"{p95 * 1000:>8.0f} {item.sum:>8.2f}"
+            )
+
+        table = "\n".join(lines)
+        await ctx.send(f"```\n{table}\n```")
+
+
+def setup(bot):
+    bot.add_cog(Metrics(bot))
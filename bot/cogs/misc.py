@@ -4,7 +4,7 @@ import discord
 from datetime import datetime
 from discord.ext import commands
 
-from bot import MyBot, db
+from bot import MyBot, cache, db
 from bot.db import models
 from bot.utils import str_time_to_timedelta
 
@@ -15,70 +15,12 @@ class Miscellaneous(commands.Cog):
         self.description = "Some commands to do general tasks"
         self.theme_color = discord.Color.purple()
         self.launched_at = int(datetime.now().timestamp())
-        self.reminders_loaded = False
         self.suggestion_channel = 848474796856836117
 
-    # async def load_pending_reminders(self):
-    #     print("Loading pending reminders...")
-
-    #     Data.c.execute("SELECT * FROM reminders")
-    #     reminders = Data.c.fetchall()
-
-    #     for rem in reminders:
-    #         reminder_id = rem[0]
-    #         user = await self.bot.fetch_user(rem[1])
-    #         reminder_msg = rem[2]
-    #         started_at = datetime.strptime(rem[3], Data.datetime_format)
-
-    #         now = datetime.now()
-    #         due_at = datetime.strptime(rem[4], Data.datetime_format)
-
-    #         asyncio.create_task(
-    #             self.reminder(
-    #                 reminder_id,
-    #                 user,
-    #                 (due_at - now).total_seconds(),
-    #                 reminder_msg,
-    #                 started_at,
-    #             )
-    #         )
-
-    #     self.reminders_loaded = True
-    #     print(f"Loaded {len(reminders)} pending reminders!")
-
-    async def reminder(
-        self,
-        reminder_id: str,
-        user: discord.User,
-        seconds: float,
-        reminder_msg: str,
-        reminder_start_time: datetime,
-    ):
-        await asyncio.sleep(seconds)
-        rem_start_time_str = f"<t:{int(reminder_start_time.timestamp())}:R>"
-        try:
-            await user.send(
-                f"You asked me to remind you {rem_start_time_str} about:"
-                f"\n*{reminder_msg}*",
-                allowed_mentions=discord.AllowedMentions.none(),
-            )
-        except discord.Forbidden:
-            pass
-
-        async with db.async_session() as session:
-            rem_data = await session.get(models.Reminder, reminder_id)
-            await session.delete(rem_data)
-            await session.commit()
-
-    @commands.Cog.listener()
-    async def on_ready(self):
-        self.reminders_loaded = True  # TODO: Remove this line
-        # await self.load_pending_reminders()
-
     @commands.command(name="info", help="Display bot information")
     async def info(self, ctx: commands.Context):
         ping = int(self.bot.latency * 1000)
-        guild_count = str(len(self.bot.guilds))
+        guild_count = str(self.bot.guild_count())
         total_member_count = 0
 
         for guild in self.bot.guilds:
@@ -158,14 +100,6 @@ class Miscellaneous(commands.Cog):
         ),
     )
     async def remind(self, ctx: commands.Context, *, options: str):
-        # Wait till bot finishes loading all reminders
-        # Prevents duplicate reminders
-        if not self.reminders_loaded:
-            await ctx.send(
-                "The bot is starting up. Please try again in a few minutes."
-            )
-            return
-
         args = options.split(",")
         if len(args) < 2:
             await ctx.send(
@@ -186,16 +120,6 @@ class Miscellaneous(commands.Cog):
         )
 
         reminder_id = uuid.uuid4()
-        asyncio.create_task(
-            self.reminder(
-                reminder_id.hex,
-                ctx.author,
-                remind_time.total_seconds(),
-                reminder_msg,
-                now,
-            )
-        )
-
         new_reminder = models.Reminder(
             id=reminder_id.hex,
             user_id=ctx.author.id,
@@ -203,16 +127,20 @@ class Miscellaneous(commands.Cog):
             start=now,
             due=now + remind_time,
         )
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             session.add(new_reminder)
             await session.commit()
 
+        self.bot.scheduler.schedule(
+            "reminder", reminder_id.hex, new_reminder.due
+        )
+
     @commands.command(
         name="afk",
         help="Lets others know that you are AFK when someone mentions you",
     )
     async def afk(self, ctx: commands.Context, *, reason: str):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             afk_data: models.AFK | None = await session.get(
                 models.AFK, ctx.author.id
             )
@@ -227,6 +155,9 @@ class Miscellaneous(commands.Cog):
 
             await session.commit()
 
+        cache.afk.add(ctx.author.id)
+        await cache.afk.publish(ctx.author.id)
+
         await ctx.send(
             f"You have been AFK'd for the following reason:\n*{reason}*",
             allowed_mentions=discord.AllowedMentions.none(),
@@ -234,7 +165,7 @@ class Miscellaneous(commands.Cog):
 
     @commands.command(name="unafk", help="Unset your AFK status")
     async def unafk(self, ctx: commands.Context):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             afk_data: models.AFK | None = await session.get(
                 models.AFK, ctx.author.id
             )
@@ -242,6 +173,8 @@ class Miscellaneous(commands.Cog):
             if afk_data:
                 await session.delete(afk_data)
                 await session.commit()
+                cache.afk.discard(ctx.author.id)
+                await cache.afk.publish(ctx.author.id)
                 await ctx.send("You are no longer AFK'd")
             else:
                 await ctx.send("You are not currently AFK'd")
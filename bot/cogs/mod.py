@@ -1,14 +1,15 @@
 import asyncio
-import time
 import random
+from datetime import datetime
 from typing import Sequence
 from uuid import uuid4
 
 import discord
 from discord.ext import commands
+from sqlalchemy import delete
 from sqlalchemy.future import select
 
-from bot import MyBot, db
+from bot import MyBot, cache, db
 from bot.db import models
 from bot.utils import str_time_to_timedelta
 
@@ -52,37 +53,13 @@ class Moderation(commands.Cog):
             await category.set_permissions(mute_role, send_messages=False)
 
         # Add new mute_role to database
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                guild_data.mute_role = mute_role.id  # type: ignore
-            else:
-                new_guild_data = models.Guild(
-                    id=guild.id, mute_role=mute_role.id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(guild.id, mute_role=mute_role.id)
 
         return mute_role
 
     async def get_guild_mute_role(self, guild: discord.Guild) -> discord.Role:
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                mute_role_id = guild_data.mute_role
-            else:
-                new_guild_data = models.Guild(id=guild.id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                mute_role_id = None
+        guild_data = await cache.guilds.get(guild.id)
+        mute_role_id = guild_data.mute_role
 
         if mute_role_id is None:
             # Create mute role if none is provided
@@ -120,7 +97,7 @@ class Moderation(commands.Cog):
             reason=reason,
         )
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             session.add(new_infraction)
             await session.commit()
 
@@ -135,7 +112,7 @@ class Moderation(commands.Cog):
     async def infractions(
         self, ctx: commands.Context, member: discord.Member = None
     ):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.Infraction).where(
                 models.Infraction.guild_id == ctx.guild.id
             )
@@ -206,16 +183,16 @@ class Moderation(commands.Cog):
             member: discord.Member = ctx.guild.get_member(member)
 
         if member is None:
-            async with db.async_session() as session:
-                q = select(models.Infraction).where(
+            async with db.scoped_session() as session:
+                q = delete(models.Infraction).where(
                     models.Infraction.guild_id == ctx.guild.id
                 )
                 result = await session.execute(q)
-                tasks = [session.delete(inf) for inf in result.scalars().all()]
-                await asyncio.gather(*tasks)
                 await session.commit()
 
-            await ctx.send("Cleared all infractions in this server...")
+            await ctx.send(
+                f"Cleared all {result.rowcount} infractions in this server..."
+            )
 
         else:
             if (
@@ -227,19 +204,18 @@ class Moderation(commands.Cog):
                 )
                 return
 
-            async with db.async_session() as session:
+            async with db.scoped_session() as session:
                 q = (
-                    select(models.Infraction)
+                    delete(models.Infraction)
                     .where(models.Infraction.guild_id == ctx.guild.id)
                     .where(models.Infraction.user_id == member.id)
                 )
                 result = await session.execute(q)
-                tasks = [session.delete(inf) for inf in result.scalars().all()]
-                await asyncio.gather(*tasks)
                 await session.commit()
 
             await ctx.send(
-                f"Cleared all infractions by **{member}** in this server..."
+                f"Cleared all {result.rowcount} infractions by **{member}** "
+                "in this server..."
             )
 
     @commands.command(
@@ -272,23 +248,28 @@ class Moderation(commands.Cog):
         await member.add_roles(mute_role)
 
         if unmute_time:
-            now_epoch = time.time()
-            unmute_timedelta = str_time_to_timedelta(unmute_time)
-            humanized_time_str = (
-                f"<t:{int(now_epoch + unmute_timedelta.total_seconds())}:R>"
+            now = datetime.now()
+            temp_mute = models.TempMute(
+                id=uuid4().hex,
+                guild_id=ctx.guild.id,
+                channel_id=ctx.channel.id,
+                user_id=member.id,
+                role_id=mute_role.id,
+                start=now,
+                due=now + str_time_to_timedelta(unmute_time),
             )
 
-            mute_msg: discord.Message = await ctx.send(
+            async with db.scoped_session() as session:
+                session.add(temp_mute)
+                await session.commit()
+
+            self.bot.scheduler.schedule(
+                "temp_mute", temp_mute.id, temp_mute.due
+            )
+            humanized_time_str = f"<t:{int(temp_mute.due.timestamp())}:R>"
+            await ctx.send(
                 f"**{member}** will be unmuted {humanized_time_str}"
             )
-            await asyncio.sleep(unmute_timedelta.total_seconds())
-
-            unmute_str = f"**{member}** was unmuted {humanized_time_str}"
-            await mute_msg.edit(content=unmute_str)
-
-            if mute_role in member.roles:
-                await member.remove_roles(mute_role)
-                await ctx.send(unmute_str)
 
         else:
             await ctx.send(f"**{member}** can no longer speak")
@@ -450,19 +431,8 @@ class Moderation(commands.Cog):
         else:
             ch = ctx.channel
 
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild_data:
-                limit = guild_data.clear_cap
-            else:
-                new_guild_data = models.Guild(id=ctx.guild.id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                limit = new_guild_data.clear_cap
+        guild_data = await cache.guilds.get(ctx.guild.id)
+        limit = guild_data.clear_cap
 
         if limit and message_count > limit:
             exceeds_by = message_count - limit
@@ -5,7 +5,7 @@ from uuid import uuid4
 from discord.ext import commands
 from sqlalchemy.future import select
 
-from bot import MyBot, db
+from bot import MyBot, cache, db
 from bot.db import models
 from bot.utils import dbl_vote_required
 
@@ -217,7 +217,7 @@ class ReactionRoles(commands.Cog):
         else:
             em = str(rr_emoji.id)
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = (
                 select(models.ReactionRole)
                 .where(models.ReactionRole.guild_id == ctx.guild.id)
@@ -236,7 +236,7 @@ class ReactionRoles(commands.Cog):
         else:
             new_rr_id = uuid4()
 
-            async with db.async_session() as session:
+            async with db.scoped_session() as session:
                 new_rr = models.ReactionRole(
                     id=new_rr_id.hex,
                     guild_id=ctx.guild.id,
@@ -248,6 +248,9 @@ class ReactionRoles(commands.Cog):
                 session.add(new_rr)
                 await session.commit()
 
+            cache.reaction_roles.add(new_rr)
+            await cache.reaction_roles.publish(new_rr.id)
+
             await ctx.send(
                 f"Reaction Role for {rr_role.mention} has been created with {rr_emoji} at {rr_channel.mention}",
                 allowed_mentions=discord.AllowedMentions.none(),
@@ -261,12 +264,14 @@ class ReactionRoles(commands.Cog):
     @commands.bot_has_guild_permissions(manage_roles=True, add_reactions=True)
     @commands.has_guild_permissions(manage_roles=True)
     async def remove_reaction_role(self, ctx: commands.Context, id: str):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             rr = await session.get(models.ReactionRole, id)
 
             if rr:
                 await session.delete(rr)
                 await session.commit()
+                cache.reaction_roles.remove(rr.id)
+                await cache.reaction_roles.publish(rr.id)
                 await ctx.send(
                     f"Reaction Role with ID `{id}` has been removed"
                 )
@@ -281,7 +286,7 @@ class ReactionRoles(commands.Cog):
         help="See the reaction roles setup in your server. If you've deleted any channel, emoji, or role that was used in an RR, this command will cleanup their entries from your server.",
     )
     async def view_reaction_roles(self, ctx: commands.Context):
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.ReactionRole).where(
                 models.ReactionRole.guild_id == ctx.guild.id
             )
@@ -303,10 +308,13 @@ class ReactionRoles(commands.Cog):
             for rr in reaction_roles:
 
                 async def delete_rr():
-                    async with db.async_session() as session:
+                    async with db.scoped_session() as session:
                         await session.delete(rr)
                         await session.commit()
 
+                    cache.reaction_roles.remove(rr.id)
+                    await cache.reaction_roles.publish(rr.id)
+
                 try:
                     rr_channel: discord.TextChannel = (
                         await ctx.guild.fetch_channel(rr.channel_id)
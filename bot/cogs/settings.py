@@ -4,8 +4,7 @@ import discord
 from discord.ext import commands
 from discord import utils
 
-from bot import MyBot, db
-from bot.db import models
+from bot import MyBot, cache
 
 
 class Settings(commands.Cog):
@@ -23,20 +22,7 @@ class Settings(commands.Cog):
     )
     @commands.has_guild_permissions(manage_roles=True)
     async def set_mute_role(self, ctx: commands.Context, role: discord.Role):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild:
-                guild.mute_role = role.id
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, mute_role=role.id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild.id, mute_role=role.id)
 
         await ctx.send(f"The mute role has been set to **{role}**")
 
@@ -50,20 +36,7 @@ class Settings(commands.Cog):
     async def set_welcome_message(
         self, ctx: commands.Context, *, message: str = None
     ):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild:
-                guild.welcome_message = message
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, welcome_message=message
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild.id, welcome_message=message)
 
         if message:
             await ctx.send(
@@ -84,20 +57,7 @@ class Settings(commands.Cog):
     async def set_leave_message(
         self, ctx: commands.Context, *, message: str = None
     ):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild:
-                guild.leave_message = message
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, leave_message=message
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild.id, leave_message=message)
 
         if message:
             await ctx.send(
@@ -117,22 +77,8 @@ class Settings(commands.Cog):
     async def set_welcome_channel(
         self, ctx: commands.Context, *, channel: discord.TextChannel = None
     ):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            ch = str(channel.id) if channel else "disabled"
-
-            if guild:
-                guild.welcome_channel = ch
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, welcome_channel=ch
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        ch = str(channel.id) if channel else "disabled"
+        await cache.guilds.update(ctx.guild.id, welcome_channel=ch)
 
         if channel:
             await ctx.send(
@@ -150,22 +96,8 @@ class Settings(commands.Cog):
     async def set_leave_channel(
         self, ctx: commands.Context, *, channel: discord.TextChannel = None
     ):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            ch = str(channel.id) if channel else "disabled"
-
-            if guild:
-                guild.leave_channel = ch
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, leave_channel=ch
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        ch = str(channel.id) if channel else "disabled"
+        await cache.guilds.update(ctx.guild.id, leave_channel=ch)
 
         if channel:
             await ctx.send(
@@ -184,22 +116,8 @@ class Settings(commands.Cog):
     async def set_auto_role(
         self, ctx: commands.Context, *, role: discord.Role
     ):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            role_id = role.id if role else None
-
-            if guild:
-                guild.auto_role = role_id
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild.id, auto_role=role_id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        role_id = role.id if role else None
+        await cache.guilds.update(ctx.guild.id, auto_role=role_id)
 
         await ctx.send(
             f"The auto role has been set to **{role.mention}**",
@@ -287,18 +205,7 @@ class Settings(commands.Cog):
     )
     @commands.has_guild_permissions(administrator=True)
     async def prefix(self, ctx: commands.Context, pref: str = "s!"):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild:
-                guild.prefix = pref
-            else:
-                new_guild_data = models.Guild(id=ctx.guild.id, prefix=pref)
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild.id, prefix=pref)
 
         await ctx.send(f"The prefix has been changed to **{pref}**")
 
@@ -364,18 +271,7 @@ class Settings(commands.Cog):
     @commands.command(name="setclearcap", aliases=["clearcap", "cc"])
     @commands.has_guild_permissions(administrator=True)
     async def set_clear_cap(self, ctx: commands.Context, limit: int = None):
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild.id
-            )
-
-            if guild:
-                guild.clear_cap = limit
-            else:
-                new_guild_data = models.Guild(id=ctx.guild.id, clear_cap=limit)
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild.id, clear_cap=limit)
 
         if limit:
             await ctx.send(
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 from bot import MyBot
+from bot.snipes import snipes
 
 
 class Snipe(commands.Cog):
@@ -11,40 +12,10 @@ class Snipe(commands.Cog):
             "Commands to snipe out messages that people try to hide"
         )
         self.theme_color = discord.Color.purple()
+        self.snipe_limit = snipes.limit
 
-        self.deleted_msgs = {}
-        self.edited_msgs = {}
-        self.snipe_limit = 7
-
-    @commands.Cog.listener()
-    async def on_message_delete(self, message: discord.Message):
-        ch_id = message.channel.id
-
-        if not message.author.bot:
-            if message.content:
-                if ch_id not in self.deleted_msgs:
-                    self.deleted_msgs[ch_id] = []
-
-                self.deleted_msgs[ch_id].append(message)
-
-            if len(self.deleted_msgs[ch_id]) > self.snipe_limit:
-                self.deleted_msgs[ch_id].pop(0)
-
-    @commands.Cog.listener()
-    async def on_message_edit(
-        self, before: discord.Message, after: discord.Message
-    ):
-        ch_id = before.channel.id
-
-        if not before.author.bot:
-            if before.content and after.content:
-                if ch_id not in self.edited_msgs:
-                    self.edited_msgs[ch_id] = []
-
-                self.edited_msgs[ch_id].append((before, after))
-
-            if len(self.edited_msgs[ch_id]) > self.snipe_limit:
-                self.edited_msgs[ch_id].pop(0)
+    # Deleted and edited messages are recorded by the slash snipe cog, both
+    # cogs read from the same store
 
     @commands.command(
         name="snipe",
@@ -56,32 +27,30 @@ class Snipe(commands.Cog):
             await ctx.send(f"Maximum snipe limit is {self.snipe_limit}")
             return
 
-        try:
-            msgs: list[discord.Message] = self.deleted_msgs[ctx.channel.id][
-                ::-1
-            ][:limit]
-            snipe_embed = discord.Embed(
-                title="Message Snipe", color=self.theme_color
-            )
+        msgs = snipes.deleted(ctx.channel.id, limit)
 
-            if msgs:
-                async with ctx.typing():
-                    top_author: discord.Member = (
-                        await self.bot.get_or_fetch_user(msgs[0].author.id)
-                    )
+        if not msgs:
+            await ctx.send("There's nothing to snipe here...")
+            return
 
-                if top_author:
-                    snipe_embed.set_thumbnail(url=str(top_author.avatar.url))
+        snipe_embed = discord.Embed(
+            title="Message Snipe", color=self.theme_color
+        )
 
-            for msg in msgs:
-                snipe_embed.add_field(
-                    name=str(msg.author), value=msg.content, inline=False
-                )
+        async with ctx.typing():
+            top_author: discord.User = await self.bot.get_or_fetch_user(
+                msgs[0].author_id
+            )
 
-            await ctx.send(embed=snipe_embed)
+        if top_author:
+            snipe_embed.set_thumbnail(url=str(top_author.display_avatar.url))
 
-        except KeyError:
-            await ctx.send("There's nothing to snipe here...")
+        for msg in msgs:
+            snipe_embed.add_field(
+                name=msg.author_name, value=msg.content, inline=False
+            )
+
+        await ctx.send(embed=snipe_embed)
 
     @commands.command(
         name="editsnipe",
@@ -93,34 +62,34 @@ class Snipe(commands.Cog):
             await ctx.send(f"Maximum snipe limit is {self.snipe_limit}")
             return
 
-        try:
-            msgs = self.edited_msgs[ctx.channel.id][::-1][:limit]
-            editsnipe_embed = discord.Embed(
-                title="Edit Snipe", color=self.theme_color
-            )
+        msgs = snipes.edited(ctx.channel.id, limit)
+
+        if not msgs:
+            await ctx.send("There's nothing to snipe here...")
+            return
 
-            if msgs:
-                async with ctx.typing():
-                    top_author: discord.Member = (
-                        await self.bot.get_or_fetch_user(msgs[0][0].author.id)
-                    )
+        editsnipe_embed = discord.Embed(
+            title="Edit Snipe", color=self.theme_color
+        )
 
-                if top_author:
-                    editsnipe_embed.set_thumbnail(
-                        url=str(top_author.avatar.url)
-                    )
+        async with ctx.typing():
+            top_author: discord.User = await self.bot.get_or_fetch_user(
+                msgs[0].author_id
+            )
 
-            for msg in msgs:
-                editsnipe_embed.add_field(
-                    name=str(msg[0].author),
-                    value=f"{msg[0].content} **-->** {msg[1].content}",
-                    inline=False,
-                )
+        if top_author:
+            editsnipe_embed.set_thumbnail(
+                url=str(top_author.display_avatar.url)
+            )
 
-            await ctx.send(embed=editsnipe_embed)
+        for msg in msgs:
+            editsnipe_embed.add_field(
+                name=msg.author_name,
+                value=f"{msg.content} **-->** {msg.edited_content}",
+                inline=False,
+            )
 
-        except KeyError:
-            await ctx.send("There's nothing to snipe here...")
+        await ctx.send(embed=editsnipe_embed)
 
 
 def setup(bot):
@@ -32,7 +32,7 @@ class Status(commands.Cog):
         activ_msg = activity[1]
 
         if "[guild_count]" in activ_msg:
-            guild_count = len(self.bot.guilds)
+            guild_count = self.bot.guild_count()
             activ_msg = activ_msg.replace("[guild_count]", str(guild_count))
 
         activ = discord.Activity(type=activ_type, name=activ_msg)
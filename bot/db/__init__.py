@@ -1,14 +1,83 @@
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterable
+
+from sqlalchemy import BigInteger, cast, func, literal, union_all
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     create_async_engine,
     AsyncEngine,
     AsyncSession,
 )
+from sqlalchemy.future import select
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from bot.db import models
 
 # from .models import Base
 
 ENGINE: AsyncEngine
 
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
+
+# Session shared by everything running in the current task, with the task
+# that owns it
+_scoped_session: ContextVar[tuple[asyncio.Task, AsyncSession] | None] = (
+    ContextVar("scoped_session", default=None)
+)
+
+
+class PoolStats:
+    """
+    Counters of how long connection checkouts waited for the pool.
+    """
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False):
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+POOL_STATS = PoolStats()
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Connection pool that records checkout wait times and timeouts in
+    `POOL_STATS`.
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            POOL_STATS.record(time.perf_counter() - start, timed_out=True)
+            raise
+
+        POOL_STATS.record(time.perf_counter() - start)
+        return conn
+
 
 # async def create_tables():
 #     async with engine.begin() as conn:
@@ -17,7 +86,23 @@ ENGINE: AsyncEngine
 
 def init_engine():
     global ENGINE
-    ENGINE = create_async_engine(os.environ["DB_URI"])
+
+    db_uri = os.environ["DB_URI"]
+    connect_args = {}
+
+    if "+asyncpg" in db_uri:
+        connect_args["prepared_statement_cache_size"] = STATEMENT_CACHE_SIZE
+
+    ENGINE = create_async_engine(
+        db_uri,
+        poolclass=InstrumentedPool,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT,
+        pool_recycle=POOL_RECYCLE,
+        pool_pre_ping=POOL_PRE_PING,
+        connect_args=connect_args,
+    )
 
 
 async def close_db():
@@ -28,3 +113,136 @@ async def close_db():
 def async_session() -> AsyncSession:
     global ENGINE
     return AsyncSession(ENGINE, expire_on_commit=False)
+
+
+@asynccontextmanager
+async def scoped_session() -> AsyncIterator[AsyncSession]:
+    """
+    Get a session that is reused by every `scoped_session` block nested in
+    this one, so the helpers a command or event calls share its session and
+    connection. Sessions are never shared with other tasks, since a session
+    can't be used concurrently.
+    """
+
+    scope = _scoped_session.get()
+
+    if scope and scope[0] is asyncio.current_task():
+        yield scope[1]
+        return
+
+    async with async_session() as session:
+        token = _scoped_session.set((asyncio.current_task(), session))
+
+        try:
+            yield session
+        finally:
+            _scoped_session.reset(token)
+
+
+def pool_stats() -> dict[str, float]:
+    """
+    Get the current state of the connection pool, and checkout wait times
+    since startup.
+    """
+
+    # Set by init_engine, only read here
+    pool = ENGINE.pool  # noqa: F821
+    checkouts = POOL_STATS.checkouts + POOL_STATS.timeouts
+
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "checkouts": POOL_STATS.checkouts,
+        "timeouts": POOL_STATS.timeouts,
+        "avg_wait": POOL_STATS.total_wait / checkouts if checkouts else 0.0,
+        "max_wait": POOL_STATS.max_wait,
+    }
+
+
+async def get_or_create_guild(guild_id: int) -> models.Guild:
+    """
+    Get a guild's row, creating it if it doesn't exist, in one statement
+    that is safe to run concurrently for the same guild.
+    """
+
+    guilds = models.Guild.__table__
+    inserted = (
+        insert(models.Guild)
+        .values(id=guild_id)
+        .on_conflict_do_nothing(index_elements=[guilds.c.id])
+        .returning(*guilds.c)
+        .cte("inserted")
+    )
+    q = select(models.Guild).from_statement(
+        union_all(
+            select(inserted),
+            select(guilds).where(guilds.c.id == guild_id),
+        )
+    )
+
+    # Not a scoped session, since the guild cache calls this from inside
+    # commands whose own changes mustn't be committed with it
+    async with async_session() as session:
+        guild_data = (await session.scalars(q)).first()
+
+        # The row was inserted by a transaction that committed after this
+        # statement started, so only a new statement can see it
+        if guild_data is None:
+            guild_data = await session.get(models.Guild, guild_id)
+
+        await session.commit()
+
+    return guild_data
+
+
+async def upsert_guild(guild_id: int, **fields) -> models.Guild:
+    """
+    Write the given columns of a guild's row, creating it if it doesn't
+    exist, in one statement.
+    """
+
+    q = insert(models.Guild).values(id=guild_id, **fields)
+    q = q.on_conflict_do_update(
+        index_elements=[models.Guild.id],
+        set_={column: q.excluded[column] for column in fields},
+    ).returning(*models.Guild.__table__.c)
+    q = (
+        select(models.Guild)
+        .from_statement(q)
+        .execution_options(populate_existing=True)
+    )
+
+    # Not a scoped session, for the same reason as get_or_create_guild
+    async with async_session() as session:
+        guild_data = (await session.scalars(q)).one()
+        await session.commit()
+
+    return guild_data
+
+
+async def ensure_guilds(guild_ids: Iterable[int]):
+    """
+    Create the rows of all the given guilds that don't have one yet, in one
+    statement.
+    """
+
+    guilds = models.Guild.__table__
+    defaults = {
+        column.name: column.default.arg
+        for column in guilds.c
+        if column.default is not None and column.default.is_scalar
+    }
+    rows = select(
+        func.unnest(cast(list(guild_ids), ARRAY(BigInteger))),
+        *(literal(value) for value in defaults.values()),
+    )
+    q = (
+        insert(models.Guild)
+        .from_select(["id", *defaults], rows)
+        .on_conflict_do_nothing(index_elements=[guilds.c.id])
+    )
+
+    async with async_session() as session:
+        await session.execute(q)
+        await session.commit()
@@ -6,6 +6,7 @@ from sqlalchemy import (
     DateTime,
     Boolean,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -40,6 +41,17 @@ class AFK(Base):
 
 class ReactionRole(Base):
     __tablename__ = "reaction_roles"
+    __table_args__ = (
+        Index(
+            "ix_reaction_roles_message",
+            "guild_id",
+            "channel_id",
+            "message_id",
+            "emoji",
+            "role_id",
+            unique=True,
+        ),
+    )
 
     id = Column(String, primary_key=True)
     guild_id = Column(BigInteger, nullable=False)
@@ -51,6 +63,7 @@ class ReactionRole(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    __table_args__ = (Index("ix_reminders_due", "due", "id"),)
 
     id = Column(String, primary_key=True)
     user_id = Column(BigInteger, nullable=False)
@@ -59,6 +72,19 @@ class Reminder(Base):
     due = Column(DateTime, nullable=False)
 
 
+class TempMute(Base):
+    __tablename__ = "temp_mutes"
+    __table_args__ = (Index("ix_temp_mutes_due", "due", "id"),)
+
+    id = Column(String, primary_key=True)
+    guild_id = Column(BigInteger, nullable=False)
+    channel_id = Column(BigInteger, nullable=False)
+    user_id = Column(BigInteger, nullable=False)
+    role_id = Column(BigInteger, nullable=False)
+    start = Column(DateTime, nullable=False)
+    due = Column(DateTime, nullable=False)
+
+
 class Webhook(Base):
     __tablename__ = "webhooks"
 
@@ -68,11 +94,20 @@ class Webhook(Base):
 
 class AutoResponse(Base):
     __tablename__ = "auto_responses"
+    __table_args__ = (
+        Index(
+            "ix_auto_responses_activation",
+            "guild_id",
+            "activation",
+            unique=True,
+        ),
+    )
 
     id = Column(String, primary_key=True)
     guild_id = Column(BigInteger, nullable=False)
     activation = Column(String, nullable=False)
     response = Column(String, nullable=False)
+    match_mode = Column(String, default="exact", nullable=False)
 
 
 class AutoMod(Base):
@@ -86,6 +121,9 @@ class AutoMod(Base):
 
 class Infraction(Base):
     __tablename__ = "infractions"
+    __table_args__ = (
+        Index("ix_infractions_guild_user", "guild_id", "user_id"),
+    )
 
     id = Column(String, primary_key=True)
     guild_id = Column(BigInteger, nullable=False)
@@ -96,6 +134,11 @@ class Infraction(Base):
 
 class ImpersonationLog(Base):
     __tablename__ = "impersonation_logs"
+    __table_args__ = (
+        Index(
+            "ix_impersonation_logs_guild_timestamp", "guild_id", "timestamp"
+        ),
+    )
 
     id = Column(String, primary_key=True)
     guild_id = Column(BigInteger, nullable=False)
@@ -109,11 +152,14 @@ class ImpersonationLog(Base):
 
 class Playlist(Base):
     __tablename__ = "playlists"
+    __table_args__ = (Index("ix_playlists_owner", "owner_id"),)
 
     id = Column(String, primary_key=True)
     owner_id = Column(BigInteger, nullable=False)
     name = Column(String, nullable=False)
-    songs = relationship("PlaylistSong", back_populates="playlist")
+    songs = relationship(
+        "PlaylistSong", back_populates="playlist", passive_deletes=True
+    )
 
 
 class PlaylistSong(Base):
@@ -125,3 +171,21 @@ class PlaylistSong(Base):
         ForeignKey("playlists.id", ondelete="CASCADE"), primary_key=True
     )
     playlist = relationship("Playlist", back_populates="songs")
+
+
+class CachedTrack(Base):
+    __tablename__ = "cached_tracks"
+
+    # YouTube URL, or normalized search query
+    query = Column(String, primary_key=True)
+    # Encoded track, which Lavalink can play without searching again
+    track_id = Column(String, nullable=False)
+    title = Column(String, nullable=False)
+    author = Column(String, nullable=True)
+    length = Column(BigInteger, nullable=False)
+    identifier = Column(String, nullable=True)
+    uri = Column(String, nullable=True)
+    is_stream = Column(Boolean, default=False, nullable=False)
+    cached_at = Column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
@@ -5,3 +5,26 @@ class AutoModFeatures(enum.Enum):
     LINKS = "Bans links from being sent to this server"
     IMAGES = "Bans attachments from being sent to this server"
     PING_SPAM = "Temporarily mutes users who are spamming pings in this server"
+
+
+class AutoResponseMatch(enum.Enum):
+    EXACT = "The whole message must be the activation phrase"
+    WORD = "The activation phrase must appear as a separate word or phrase"
+    SUBSTRING = "The activation phrase can appear anywhere in the message"
+
+
+class MessageStage(enum.IntEnum):
+    """
+    Order in which the stages of the message pipeline run
+    """
+
+    AUTOMOD = 10
+    AFK = 20
+    AUTO_RESPONSE = 30
+    COMMANDS = 40
+
+
+class LoopMode(enum.Enum):
+    OFF = "Songs are played once"
+    TRACK = "The current song is played again"
+    QUEUE = "Songs are added back to the end of the queue once played"
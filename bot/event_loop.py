@@ -0,0 +1,127 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+FAST_EVENT_LOOP = os.getenv("FAST_EVENT_LOOP", "false").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", 0.25))
+
+
+def new_event_loop(fast: bool = False) -> asyncio.AbstractEventLoop:
+    """
+    Create the bot's event loop. A fast loop uses uvloop when it's installed,
+    and starts tasks eagerly on Python versions that support it, so tasks
+    that finish without waiting never have to be scheduled.
+    """
+
+    loop = None
+
+    if fast:
+        try:
+            import uvloop
+
+            loop = uvloop.new_event_loop()
+        except ImportError:
+            print("uvloop is not installed, using the default event loop")
+
+    if loop is None:
+        loop = asyncio.new_event_loop()
+
+    if fast and hasattr(asyncio, "eager_task_factory"):
+        loop.set_task_factory(asyncio.eager_task_factory)
+
+    return loop
+
+
+class LoopLagMonitor:
+    """
+    Measures how late the event loop wakes up a task that sleeps for
+    `interval` seconds, which is how long everything else had to wait for
+    the loop. A watchdog thread prints the loop's stack when it's blocked
+    for longer than `threshold`, to show which synchronous call blocked it.
+
+    Args:
+        interval (float): Seconds between samples.
+        threshold (float): Seconds of lag after which the loop is considered
+            blocked.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = 0
+        self.blocked = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def avg_lag(self) -> float:
+        return self.total_lag / self.samples if self.samples else 0.0
+
+    def record(self, lag: float):
+        lag = max(lag, 0.0)
+        self.samples += 1
+        self.last_lag = lag
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+
+        if lag > self.threshold:
+            self.blocked += 1
+            print(f"Event loop was blocked for {lag * 1000:.0f}ms")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            start = loop.time()
+            self._heartbeat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(loop.time() - start - self.interval)
+
+    def _watch(self):
+        reported = None
+
+        while self._task is not None:
+            time.sleep(self.interval)
+            heartbeat = self._heartbeat
+
+            # Only report each block once
+            if (
+                heartbeat == reported
+                or time.monotonic() - heartbeat
+                < self.interval + self.threshold
+            ):
+                continue
+
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+
+            if frame is not None:
+                stack = "".join(traceback.format_stack(frame))
+                print(f"Event loop is blocked, currently running:\n{stack}")
+
+    def start(self):
+        """
+        Start sampling the running loop. Does nothing if already started.
+        """
+
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._task = asyncio.create_task(self._run())
+        threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        ).start()
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
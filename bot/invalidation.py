@@ -0,0 +1,163 @@
+import asyncio
+import inspect
+import os
+import uuid
+from typing import Any, Callable
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from bot import db
+
+# Called with the key that changed, or None when everything under the topic
+# may have changed
+InvalidationHandler = Callable[[str | None], Any]
+
+
+class LocalBus:
+    """
+    Tells the caches of other processes that a key changed, so they drop
+    their copy. Messages are delivered to every bus in `peers`, never to
+    the bus that published them, since the publisher has already updated
+    its own cache. With no peers this does nothing, which is all a single
+    process needs.
+    """
+
+    def __init__(self):
+        self.peers: list[LocalBus] = []
+        self._handlers: dict[str, list[InvalidationHandler]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def subscribe(self, topic: str, handler: InvalidationHandler):
+        self._handlers.setdefault(topic, []).append(handler)
+
+    async def publish(self, topic: str, key: Any):
+        for peer in self.peers:
+            peer._deliver(topic, str(key))
+
+    def _deliver(self, topic: str, key: str | None):
+        for handler in self._handlers.get(topic, []):
+            try:
+                result = handler(key)
+            except Exception as e:
+                print(f"Failed to invalidate {topic} {key}: {e!r}")
+                continue
+
+            if inspect.isawaitable(result):
+                task = asyncio.ensure_future(self._wait(topic, key, result))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    def _deliver_all(self):
+        for topic in self._handlers:
+            self._deliver(topic, None)
+
+    async def _wait(self, topic: str, key: str | None, result):
+        try:
+            await result
+        except Exception as e:
+            print(f"Failed to invalidate {topic} {key}: {e!r}")
+
+    def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class PostgresBus(LocalBus):
+    """
+    Invalidation bus that reaches every process connected to the database,
+    with Postgres `LISTEN/NOTIFY`. One pooled connection is held to listen
+    on. Notifications sent while it's disconnected are lost, so everything
+    is invalidated when it reconnects.
+    """
+
+    CHANNEL = "cache_invalidation"
+
+    def __init__(self, keepalive: float = 60):
+        super().__init__()
+        self.keepalive = keepalive
+        self.origin = uuid.uuid4().hex
+        self._task: asyncio.Task | None = None
+
+    async def publish(self, topic: str, key: Any):
+        payload = f"{self.origin}:{topic}:{key}"
+
+        # Never the caller's scoped session, committing it would commit
+        # whatever the caller has pending
+        async with db.async_session() as session:
+            await session.execute(
+                select(func.pg_notify(self.CHANNEL, payload))
+            )
+            await session.commit()
+
+    def _on_notification(self, conn, pid: int, channel: str, payload: str):
+        origin, topic, key = payload.split(":", 2)
+
+        if origin != self.origin:
+            self._deliver(topic, key)
+
+    async def _listen(self):
+        connected_before = False
+
+        while True:
+            try:
+                async with db.ENGINE.connect() as conn:
+                    raw_conn = await conn.get_raw_connection()
+                    listener = raw_conn.driver_connection
+                    closed = asyncio.Event()
+
+                    listener.add_termination_listener(lambda _: closed.set())
+                    await listener.add_listener(
+                        self.CHANNEL, self._on_notification
+                    )
+
+                    if connected_before:
+                        self._deliver_all()
+
+                    connected_before = True
+
+                    while not closed.is_set():
+                        try:
+                            await asyncio.wait_for(
+                                closed.wait(), self.keepalive
+                            )
+                        except asyncio.TimeoutError:
+                            # Find out about dropped connections that
+                            # weren't closed cleanly
+                            await asyncio.wait_for(
+                                listener.execute("SELECT 1"), 10
+                            )
+            except Exception as e:
+                print(f"Cache invalidation listener disconnected: {e!r}")
+
+            await asyncio.sleep(5)
+
+    def start(self):
+        """
+        Start listening in the background. Does nothing if already started.
+        """
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._task is None:
+            return
+
+        self._task.cancel()
+
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+        self._task = None
+
+
+bus = (
+    LocalBus()
+    if os.getenv("CACHE_INVALIDATION", "postgres").lower() == "local"
+    else PostgresBus()
+)
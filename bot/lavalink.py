@@ -0,0 +1,330 @@
+import asyncio
+import os
+import time
+from typing import Any, Type, TypeVar
+
+import discord
+import wavelink
+
+T = TypeVar("T", bound=wavelink.SearchableTrack)
+
+LAVALINK_CHECK_INTERVAL = float(os.getenv("LAVALINK_CHECK_INTERVAL", 5))
+
+
+class NodeConfig:
+    def __init__(self, host: str, port: int, password: str):
+        self.host = host
+        self.port = port
+        self.password = password
+
+    @property
+    def identifier(self) -> str:
+        return f"{self.host}:{self.port}"
+
+
+def parse_nodes(value: str, default_password: str = "") -> list[NodeConfig]:
+    """
+    Parse comma separated nodes written as `password@host:port`. Nodes
+    without a password use `default_password`.
+    """
+
+    configs = []
+
+    for entry in value.split(","):
+        if not (entry := entry.strip()):
+            continue
+
+        password, _, address = entry.rpartition("@")
+        host, _, port = address.rpartition(":")
+        configs.append(
+            NodeConfig(host, int(port), password or default_password)
+        )
+
+    return configs
+
+
+def get_node_configs() -> list[NodeConfig]:
+    """
+    Get the nodes from `LAVALINK_NODES`, or the single node given by
+    `LAVALINK_HOST`, `LAVALINK_PORT` and `LAVALINK_PASSWORD`.
+    """
+
+    if nodes := os.getenv("LAVALINK_NODES"):
+        return parse_nodes(nodes, os.getenv("LAVALINK_PASSWORD", ""))
+
+    return [
+        NodeConfig(
+            os.environ["LAVALINK_HOST"],
+            int(os.environ["LAVALINK_PORT"]),
+            os.environ["LAVALINK_PASSWORD"],
+        )
+    ]
+
+
+class NodeHealth:
+    def __init__(self):
+        self.connected = False
+        self.disconnects = 0
+        self.down_since: float | None = None
+        self.migrated_players = 0
+        # Guilds whose players were moved away while the node was down, and
+        # may still be playing on it when it comes back
+        self.stale_guilds: set[int] = set()
+
+
+class NodePool:
+    """
+    Lavalink nodes to play music on. New players and searches go to the
+    connected node with the lowest load, and the nodes are checked every
+    `check_interval` seconds. Players of a node that disconnected are moved
+    to another node, resuming their track where it was, and nodes that
+    wavelink stopped retrying are reconnected.
+
+    Args:
+        check_interval (float, optional): Seconds between checks of the
+            nodes. Defaults to 5.
+    """
+
+    def __init__(self, check_interval: float = 5):
+        self.check_interval = check_interval
+        self.nodes: dict[str, wavelink.Node] = {}
+        self.health: dict[str, NodeHealth] = {}
+        self._task: asyncio.Task | None = None
+
+    async def connect(self, bot: discord.Client, configs: list[NodeConfig]):
+        """
+        Connect to the given nodes and start checking them. Nodes that are
+        already in the pool are skipped, so this is safe to call again when
+        the music cog is reloaded.
+        """
+
+        for config in configs:
+            if config.identifier in self.nodes:
+                continue
+
+            self.nodes[config.identifier] = (
+                await wavelink.NodePool.create_node(
+                    bot=bot,
+                    host=config.host,
+                    port=config.port,
+                    password=config.password,
+                    identifier=config.identifier,
+                )
+            )
+            self.health[config.identifier] = NodeHealth()
+
+        await self.check()
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    @staticmethod
+    def load(node: wavelink.Node) -> float:
+        """
+        Load of a node, lower is better. Lavalink only sends its stats every
+        minute, so players are counted here and its CPU and frame penalties
+        are added to them.
+        """
+
+        load = float(len(node.players))
+
+        if node.stats is not None:
+            penalty = node.stats.penalty
+            load += penalty.total - penalty.player_penalty
+
+        return load
+
+    def get_node(self, exclude: wavelink.Node | None = None) -> wavelink.Node:
+        """
+        Get the connected node with the lowest load.
+
+        Raises:
+            wavelink.ZeroConnectedNodes: None of the nodes are connected.
+        """
+
+        nodes = [
+            node
+            for node in self.nodes.values()
+            if node.is_connected() and node is not exclude
+        ]
+
+        if not nodes:
+            raise wavelink.ZeroConnectedNodes(
+                "None of the Lavalink nodes are connected."
+            )
+
+        return min(nodes, key=self.load)
+
+    def create_player(self) -> wavelink.Player:
+        """
+        Create a player on the best node, to be passed as `cls` to
+        `VoiceChannel.connect`.
+        """
+
+        return wavelink.Player(node=self.get_node())
+
+    async def search(self, cls: Type[T], query: str) -> list[T]:
+        return await cls.search(query, node=self.get_node())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.check_interval)
+
+            try:
+                await self.check()
+            except Exception as e:
+                print(f"Failed to check Lavalink nodes: {e!r}")
+
+    async def check(self):
+        # Copied, since connect can add nodes while this awaits
+        for identifier, node in list(self.nodes.items()):
+            health = self.health[identifier]
+            connected = node.is_connected()
+
+            if connected and not health.connected:
+                health.connected = True
+                health.down_since = None
+                print(f"Lavalink node {identifier} connected")
+                await self._on_reconnected(node, health)
+            elif not connected and health.connected:
+                health.connected = False
+                health.down_since = time.monotonic()
+                health.disconnects += 1
+                print(f"Lavalink node {identifier} disconnected")
+
+            if not connected:
+                if node.players:
+                    await self._migrate(node, health)
+
+                await self._reconnect(node)
+
+    async def _reconnect(self, node: wavelink.Node):
+        websocket = node._websocket
+
+        # wavelink retries by itself while its listener is running, which it
+        # only is once the node connected and until Lavalink sends an
+        # internal error
+        if websocket.listener is not None and not websocket.listener.done():
+            return
+
+        websocket.listener = None
+
+        try:
+            await asyncio.wait_for(websocket.connect(), 10)
+        except Exception as e:
+            print(
+                f"Failed to reconnect Lavalink node {node.identifier}: {e!r}"
+            )
+
+    async def _migrate(self, node: wavelink.Node, health: NodeHealth):
+        for player in list(node.players):
+            try:
+                target = self.get_node(exclude=node)
+            except wavelink.ZeroConnectedNodes:
+                # Players are restored when a node comes back
+                return
+
+            node.players.remove(player)
+            target.players.append(player)
+            player.node = target
+            health.stale_guilds.add(player.guild.id)
+            health.migrated_players += 1
+
+            print(
+                f"Moving player of guild {player.guild.id} from Lavalink node "
+                f"{node.identifier} to {target.identifier}"
+            )
+            await self._restore(player)
+
+    async def _on_reconnected(self, node: wavelink.Node, health: NodeHealth):
+        if not health.disconnects:
+            return
+
+        websocket = node._websocket
+        player_guilds = {player.guild.id for player in node.players}
+
+        try:
+            # Stop players that were moved to another node, so the guild
+            # doesn't get audio from both
+            for guild_id in health.stale_guilds - player_guilds:
+                await websocket.send(op="destroy", guildId=str(guild_id))
+
+            health.stale_guilds.clear()
+
+            # The node may have restarted and lost the players that couldn't
+            # be moved anywhere
+            for player in list(node.players):
+                await self._restore(player)
+        except Exception as e:
+            print(f"Failed to restore Lavalink node {node.identifier}: {e!r}")
+
+    @staticmethod
+    def _position(player: wavelink.Player) -> int:
+        # Playing sets the last update to the epoch until Lavalink sends the
+        # player's state, which would make the position the track's end
+        if not player.last_update or player.last_update.timestamp() <= 0:
+            return 0
+
+        return int(player.position * 1000)
+
+    async def _restore(self, player: wavelink.Player):
+        """
+        Give a player's node its voice connection, track, position, pause
+        and volume.
+        """
+
+        source = player.source
+        position = self._position(player) if source is not None else 0
+        paused = player.is_paused()
+        volume = player.volume
+
+        try:
+            await player._dispatch_voice_update(player._voice_state)
+
+            if source is not None:
+                await player.play(source, start=position)
+
+                if paused:
+                    await player.set_pause(True)
+
+            if volume != 100:
+                await player.set_volume(volume)
+        except Exception as e:
+            print(
+                f"Failed to restore player of guild {player.guild.id}: {e!r}"
+            )
+
+    def report(self) -> list[dict[str, Any]]:
+        now = time.monotonic()
+        nodes = []
+
+        for identifier, node in self.nodes.items():
+            health = self.health[identifier]
+            stats = node.stats
+            nodes.append(
+                {
+                    "id": identifier,
+                    "connected": node.is_connected(),
+                    "players": len(node.players),
+                    "playing": stats.playing_players if stats else 0,
+                    "cpu": stats.lavalink_load if stats else 0.0,
+                    "load": self.load(node),
+                    "disconnects": health.disconnects,
+                    "down_for": (
+                        now - health.down_since
+                        if health.down_since is not None
+                        else 0.0
+                    ),
+                    "migrated_players": health.migrated_players,
+                }
+            )
+
+        return nodes
+
+
+pool = NodePool(LAVALINK_CHECK_INTERVAL)
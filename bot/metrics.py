@@ -0,0 +1,409 @@
+import abc
+import bisect
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from aiohttp import web
+
+from bot import db, lavalink
+
+Labels = tuple[str, ...]
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_labels(names: tuple[str, ...], values: Labels, **extra) -> str:
+    pairs = list(zip(names, values)) + list(extra.items())
+
+    if not pairs:
+        return ""
+
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+
+    if math.isnan(value):
+        return "NaN"
+
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(value)
+
+
+class Metric(abc.ABC):
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+
+    @abc.abstractmethod
+    def samples(self) -> Iterator[tuple[str, str, float]]:
+        pass
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(
+            f"{name}{labels} {_format_value(value)}"
+            for name, labels, value in self.samples()
+        )
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, name: str, help: str, label_names: tuple[str, ...]):
+        super().__init__(name, help, label_names)
+        self.values: dict[Labels, float] = {}
+
+    def inc(self, labels: Labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _format_labels(self.label_names, labels), value
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: Labels, amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, labels: Labels, value: float):
+        self.values[labels] = value
+
+
+class CallbackGauge(Metric):
+    """
+    Gauge whose values are read from `callback` when the metrics are
+    collected, for stats that are already kept somewhere else.
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...],
+        callback: Callable[[], dict[Labels, float]],
+    ):
+        super().__init__(name, help, label_names)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception as e:
+            # Leave the metric empty rather than failing the whole scrape
+            print(f"Failed to collect {self.name}: {e!r}")
+            return
+
+        for labels, value in values.items():
+            yield self.name, _format_labels(self.label_names, labels), value
+
+
+class HistogramValue:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self, buckets: int):
+        # Observations in each bucket, not cumulative, plus one for +Inf
+        self.counts = [0] * (buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, label_names)
+        self.buckets = buckets
+        self.values: dict[Labels, HistogramValue] = {}
+
+    def observe(self, labels: Labels, value: float):
+        item = self.values.get(labels)
+
+        if item is None:
+            item = self.values[labels] = HistogramValue(len(self.buckets))
+
+        item.counts[bisect.bisect_left(self.buckets, value)] += 1
+        item.count += 1
+        item.sum += value
+
+    def quantile(self, labels: Labels, q: float) -> float:
+        """
+        Estimate a quantile as the upper bound of the bucket it falls in.
+        """
+
+        item = self.values[labels]
+        rank = q * item.count
+        cumulative = 0
+
+        for bound, count in zip(self.buckets, item.counts):
+            cumulative += count
+
+            if cumulative >= rank:
+                return bound
+
+        return float("inf")
+
+    def samples(self):
+        bounds = self.buckets + (float("inf"),)
+
+        for labels, item in self.values.items():
+            cumulative = 0
+
+            for bound, count in zip(bounds, item.counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _format_labels(
+                        self.label_names, labels, le=_format_value(bound)
+                    ),
+                    cumulative,
+                )
+
+            label_str = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum", label_str, item.sum
+            yield f"{self.name}_count", label_str, item.count
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry = Registry()
+
+handler_seconds: Histogram = registry.register(
+    Histogram(
+        "sparta_handler_seconds",
+        "Time taken to run event listeners and commands.",
+        ("kind", "handler"),
+    )
+)
+handler_errors: Counter = registry.register(
+    Counter(
+        "sparta_handler_errors_total",
+        "Event listeners and commands that failed.",
+        ("kind", "handler"),
+    )
+)
+handlers_in_flight: Gauge = registry.register(
+    Gauge(
+        "sparta_handlers_in_flight",
+        "Event listeners and commands that are currently running.",
+        ("kind", "handler"),
+    )
+)
+
+
+@contextmanager
+def track(kind: str, handler: str) -> Iterator[None]:
+    """
+    Time a handler, and count it as failed if it raises.
+    """
+
+    labels = (kind, handler)
+    handlers_in_flight.inc(labels)
+    start = time.perf_counter()
+
+    try:
+        yield
+    except Exception:
+        handler_errors.inc(labels)
+        raise
+    finally:
+        handler_seconds.observe(labels, time.perf_counter() - start)
+        handlers_in_flight.dec(labels)
+
+
+def register_bot_gauges(bot):
+    """
+    Export the stats the bot already keeps about its event loop, shards,
+    database pool and Lavalink nodes.
+    """
+
+    def loop_lag() -> dict[Labels, float]:
+        return {
+            ("last",): bot.loop_lag.last_lag,
+            ("max",): bot.loop_lag.max_lag,
+        }
+
+    def shard_latency() -> dict[Labels, float]:
+        return {
+            (str(shard["id"]),): shard["latency"]
+            for shard in bot.shard_stats.report(bot)
+        }
+
+    def shard_guilds() -> dict[Labels, float]:
+        return {
+            (str(shard["id"]),): shard["guilds"]
+            for shard in bot.shard_stats.report(bot)
+        }
+
+    def db_pool() -> dict[Labels, float]:
+        stats = db.pool_stats()
+        return {
+            ("checked_out",): stats["checked_out"],
+            ("pooled",): stats["size"],
+            ("overflow",): max(stats["overflow"], 0),
+        }
+
+    def lavalink_players() -> dict[Labels, float]:
+        return {
+            (node["id"],): node["players"] for node in lavalink.pool.report()
+        }
+
+    def lavalink_connected() -> dict[Labels, float]:
+        return {
+            (node["id"],): node["connected"] for node in lavalink.pool.report()
+        }
+
+    def lavalink_load() -> dict[Labels, float]:
+        return {(node["id"],): node["load"] for node in lavalink.pool.report()}
+
+    registry.register(
+        CallbackGauge(
+            "sparta_loop_lag_seconds",
+            "How late the event loop ran a sleeping task.",
+            ("stat",),
+            loop_lag,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_shard_latency_seconds",
+            "Gateway heartbeat latency of each shard.",
+            ("shard",),
+            shard_latency,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_shard_guilds",
+            "Guilds handled by each shard.",
+            ("shard",),
+            shard_guilds,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_db_connections",
+            "Database connections of the pool.",
+            ("state",),
+            db_pool,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_lavalink_players",
+            "Music players on each Lavalink node.",
+            ("node",),
+            lavalink_players,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_lavalink_connected",
+            "Whether each Lavalink node is connected.",
+            ("node",),
+            lavalink_connected,
+        )
+    )
+    registry.register(
+        CallbackGauge(
+            "sparta_lavalink_load",
+            "Load of each Lavalink node, used to pick nodes for new players.",
+            ("node",),
+            lavalink_load,
+        )
+    )
+
+
+class MetricsServer:
+    """
+    Serves the metrics in the Prometheus text format at `/metrics`.
+    """
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._runner: web.AppRunner | None = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=registry.render(),
+            content_type="text/plain",
+            charset="utf-8",
+        )
+
+    async def start(self):
+        if self._runner is not None:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        try:
+            await web.TCPSite(self._runner, self.host, self.port).start()
+        except OSError as e:
+            print(f"Failed to start metrics server: {e!r}")
+            await self.stop()
+            return
+
+        print(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
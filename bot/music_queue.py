@@ -0,0 +1,145 @@
+import asyncio
+import itertools
+import random
+from collections import deque
+from typing import Generic, Iterable, Iterator, TypeVar
+
+from bot.enums import LoopMode
+
+T = TypeVar("T")
+
+
+class MusicQueue(Generic[T]):
+    """
+    Song queue of a guild. Upcoming tracks are kept in a deque that can be
+    viewed, sliced and rearranged in place, while the player waits on
+    `next` for the next track to play.
+
+    Args:
+        max_size (int, optional): Maximum number of upcoming tracks, 0 for
+            no limit. Defaults to 0.
+    """
+
+    def __init__(self, max_size: int = 0):
+        self.max_size = max_size
+        self.loop_mode = LoopMode.OFF
+        self.current: T | None = None
+        self._tracks: deque[T] = deque()
+        self._not_empty = asyncio.Event()
+        self._skip = False
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(self._tracks)
+
+    def __getitem__(self, index: int | slice) -> T | list[T]:
+        if isinstance(index, int):
+            return self._tracks[index]
+
+        # Only walks the deque up to the end of the slice
+        start, stop, step = index.indices(len(self._tracks))
+        return list(itertools.islice(self._tracks, start, stop, step))
+
+    def _changed(self):
+        if self._tracks:
+            self._not_empty.set()
+        else:
+            self._not_empty.clear()
+
+    @property
+    def space(self) -> int | None:
+        """
+        Number of tracks that can still be added, None if unlimited.
+        """
+
+        if not self.max_size:
+            return None
+
+        return max(self.max_size - len(self._tracks), 0)
+
+    def peek(self) -> T | None:
+        return self._tracks[0] if self._tracks else None
+
+    def put(self, track: T):
+        """
+        Add a track to the end of the queue.
+
+        Raises:
+            asyncio.QueueFull: The queue is full.
+        """
+
+        if self.space == 0:
+            raise asyncio.QueueFull
+
+        self._tracks.append(track)
+        self._changed()
+
+    def extend(self, tracks: Iterable[T]) -> int:
+        """
+        Add tracks to the end of the queue, until it's full. Returns the
+        number of tracks that were added.
+        """
+
+        if (space := self.space) is not None:
+            tracks = itertools.islice(tracks, space)
+
+        count = len(self._tracks)
+        self._tracks.extend(tracks)
+        self._changed()
+        return len(self._tracks) - count
+
+    def remove(self, index: int) -> T:
+        track = self._tracks[index]
+        del self._tracks[index]
+        self._changed()
+        return track
+
+    def move(self, index: int, new_index: int) -> T:
+        track = self._tracks[index]
+        del self._tracks[index]
+        self._tracks.insert(new_index, track)
+        return track
+
+    def shuffle(self):
+        tracks = list(self._tracks)
+        random.shuffle(tracks)
+        self._tracks = deque(tracks)
+
+    def clear(self):
+        self._tracks.clear()
+        self._changed()
+
+    def skip(self):
+        """
+        Make `next` move on from the current track, even when looping it.
+        """
+
+        self._skip = True
+
+    async def next(self) -> T:
+        """
+        Finish the current track and wait for the next one. Depending on
+        the loop mode, the finished track is played again or moved to the
+        end of the queue.
+        """
+
+        previous, self.current = self.current, None
+
+        if previous is not None:
+            if self.loop_mode is LoopMode.TRACK and not self._skip:
+                self._tracks.appendleft(previous)
+            elif self.loop_mode is LoopMode.QUEUE:
+                self._tracks.append(previous)
+
+            self._changed()
+
+        self._skip = False
+
+        while not self._tracks:
+            await self._not_empty.wait()
+
+        self.current = self._tracks.popleft()
+        self._changed()
+        return self.current
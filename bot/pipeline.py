@@ -0,0 +1,76 @@
+import traceback
+from typing import Any, Awaitable, Callable
+
+import discord
+
+from bot import cache, metrics
+from bot.db import models
+
+
+class MessageContext:
+    """
+    State shared by the stages handling a message.
+
+    Args:
+        message (discord.Message): The message being handled.
+        guild_config (models.Guild | None): Settings of the message's
+            server, None in DMs.
+    """
+
+    def __init__(
+        self, message: discord.Message, guild_config: models.Guild | None
+    ):
+        self.message = message
+        self.guild_config = guild_config
+        self.stopped = False
+
+    def stop(self):
+        """
+        Skip the remaining stages, e.g. after the message was deleted.
+        """
+
+        self.stopped = True
+
+
+MessageStageHandler = Callable[[MessageContext], Awaitable[Any]]
+
+
+class MessagePipeline:
+    """
+    Handles every message with one listener. Messages from bots are
+    ignored, and the server's settings are loaded once and shared by the
+    stages, which run in order until one of them stops the message.
+    Stages are registered by cogs, with their order from `MessageStage`.
+    """
+
+    def __init__(self):
+        self._stages: list[tuple[int, str, MessageStageHandler]] = []
+
+    def add_stage(self, order: int, handler: MessageStageHandler):
+        self._stages.append((order, handler.__qualname__, handler))
+        self._stages.sort(key=lambda stage: stage[0])
+
+    def remove_stage(self, handler: MessageStageHandler):
+        self._stages = [stage for stage in self._stages if stage[2] != handler]
+
+    async def run(self, message: discord.Message):
+        if message.author.bot:
+            return
+
+        guild_config = (
+            await cache.guilds.get(message.guild.id) if message.guild else None
+        )
+        ctx = MessageContext(message, guild_config)
+
+        for _, name, handler in self._stages:
+            # A failing stage shouldn't stop the others, same as when they
+            # were separate listeners
+            try:
+                with metrics.track("message_stage", name):
+                    await handler(ctx)
+            except Exception:
+                print(f"Ignoring exception in message stage {name}:")
+                traceback.print_exc()
+
+            if ctx.stopped:
+                return
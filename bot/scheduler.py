@@ -0,0 +1,341 @@
+import asyncio
+import heapq
+import itertools
+import os
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import tuple_
+from sqlalchemy.future import select
+
+from bot import db, invalidation
+
+JobHandler = Callable[[str], Awaitable[Any]]
+
+
+class Scheduler:
+    """
+    Runs jobs at the time they are due, from a single timer task. Jobs of
+    persistent kinds are rows of a table with `id` and `due` columns, and
+    only the ones due within `horizon` are kept in memory. The rest are
+    paged in from the database as the horizon moves forward.
+
+    When several processes share the database, a persistent kind can be
+    limited to the rows a process runs, e.g. the guilds on its shards. Jobs
+    of such kinds are handed over the invalidation bus to the process that
+    runs them, whichever process scheduled them.
+
+    Jobs whose handler raises are retried after `retry_delay` seconds,
+    doubled on every attempt, until they have been tried `max_attempts`
+    times. Persistent jobs that still fail are left in their table, and run
+    again when the scheduler is restarted.
+
+    Args:
+        horizon (timedelta): How far ahead to load persistent jobs.
+        page_size (int, optional): Number of jobs to load per query.
+            Defaults to 500.
+        retry_delay (float, optional): Seconds before the first retry of a
+            failed job. Defaults to 30.
+        max_attempts (int, optional): Number of times a job is tried.
+            Defaults to 6.
+    """
+
+    topic = "scheduled_jobs"
+
+    def __init__(
+        self,
+        horizon: timedelta,
+        page_size: int = 500,
+        bus: invalidation.LocalBus | None = None,
+        retry_delay: float = 30,
+        max_attempts: int = 6,
+    ):
+        self.horizon = horizon
+        self.page_size = page_size
+        self.retry_delay = retry_delay
+        self.max_attempts = max_attempts
+        self._handlers: dict[str, JobHandler] = {}
+        self._models: dict[str, Any] = {}
+        self._filters: dict[str, Any] = {}
+        self._heap: list[tuple[datetime, int, str, str]] = []
+        self._jobs: dict[tuple[str, str], datetime] = {}
+        self._counter = itertools.count()
+        self._attempts: dict[tuple[str, str], int] = {}
+        # Jobs whose handler is running or waiting to be retried. Their rows
+        # are only deleted once the handler is done, so loads still see them.
+        self._running: set[tuple[str, str]] = set()
+        self._loaded_until: datetime | None = None
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.bus = bus or invalidation.bus
+        self.bus.subscribe(self.topic, self._on_published)
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    def register(
+        self,
+        kind: str,
+        handler: JobHandler,
+        model: Any = None,
+        where: Any = None,
+    ):
+        """
+        Register the handler of a kind of job. The handler is called with
+        the job's ID when it's due. When a model is given, the jobs of this
+        kind are loaded from its table, only the rows matching `where` if
+        it's given.
+        """
+
+        if kind in self._handlers:
+            raise ValueError(
+                f"A handler for {kind} jobs is already registered"
+            )
+
+        self._handlers[kind] = handler
+
+        if model is not None:
+            self._models[kind] = model
+
+            if where is not None:
+                self._filters[kind] = where
+
+    def schedule(self, kind: str, job_id: str, due: datetime):
+        """
+        Schedule a job. Jobs of persistent kinds must be committed to their
+        table first, and are only kept in memory if they are due before the
+        end of the loaded horizon.
+        """
+
+        if kind in self._filters:
+            self._spawn(self._claim(kind, job_id))
+            self._spawn(self.bus.publish(self.topic, f"{kind}:{job_id}"))
+            return
+
+        if kind in self._models and (
+            self._loaded_until is None or due > self._loaded_until
+        ):
+            return
+
+        self._push(kind, job_id, due)
+
+    def cancel(self, kind: str, job_id: str):
+        key = (kind, job_id)
+
+        # A job waiting to be retried is in memory, unlike a running one
+        if self._jobs.pop(key, None) is not None:
+            self._running.discard(key)
+            self._attempts.pop(key, None)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(self._run_background(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_background(self, coro):
+        try:
+            await coro
+        except Exception as e:
+            print(f"Scheduler task failed: {e!r}")
+
+    async def _claim(self, kind: str, job_id: str):
+        """
+        Keep a job in memory if this process runs it and it's due within
+        the loaded horizon.
+        """
+
+        model = self._models[kind]
+        q = select(model.id, model.due).where(
+            model.id == job_id, self._filters[kind]
+        )
+
+        async with db.async_session() as session:
+            row = (await session.execute(q)).first()
+
+        if row and self._loaded_until and row.due <= self._loaded_until:
+            self._push(kind, row.id, row.due)
+
+    def _on_published(self, key: str | None):
+        if key is None:
+            # Jobs scheduled while the bus was disconnected were missed
+            return self._reload()
+
+        kind, _, job_id = key.partition(":")
+
+        if kind in self._filters:
+            return self._claim(kind, job_id)
+
+    async def _reload(self):
+        if self._loaded_until is None:
+            return
+
+        for kind in self._models:
+            await self._load(kind, None, self._loaded_until)
+
+    def _push(
+        self, kind: str, job_id: str, due: datetime, retry: bool = False
+    ):
+        key = (kind, job_id)
+
+        if self._jobs.get(key) == due or (key in self._running and not retry):
+            return
+
+        self._jobs[key] = due
+        heapq.heappush(self._heap, (due, next(self._counter), kind, job_id))
+
+        if self._heap[0][2:] == key:
+            self._wakeup.set()
+
+    async def _load(self, kind: str, start: datetime | None, end: datetime):
+        """
+        Stream the jobs of a kind due in (start, end] into the heap, a page
+        at a time in order of due time, so a large backlog never has to be
+        held in memory at once.
+        """
+
+        model = self._models[kind]
+        after: tuple[datetime, str] | None = None
+
+        while True:
+            q = (
+                select(model.id, model.due)
+                .where(model.due <= end)
+                .order_by(model.due, model.id)
+                .limit(self.page_size)
+            )
+
+            if kind in self._filters:
+                q = q.where(self._filters[kind])
+
+            if after is not None:
+                q = q.where(tuple_(model.due, model.id) > tuple_(*after))
+            elif start is not None:
+                q = q.where(model.due > start)
+
+            count = 0
+
+            async with db.async_session() as session:
+                result = await session.stream(q)
+
+                async for job_id, due in result:
+                    self._push(kind, job_id, due)
+                    after = (due, job_id)
+                    count += 1
+
+            if count < self.page_size:
+                return
+
+    async def _extend_horizon(self):
+        start = self._loaded_until
+        end = datetime.now() + self.horizon
+
+        # Jobs scheduled while loading are within the new horizon, so they're
+        # kept in memory even if the query doesn't see them
+        self._loaded_until = end
+
+        try:
+            for kind in self._models:
+                await self._load(kind, start, end)
+        except Exception:
+            # Load the whole window again next time, already loaded jobs are
+            # deduplicated
+            self._loaded_until = start
+            raise
+
+    async def _run_job(self, kind: str, job_id: str):
+        key = (kind, job_id)
+
+        try:
+            await self._handlers[kind](job_id)
+        except Exception as e:
+            attempts = self._attempts.get(key, 0) + 1
+
+            if attempts < self.max_attempts:
+                self._attempts[key] = attempts
+                delay = self.retry_delay * 2 ** (attempts - 1)
+                print(
+                    f"Scheduled {kind} job {job_id} failed, retrying in "
+                    f"{delay:.0f}s: {e!r}"
+                )
+                self._push(
+                    kind,
+                    job_id,
+                    datetime.now() + timedelta(seconds=delay),
+                    retry=True,
+                )
+                return
+
+            print(
+                f"Scheduled {kind} job {job_id} failed {attempts} times, "
+                f"giving up: {e!r}"
+            )
+
+        self._attempts.pop(key, None)
+        self._running.discard(key)
+
+    async def _run(self, wait_until: Callable[[], Awaitable[Any]] | None):
+        if wait_until is not None:
+            # Handlers need the client's cache, e.g. to find a mute's guild
+            await wait_until()
+
+        refresh_interval = self.horizon / 2
+        next_refresh = datetime.now()
+
+        while True:
+            now = datetime.now()
+
+            if now >= next_refresh:
+                try:
+                    await self._extend_horizon()
+                    next_refresh = now + refresh_interval
+                except Exception as e:
+                    print(f"Failed to load scheduled jobs: {e!r}")
+                    next_refresh = now + timedelta(seconds=30)
+
+            while self._heap and self._heap[0][0] <= now:
+                due, _, kind, job_id = heapq.heappop(self._heap)
+
+                # Skip jobs that were cancelled or rescheduled
+                if self._jobs.get((kind, job_id)) != due:
+                    continue
+
+                del self._jobs[(kind, job_id)]
+                self._running.add((kind, job_id))
+                self._spawn(self._run_job(kind, job_id))
+
+            wake_at = next_refresh
+
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+
+            self._wakeup.clear()
+
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    (wake_at - datetime.now()).total_seconds(),
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, wait_until: Callable[[], Awaitable[Any]] | None = None):
+        """
+        Start running jobs, loading the persistent ones in the background.
+        When `wait_until` is given, no job is loaded or run until it
+        returns. Does nothing if the scheduler is already running, so it's
+        safe to call on every reconnect.
+        """
+
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(wait_until))
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+SCHEDULER_HORIZON = timedelta(
+    seconds=float(os.getenv("SCHEDULER_HORIZON", 3600))
+)
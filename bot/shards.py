@@ -0,0 +1,190 @@
+import asyncio
+import os
+import time
+from collections import Counter, deque
+from typing import Any
+
+import discord
+from sqlalchemy import false, true
+
+SHARD_COUNT = (
+    int(os.environ["SHARD_COUNT"]) if os.getenv("SHARD_COUNT") else None
+)
+SHARD_IDS = (
+    list(map(int, os.environ["SHARD_IDS"].split(",")))
+    if os.getenv("SHARD_IDS")
+    else None
+)
+
+# Set by the cluster launcher in run.py
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", 0))
+CLUSTERED = "CLUSTER_ID" in os.environ
+
+
+def owns_guild(guild_id: int) -> bool:
+    """
+    Whether the guild is on one of the shards this process runs.
+    """
+
+    if SHARD_COUNT is None or SHARD_IDS is None:
+        return True
+
+    return (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
+
+
+def guild_filter(column) -> Any:
+    """
+    SQL condition for the rows of a guild ID column whose guilds are on the
+    shards this process runs, None when it runs every shard.
+    """
+
+    if SHARD_COUNT is None or SHARD_IDS is None:
+        return None
+
+    return (column.op(">>")(22) % SHARD_COUNT).in_(SHARD_IDS)
+
+
+def first_cluster_filter() -> Any:
+    """
+    SQL condition for rows that aren't tied to a guild, which only the first
+    cluster runs, None when not clustered.
+    """
+
+    if not CLUSTERED:
+        return None
+
+    return true() if CLUSTER_ID == 0 else false()
+
+
+class EventRate:
+    """
+    Counts events in one second buckets, to get the rate of events over the
+    last `window` seconds without keeping a timestamp per event.
+
+    Args:
+        window (int, optional): Number of seconds to average over.
+            Defaults to 60.
+    """
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.total = 0
+        self._buckets: deque[list[int]] = deque()
+
+    def record(self, now: float | None = None):
+        second = int(time.monotonic() if now is None else now)
+        self.total += 1
+
+        if self._buckets and self._buckets[-1][0] == second:
+            self._buckets[-1][1] += 1
+        else:
+            self._buckets.append([second, 1])
+            self._expire(second)
+
+    def _expire(self, second: int):
+        while self._buckets and self._buckets[0][0] <= second - self.window:
+            self._buckets.popleft()
+
+    def rate(self, now: float | None = None) -> float:
+        """
+        Get the average number of events per second over the window.
+        """
+
+        second = int(time.monotonic() if now is None else now)
+        self._expire(second)
+        return sum(count for _, count in self._buckets) / self.window
+
+
+class ShardStats:
+    """
+    Gateway event rates of each shard. The rates are counted by wrapping
+    the dispatch function of each shard's websocket, since the events the
+    library dispatches don't say which shard they came from.
+
+    Args:
+        window (int, optional): Number of seconds to average event rates
+            over. Defaults to 60.
+    """
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self._rates: dict[int, EventRate] = {}
+
+    def record(self, shard_id: int):
+        rate = self._rates.get(shard_id)
+
+        if rate is None:
+            rate = self._rates[shard_id] = EventRate(self.window)
+
+        rate.record()
+
+    def rate(self, shard_id: int) -> float:
+        rate = self._rates.get(shard_id)
+        return rate.rate() if rate else 0.0
+
+    def watch(self, shard: discord.ShardInfo):
+        """
+        Count the events received by a shard's websocket. Has to be called
+        every time the shard connects, since reconnecting replaces the
+        websocket.
+        """
+
+        # ShardInfo doesn't expose the websocket
+        ws = shard._parent.ws
+        shard_id = shard.id
+        dispatch = ws._dispatch
+
+        if getattr(dispatch, "__shard_stats__", None) is self:
+            return
+
+        def counting_dispatch(event: str, *args, **kwargs):
+            if event == "socket_event_type":
+                self.record(shard_id)
+
+            dispatch(event, *args, **kwargs)
+
+        counting_dispatch.__shard_stats__ = self
+        ws._dispatch = counting_dispatch
+
+    def report(self, bot: discord.AutoShardedClient) -> list[dict[str, Any]]:
+        """
+        Get the latency, event rate, guild count and state of each of the
+        bot's shards.
+        """
+
+        guild_counts = Counter(guild.shard_id for guild in bot.guilds)
+
+        return [
+            {
+                "id": shard_id,
+                "latency": shard.latency,
+                "event_rate": self.rate(shard_id),
+                "events": (
+                    self._rates[shard_id].total
+                    if shard_id in self._rates
+                    else 0
+                ),
+                "guilds": guild_counts[shard_id],
+                "closed": shard.is_closed(),
+            }
+            for shard_id, shard in sorted(bot.shards.items())
+        ]
+
+
+async def report_stats(bot, stats, interval: float = 10):
+    """
+    Periodically send the bot's shard stats to the cluster launcher, as
+    `(cluster_id, stats)` tuples on the given multiprocessing queue.
+    """
+
+    while True:
+        stats.put(
+            (
+                bot.cluster_id,
+                {
+                    "guilds": len(bot.guilds),
+                    "shards": bot.shard_stats.report(bot),
+                },
+            )
+        )
+        await asyncio.sleep(interval)
@@ -1,11 +1,10 @@
 import asyncio
 import discord
 from discord.ext import commands
-from sqlalchemy.future import select
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from bot import db
-from bot.db import models
+from bot import MyBot, cache
+from bot.enums import MessageStage
+from bot.pipeline import MessageContext
 
 
 class SlashAFK(commands.Cog):
@@ -13,30 +12,30 @@ class SlashAFK(commands.Cog):
     Manage your AFK status
     """
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: MyBot):
         self.bot = bot
+        bot.loop.create_task(cache.afk.load())
+        bot.message_pipeline.add_stage(MessageStage.AFK, self.afk_stage)
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage(self.afk_stage)
 
     async def process_afk(self, message: discord.Message):
-        async def run_afk(session: AsyncSession, member: discord.Member):
-            q = select(models.AFK).where(models.AFK.user_id == member.id)
-            result = await session.execute(q)
-
-            if afk_data := result.scalar():
-                await message.channel.send(
-                    f"{member} is currently AFK because:\n*{afk_data.message}*",
-                    allowed_mentions=discord.AllowedMentions.none(),
-                )
-
-        async with db.async_session() as session:
-            afk_tasks = [
-                run_afk(session, member) for member in message.mentions
-            ]
-            await asyncio.gather(*afk_tasks)
-
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author != self.bot.user:
-            await self.process_afk(message)
+        mentioned = {member.id: member for member in message.mentions}
+        afk_messages = await cache.afk.get_messages(mentioned)
+
+        afk_tasks = [
+            message.channel.send(
+                f"{mentioned[user_id]} is currently AFK because:\n*{afk_msg}*",
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+            for user_id, afk_msg in afk_messages.items()
+        ]
+        await asyncio.gather(*afk_tasks)
+
+    async def afk_stage(self, ctx: MessageContext):
+        if ctx.message.mentions:
+            await self.process_afk(ctx.message)
 
 
 def setup(bot):
@@ -1,11 +1,13 @@
-import asyncio
 import discord
 from uuid import uuid4
 from discord.ext import commands
+from sqlalchemy import delete
 from sqlalchemy.future import select
 
-from bot import TESTING_GUILDS, THEME, db
+from bot import TESTING_GUILDS, THEME, MyBot, cache, db
 from bot.db import models
+from bot.enums import AutoResponseMatch, MessageStage
+from bot.pipeline import MessageContext
 from bot.utils import dbl_vote_required
 from bot.views import ConfirmView
 
@@ -15,27 +17,26 @@ class SlashAutoResponse(commands.Cog):
     Commands to make Sparta automatically reply to certain phrases
     """
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
+    def __init__(self, bot: MyBot):
+        self.bot = bot
+        bot.message_pipeline.add_stage(
+            MessageStage.AUTO_RESPONSE, self.auto_response_stage
+        )
 
-        content: str = message.content
-        channel: discord.TextChannel = message.channel
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage(self.auto_response_stage)
 
-        async with db.async_session() as session:
-            q = (
-                select(models.AutoResponse)
-                .where(models.AutoResponse.guild_id == message.guild.id)
-                .where(models.AutoResponse.activation == content)
-            )
-            results = await session.execute(q)
-            auto_resp: models.AutoResponse | None = results.scalar()
+    async def auto_response_stage(self, ctx: MessageContext):
+        message = ctx.message
 
-        if not auto_resp:
+        if not message.guild:
             return
 
-        response = auto_resp.response
+        channel: discord.TextChannel = message.channel
+        matcher = await cache.auto_responses.get(message.guild.id)
+
+        if not matcher or not (response := matcher.match(message.content)):
+            return
 
         # Auto Response Variables
         response = response.replace("[member]", str(message.author))
@@ -48,15 +49,25 @@ class SlashAutoResponse(commands.Cog):
 
     @dbl_vote_required()
     @commands.slash_command(name="addautoresponse", guild_ids=TESTING_GUILDS)
+    @discord.option(
+        "match",
+        description="How the activation phrase is matched against messages",
+        choices=[m.name.lower() for m in AutoResponseMatch],
+        default=AutoResponseMatch.EXACT.name.lower(),
+    )
     @commands.has_guild_permissions(administrator=True)
     async def add_auto_response(
-        self, ctx: discord.ApplicationContext, activation: str, response: str
+        self,
+        ctx: discord.ApplicationContext,
+        activation: str,
+        response: str,
+        match: str = AutoResponseMatch.EXACT.name.lower(),
     ):
         """
         Add an auto response phrase. Variables you can use: [member], [nick], [name]
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = (
                 select(models.AutoResponse)
                 .where(models.AutoResponse.guild_id == ctx.guild.id)
@@ -75,6 +86,7 @@ class SlashAutoResponse(commands.Cog):
 
                 if confirm_view.do_action:
                     duplicate_auto_resp.response = response
+                    duplicate_auto_resp.match_mode = match
                     ar_id = duplicate_auto_resp.id
                 else:
                     return
@@ -85,16 +97,21 @@ class SlashAutoResponse(commands.Cog):
                     guild_id=ctx.guild.id,
                     activation=activation,
                     response=response,
+                    match_mode=match,
                 )
                 session.add(new_auto_resp)
                 ar_id = new_auto_resp.id
 
             await session.commit()
 
+        cache.auto_responses.invalidate(ctx.guild.id)
+        await cache.auto_responses.publish(ctx.guild.id)
+
         ar_embed = discord.Embed(title="New Auto Response", color=THEME)
         ar_embed.add_field(name="ID", value=ar_id, inline=False)
         ar_embed.add_field(name="Activation", value=activation, inline=False)
         ar_embed.add_field(name="Response", value=response, inline=False)
+        ar_embed.add_field(name="Match", value=match.title(), inline=False)
         await ctx.respond(embed=ar_embed)
 
     @commands.slash_command(
@@ -109,7 +126,7 @@ class SlashAutoResponse(commands.Cog):
         """
 
         if id:
-            async with db.async_session() as session:
+            async with db.scoped_session() as session:
                 auto_resp: models.AutoResponse | None = await session.get(
                     models.AutoResponse, id
                 )
@@ -123,6 +140,9 @@ class SlashAutoResponse(commands.Cog):
                 await session.delete(auto_resp)
                 await session.commit()
 
+            cache.auto_responses.invalidate(auto_resp.guild_id)
+            await cache.auto_responses.publish(auto_resp.guild_id)
+
             ar_embed = discord.Embed(
                 title="Deleted Auto Response", color=THEME
             )
@@ -146,17 +166,19 @@ class SlashAutoResponse(commands.Cog):
             await confirm_view.wait()
 
             if confirm_view.do_action:
-                async with db.async_session() as session:
-                    q = select(models.AutoResponse).where(
+                async with db.scoped_session() as session:
+                    q = delete(models.AutoResponse).where(
                         models.AutoResponse.guild_id == ctx.guild.id
                     )
-                    results = await session.execute(q)
-                    tasks = [session.delete(r) for r in results.scalars()]
-                    await asyncio.gather(*tasks)
+                    result = await session.execute(q)
                     await session.commit()
 
+                cache.auto_responses.invalidate(ctx.guild.id)
+                await cache.auto_responses.publish(ctx.guild.id)
+
                 await ctx.respond(
-                    "All auto responses in this server have been deleted"
+                    f"All {result.rowcount} auto responses in this server "
+                    "have been deleted"
                 )
 
     @commands.slash_command(name="viewautoresponses", guild_ids=TESTING_GUILDS)
@@ -165,7 +187,7 @@ class SlashAutoResponse(commands.Cog):
         See all the auto responses in the server
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.AutoResponse).where(
                 models.AutoResponse.guild_id == ctx.guild.id
             )
@@ -179,7 +201,9 @@ class SlashAutoResponse(commands.Cog):
 
             for ar in auto_resps:
                 field_value = (
-                    f"Activation: `{ar.activation}`\nResponse: `{ar.response}`"
+                    f"Activation: `{ar.activation}`\n"
+                    f"Response: `{ar.response}`\n"
+                    f"Match: `{ar.match_mode}`"
                 )
                 auto_resps_embed.add_field(
                     name=ar.id, value=field_value, inline=False
@@ -192,4 +216,4 @@ class SlashAutoResponse(commands.Cog):
 
 
 def setup(bot):
-    bot.add_cog(SlashAutoResponse())
+    bot.add_cog(SlashAutoResponse(bot))
@@ -1,12 +1,13 @@
 import re
 import discord
-from datetime import datetime
 from discord.ext import commands
 from discord.utils import _URL_REGEX
 
-from bot import TESTING_GUILDS, THEME, db
+from bot import TESTING_GUILDS, THEME, MyBot, cache, db
 from bot.db import models
-from bot.enums import AutoModFeatures
+from bot.enums import AutoModFeatures, MessageStage
+from bot.pipeline import MessageContext
+from bot.spam import MentionSpamDetector
 from bot.views import AutoModView
 
 
@@ -15,8 +16,15 @@ class SlashAutoMod(commands.Cog):
     Commands to setup Auto-Mod in Sparta
     """
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: MyBot):
         self.bot = bot
+        self.mention_spam = MentionSpamDetector()
+        bot.message_pipeline.add_stage(
+            MessageStage.AUTOMOD, self.automod_stage
+        )
+
+    def cog_unload(self):
+        self.bot.message_pipeline.remove_stage(self.automod_stage)
 
     @commands.slash_command(guild_ids=TESTING_GUILDS)
     @commands.has_guild_permissions(administrator=True)
@@ -25,7 +33,7 @@ class SlashAutoMod(commands.Cog):
         Allows you to enable/disable automod features
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             auto_mod_data = await session.get(models.AutoMod, ctx.guild.id)
 
             if not auto_mod_data:
@@ -67,28 +75,19 @@ class SlashAutoMod(commands.Cog):
 
             await session.commit()
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if not message.guild or message.author.bot:
+        cache.automod.put(ctx.guild.id, auto_mod_data)
+        await cache.automod.publish(ctx.guild.id)
+
+    async def automod_stage(self, ctx: MessageContext):
+        message = ctx.message
+
+        if not message.guild:
             return
 
-        def ping_spam_check(msg: discord.Message) -> bool:
-            return (
-                (msg.author == message.author)
-                and msg.mentions
-                and message.mentions
-                and (
-                    datetime.utcnow().replace(tzinfo=msg.created_at.tzinfo)
-                    - msg.created_at
-                ).seconds
-                < 5
-            )
+        auto_mod = await cache.automod.get(message.guild.id)
 
-        async with db.async_session() as session:
-            if data := await session.get(models.AutoMod, message.guild.id):
-                auto_mod: models.AutoMod = data
-            else:
-                return
+        if not auto_mod:
+            return
 
         if auto_mod.links:
             if re.search(_URL_REGEX, message.content):
@@ -98,6 +97,8 @@ class SlashAutoMod(commands.Cog):
                     "in this channel!",
                     delete_after=3,
                 )
+                ctx.stop()
+                return
 
         if auto_mod.images:
             if any([hasattr(a, "width") for a in message.attachments]):
@@ -107,9 +108,11 @@ class SlashAutoMod(commands.Cog):
                     "in this channel!",
                     delete_after=3,
                 )
+                ctx.stop()
+                return
 
-        if auto_mod.ping_spam:
-            if any(filter(ping_spam_check, self.bot.cached_messages)):
+        if auto_mod.ping_spam and message.mentions:
+            if self.mention_spam.hit(message.guild.id, message.author.id):
                 await message.channel.send(
                     f"{message.author.mention}, Do not spam mentions "
                     "in this channel!",
@@ -3,10 +3,11 @@ import random
 import string
 import pyfiglet
 import discord
+from datetime import datetime, timedelta
 from discord.ext import commands
 from uuid import uuid4
 
-from bot import THEME, TESTING_GUILDS, db
+from bot import THEME, TESTING_GUILDS, MyBot, db
 from bot.db import models
 from bot.views import PollView
 
@@ -52,6 +53,15 @@ class SlashFun(commands.Cog):
         "*": ":asterisk:",
     }
 
+    def __init__(self, bot: MyBot):
+        self.bot = bot
+        self.polls: dict[str, PollView] = {}
+        bot.scheduler.register("poll", self.end_poll)
+
+    async def end_poll(self, poll_id: str):
+        if poll_view := self.polls.pop(poll_id, None):
+            poll_view.stop()
+
     @commands.slash_command(guild_ids=TESTING_GUILDS)
     async def poll(
         self,
@@ -107,6 +117,12 @@ class SlashFun(commands.Cog):
         poll_view = PollView(options, length)
         msg = await ctx.respond(embed=poll_embed, view=poll_view)
 
+        poll_id = uuid4().hex
+        self.polls[poll_id] = poll_view
+        self.bot.scheduler.schedule(
+            "poll", poll_id, datetime.now() + timedelta(minutes=length)
+        )
+
         if isinstance(msg, discord.Interaction):
             reference = (await msg.original_message()).to_reference(
                 fail_if_not_exists=False
@@ -115,6 +131,8 @@ class SlashFun(commands.Cog):
             reference = msg.to_reference(fail_if_not_exists=False)
 
         await poll_view.wait()
+        self.polls.pop(poll_id, None)
+        self.bot.scheduler.cancel("poll", poll_id)
 
         sorted_votes = sorted(
             list(poll_view.votes.items()), key=lambda x: x[1], reverse=True
@@ -263,7 +281,7 @@ class SlashFun(commands.Cog):
 
         await ctx.defer(ephemeral=True)
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             webhook_data: models.Webhook = await session.get(
                 models.Webhook, ctx.channel.id
             )
@@ -302,7 +320,7 @@ class SlashFun(commands.Cog):
             wait=True,
         )
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             new_imp_log = models.ImpersonationLog(
                 id=uuid4().hex,
                 guild_id=ctx.guild_id,
@@ -319,4 +337,4 @@ class SlashFun(commands.Cog):
 
 
 def setup(bot):
-    bot.add_cog(SlashFun())
+    bot.add_cog(SlashFun(bot))
@@ -1,11 +1,9 @@
-import asyncio
 import uuid
 import discord
 from datetime import datetime
 from discord.ext import commands
-from sqlalchemy.future import select
 
-from bot import TESTING_GUILDS, THEME, db
+from bot import TESTING_GUILDS, THEME, MyBot, cache, db, shards
 from bot.db import models
 from bot.utils import str_time_to_timedelta
 from bot.views import SuggestView
@@ -17,67 +15,40 @@ class SlashMiscellaneous(commands.Cog):
     """
 
     launched_at = int(datetime.now().timestamp())
-    reminders_loaded = False
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: MyBot):
         self.bot = bot
-
-    async def reminder(
-        self,
-        reminder_id: str,
-        user_id: discord.User,
-        seconds: float,
-        reminder_msg: str,
-        reminder_start_time: datetime,
-    ):
-        await asyncio.sleep(seconds)
-        rem_start_time_str = f"<t:{int(reminder_start_time.timestamp())}:R>"
-
-        try:
-            user = await self.bot.fetch_user(user_id)
-            await user.send(
-                f"You asked me to remind you {rem_start_time_str} about:"
-                f"\n*{reminder_msg}*",
-                allowed_mentions=discord.AllowedMentions.none(),
-            )
-        except discord.Forbidden:
-            pass
-
-        async with db.async_session() as session:
-            rem_data = await session.get(models.Reminder, reminder_id)
-            await session.delete(rem_data)
-            await session.commit()
-
-    def load_reminder(self, reminder_data: models.Reminder):
-        now = datetime.now()
-        time_diff = (reminder_data.due - now).total_seconds()
-
-        asyncio.create_task(
-            self.reminder(
-                reminder_data.id,
-                reminder_data.user_id,
-                time_diff,
-                reminder_data.message,
-                reminder_data.start,
-            )
+        # Reminders aren't tied to a guild, so the first cluster sends them
+        bot.scheduler.register(
+            "reminder",
+            self.send_reminder,
+            model=models.Reminder,
+            where=shards.first_cluster_filter(),
         )
 
-    async def load_pending_reminders(self):
-        print("Loading pending reminders...")
+    async def send_reminder(self, reminder_id: str):
+        async with db.scoped_session() as session:
+            reminder: models.Reminder | None = await session.get(
+                models.Reminder, reminder_id
+            )
 
-        async with db.async_session() as session:
-            q = select(models.Reminder)
-            result = await session.execute(q)
+            if not reminder:
+                return
 
-            for reminder in result.scalars():
-                self.load_reminder(reminder)
+            rem_start_time_str = f"<t:{int(reminder.start.timestamp())}:R>"
 
-        self.reminders_loaded = True  # TODO: Make this globally accessible
-        print("Loaded reminders!")
+            try:
+                user = await self.bot.fetch_user(reminder.user_id)
+                await user.send(
+                    f"You asked me to remind you {rem_start_time_str} about:"
+                    f"\n*{reminder.message}*",
+                    allowed_mentions=discord.AllowedMentions.none(),
+                )
+            except discord.Forbidden:
+                pass
 
-    @commands.Cog.listener()
-    async def on_ready(self):
-        await self.load_pending_reminders()
+            await session.delete(reminder)
+            await session.commit()
 
     @commands.slash_command(guild_ids=TESTING_GUILDS)
     async def info(self, ctx: discord.ApplicationContext):
@@ -86,7 +57,7 @@ class SlashMiscellaneous(commands.Cog):
         """
 
         ping = int(self.bot.latency * 1000)
-        guild_count = str(len(self.bot.guilds))
+        guild_count = str(self.bot.guild_count())
         total_members = set()
 
         for guild in self.bot.guilds:
@@ -179,14 +150,6 @@ class SlashMiscellaneous(commands.Cog):
         Set a reminder. Example: /remind 1d 2h 12m 5s make lunch (All time options are not required)
         """
 
-        # Wait till bot finishes loading all reminders
-        # Prevents duplicate reminders
-        if not self.reminders_loaded:
-            await ctx.respond(
-                "The bot is starting up. Please try again in a few minutes."
-            )
-            return
-
         now = datetime.now()
         remind_timedelta = str_time_to_timedelta(remind_time)
         time_to_end = f"<t:{int((now + remind_timedelta).timestamp())}>"
@@ -199,12 +162,15 @@ class SlashMiscellaneous(commands.Cog):
             start=now,
             due=now + remind_timedelta,
         )
-        self.load_reminder(new_reminder)
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             session.add(new_reminder)
             await session.commit()
 
+        self.bot.scheduler.schedule(
+            "reminder", reminder_id.hex, new_reminder.due
+        )
+
         await ctx.respond(
             f"Reminder set for {time_to_end} about:\n{message}",
             allowed_mentions=discord.AllowedMentions.none(),
@@ -216,7 +182,7 @@ class SlashMiscellaneous(commands.Cog):
         Sets your AFK status
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             afk_data: models.AFK | None = await session.get(
                 models.AFK, ctx.author.id
             )
@@ -231,6 +197,9 @@ class SlashMiscellaneous(commands.Cog):
 
             await session.commit()
 
+        cache.afk.add(ctx.author.id)
+        await cache.afk.publish(ctx.author.id)
+
         await ctx.respond(
             f"You have been AFK'd for the following reason:\n{reason}",
             allowed_mentions=discord.AllowedMentions.none(),
@@ -242,7 +211,7 @@ class SlashMiscellaneous(commands.Cog):
         Unset your AFK status
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             afk_data: models.AFK | None = await session.get(
                 models.AFK, ctx.author.id
             )
@@ -250,6 +219,8 @@ class SlashMiscellaneous(commands.Cog):
             if afk_data:
                 await session.delete(afk_data)
                 await session.commit()
+                cache.afk.discard(ctx.author.id)
+                await cache.afk.publish(ctx.author.id)
                 await ctx.respond("You are no longer AFK'd")
             else:
                 await ctx.respond("You are not currently AFK'd")
@@ -1,15 +1,16 @@
 import asyncio
 import random
 import math
-import time
 import discord
+from datetime import datetime
 from typing import Sequence
 from uuid import uuid4
 from discord.errors import HTTPException
 from discord.ext import commands
+from sqlalchemy import delete
 from sqlalchemy.future import select
 
-from bot import TESTING_GUILDS, THEME, db
+from bot import TESTING_GUILDS, THEME, MyBot, cache, db, shards
 from bot import views
 from bot.db import models
 from bot.utils import str_time_to_timedelta
@@ -21,6 +22,16 @@ class SlashModeration(commands.Cog):
     Commands to uphold the peace and integrity of the server
     """
 
+    def __init__(self, bot: MyBot):
+        self.bot = bot
+        # Mutes are ended by the cluster whose shards have their guild
+        bot.scheduler.register(
+            "temp_mute",
+            self.end_temp_mute,
+            model=models.TempMute,
+            where=shards.guild_filter(models.TempMute.guild_id),
+        )
+
     async def create_mute_role(self, guild: discord.Guild) -> discord.Role:
         print(f"Creating new mute role for server {guild.name}")
 
@@ -46,37 +57,13 @@ class SlashModeration(commands.Cog):
             await category.set_permissions(mute_role, send_messages=False)
 
         # Add new mute_role to database
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                guild_data.mute_role = mute_role.id  # type: ignore
-            else:
-                new_guild_data = models.Guild(
-                    id=guild.id, mute_role=mute_role.id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(guild.id, mute_role=mute_role.id)
 
         return mute_role
 
     async def get_guild_mute_role(self, guild: discord.Guild) -> discord.Role:
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                mute_role_id = guild_data.mute_role
-            else:
-                new_guild_data = models.Guild(id=guild.id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                mute_role_id = None
+        guild_data = await cache.guilds.get(guild.id)
+        mute_role_id = guild_data.mute_role
 
         if mute_role_id is None:
             # Create mute role if none is provided
@@ -122,7 +109,7 @@ class SlashModeration(commands.Cog):
             reason=reason,
         )
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             session.add(new_infraction)
             await session.commit()
 
@@ -139,7 +126,7 @@ class SlashModeration(commands.Cog):
         See all the infractions in this server
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.Infraction).where(
                 models.Infraction.guild_id == ctx.guild_id
             )
@@ -215,18 +202,16 @@ class SlashModeration(commands.Cog):
             await confirm_view.wait()
 
             if confirm_view.do_action:
-                async with db.async_session() as session:
-                    q = select(models.Infraction).where(
+                async with db.scoped_session() as session:
+                    q = delete(models.Infraction).where(
                         models.Infraction.guild_id == ctx.guild_id
                     )
                     result = await session.execute(q)
-                    tasks = [
-                        session.delete(inf) for inf in result.scalars().all()
-                    ]
-                    await asyncio.gather(*tasks)
                     await session.commit()
 
-                await ctx.respond("Cleared all infractions in this server")
+                await ctx.respond(
+                    f"Cleared all {result.rowcount} infractions in this server"
+                )
 
         else:
             if (
@@ -238,19 +223,18 @@ class SlashModeration(commands.Cog):
                 )
                 return
 
-            async with db.async_session() as session:
+            async with db.scoped_session() as session:
                 q = (
-                    select(models.Infraction)
+                    delete(models.Infraction)
                     .where(models.Infraction.guild_id == ctx.guild_id)
                     .where(models.Infraction.user_id == member.id)
                 )
                 result = await session.execute(q)
-                tasks = [session.delete(inf) for inf in result.scalars().all()]
-                await asyncio.gather(*tasks)
                 await session.commit()
 
             await ctx.respond(
-                f"Cleared all infractions by **{member}** in this server"
+                f"Cleared all {result.rowcount} infractions by **{member}** "
+                "in this server"
             )
 
     @commands.slash_command(name="removeinfraction", guild_ids=TESTING_GUILDS)
@@ -262,7 +246,7 @@ class SlashModeration(commands.Cog):
         Delete a particular infraction
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             inf = await session.get(models.Infraction, id)
 
             if inf:
@@ -272,6 +256,56 @@ class SlashModeration(commands.Cog):
             else:
                 await ctx.respond("Unable to find an infraction with that ID")
 
+    async def end_temp_mute(self, temp_mute_id: str):
+        async with db.scoped_session() as session:
+            temp_mute: models.TempMute | None = await session.get(
+                models.TempMute, temp_mute_id
+            )
+
+        if not temp_mute or not shards.owns_guild(temp_mute.guild_id):
+            return
+
+        # Outages make guilds unavailable rather than removing them, so a
+        # missing guild is one the bot is no longer in
+        if guild := self.bot.get_guild(temp_mute.guild_id):
+            if guild.unavailable:
+                # Keep the mute, the scheduler retries it
+                raise RuntimeError(f"Server {guild.id} is unavailable")
+
+            await self.remove_temp_mute_role(guild, temp_mute)
+
+        # Only forgotten once the role is gone, so a failure is retried
+        async with db.scoped_session() as session:
+            await session.execute(
+                delete(models.TempMute).where(
+                    models.TempMute.id == temp_mute_id
+                )
+            )
+            await session.commit()
+
+    async def remove_temp_mute_role(
+        self, guild: discord.Guild, temp_mute: models.TempMute
+    ):
+        member = guild.get_member(temp_mute.user_id)
+
+        if member is None:
+            try:
+                member = await guild.fetch_member(temp_mute.user_id)
+            except discord.NotFound:
+                # Members lose their roles when they leave
+                return
+
+        mute_role = guild.get_role(temp_mute.role_id)
+
+        if mute_role and mute_role in member.roles:
+            await member.remove_roles(mute_role)
+
+            if channel := guild.get_channel(temp_mute.channel_id):
+                humanized_time_str = f"<t:{int(temp_mute.due.timestamp())}:R>"
+                await channel.send(
+                    f"**{member}** was unmuted {humanized_time_str}"
+                )
+
     @commands.slash_command(guild_ids=TESTING_GUILDS)
     @commands.bot_has_guild_permissions(manage_roles=True)
     @commands.has_guild_permissions(manage_roles=True)
@@ -303,21 +337,28 @@ class SlashModeration(commands.Cog):
         await member.add_roles(mute_role)
 
         if mute_time:
-            now_epoch = time.time()
-            mute_timedelta = str_time_to_timedelta(mute_time)
-            humanized_time_str = (
-                f"<t:{int(now_epoch + mute_timedelta.total_seconds())}:R>"
+            now = datetime.now()
+            temp_mute = models.TempMute(
+                id=uuid4().hex,
+                guild_id=ctx.guild.id,
+                channel_id=ctx.channel.id,
+                user_id=member.id,
+                role_id=mute_role.id,
+                start=now,
+                due=now + str_time_to_timedelta(mute_time),
             )
 
+            async with db.scoped_session() as session:
+                session.add(temp_mute)
+                await session.commit()
+
+            self.bot.scheduler.schedule(
+                "temp_mute", temp_mute.id, temp_mute.due
+            )
+            humanized_time_str = f"<t:{int(temp_mute.due.timestamp())}:R>"
             await ctx.respond(
                 f"**{member}** will be unmuted {humanized_time_str}"
             )
-            await asyncio.sleep(mute_timedelta.total_seconds())
-            unmute_str = f"**{member}** was unmuted {humanized_time_str}"
-
-            if mute_role in member.roles:
-                await member.remove_roles(mute_role)
-                await ctx.send(unmute_str)
 
         else:
             await ctx.respond(f"**{member}** can no longer speak")
@@ -517,19 +558,8 @@ class SlashModeration(commands.Cog):
 
         await ctx.defer(ephemeral=True)
 
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            if guild_data:
-                limit = guild_data.clear_cap
-            else:
-                new_guild_data = models.Guild(id=ctx.guild_id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                limit = new_guild_data.clear_cap
+        guild_data = await cache.guilds.get(ctx.guild_id)
+        limit = guild_data.clear_cap
 
         if limit and amount > limit:
             exceeds_by = amount - limit
@@ -597,13 +627,14 @@ class SlashModeration(commands.Cog):
 
         await ctx.defer()
 
-        async with db.async_session() as session:
-            q = select(models.ImpersonationLog).where(
-                models.ImpersonationLog.guild_id == ctx.guild_id
+        async with db.scoped_session() as session:
+            q = (
+                select(models.ImpersonationLog)
+                .where(models.ImpersonationLog.guild_id == ctx.guild_id)
+                .order_by(models.ImpersonationLog.timestamp.desc())
             )
             results = await session.execute(q)
             logs: list[models.ImpersonationLog] = results.scalars().all()
-            logs.sort(key=lambda x: x.timestamp, reverse=True)
 
         if not logs:
             await ctx.respond(
@@ -656,4 +687,4 @@ class SlashModeration(commands.Cog):
 
 
 def setup(bot):
-    bot.add_cog(SlashModeration())
+    bot.add_cog(SlashModeration(bot))
@@ -1,18 +1,28 @@
 import os
-import re
 import uuid
 import asyncio
 import random
+import time
+from contextlib import aclosing
+from math import ceil
 import wavelink
 import discord
 from typing import Iterable
 from discord.ext import commands, pages
-from sqlalchemy import select
+from sqlalchemy import delete, func, select
 from sqlalchemy.orm import selectinload
 
-from bot import TESTING_GUILDS, THEME
-from bot.db import async_session, models
-from bot.views import ConfirmView
+from bot import TESTING_GUILDS, THEME, cache, lavalink
+from bot.db import models, scoped_session
+from bot.enums import LoopMode
+from bot.music_queue import MusicQueue
+from bot.utils import map_in_order
+from bot.views import ConfirmView, LazyPaginatedEmbedView
+
+MUSIC_QUEUE_MAX_SIZE = int(os.getenv("MUSIC_QUEUE_MAX_SIZE", 500))
+QUEUE_PAGE_SIZE = 10
+PLAYLIST_SEARCH_CONCURRENCY = int(os.getenv("PLAYLIST_SEARCH_CONCURRENCY", 5))
+PLAYLIST_PROGRESS_INTERVAL = 2
 
 
 class SlashMusic(commands.Cog):
@@ -20,12 +30,11 @@ class SlashMusic(commands.Cog):
     Jam to your favorite tunes with your favorite bot
     """
 
-    # TODO: Add remove from queue, loop command
-
-    song_queues: dict[int, asyncio.Queue[wavelink.YouTubeTrack]] = {}
-    currently_playing: dict[int, wavelink.YouTubeTrack] = {}
+    song_queues: dict[int, MusicQueue[wavelink.YouTubeTrack]] = {}
     play_next: dict[int, asyncio.Event] = {}
     node_pool_connected = asyncio.Event()
+    # Shared by every playlist being loaded, to not flood the Lavalink node
+    playlist_search_limit = asyncio.Semaphore(PLAYLIST_SEARCH_CONCURRENCY)
 
     music_group = discord.SlashCommandGroup(
         name="music", guild_ids=TESTING_GUILDS
@@ -41,28 +50,26 @@ class SlashMusic(commands.Cog):
 
     def get_song_queue(
         self, ctx: discord.ApplicationContext
-    ) -> asyncio.Queue[wavelink.YouTubeTrack]:
+    ) -> MusicQueue[wavelink.YouTubeTrack]:
         guild_id: int = ctx.guild_id  # type: ignore
 
         if guild_id not in self.song_queues:
             # Guild queue does not exist, create a new one...
-            self.song_queues[guild_id] = asyncio.Queue()
+            self.song_queues[guild_id] = MusicQueue(MUSIC_QUEUE_MAX_SIZE)
             self.play_next[guild_id] = asyncio.Event()
             self.play_next[guild_id].set()
             self.bot.loop.create_task(self.process_song_queue(ctx))
 
         return self.song_queues[guild_id]
 
+    @staticmethod
+    def format_duration(duration: float) -> str:
+        duration_mins, duration_secs = (int(x) for x in divmod(duration, 60))
+        return f"{duration_mins}:{duration_secs:02}"
+
     def get_track_embed(self, track: wavelink.YouTubeTrack) -> discord.Embed:
         clean_title = track.title.replace("`", "")
-        duration_mins, duration_secs = (
-            int(x) for x in divmod(track.duration, 60)
-        )
-        duration_str = (
-            f"{duration_mins}:{duration_secs}"
-            if duration_secs > 9
-            else f"{duration_mins}:0{duration_secs}"
-        )
+        duration_str = self.format_duration(track.duration)
 
         desc = f"\
             Title: `{clean_title}`\n\
@@ -83,7 +90,7 @@ class SlashMusic(commands.Cog):
             if not ctx.interaction.user:
                 return []
 
-            async with async_session() as session:
+            async with scoped_session() as session:
                 query = select(models.Playlist)
 
                 if owned_only:
@@ -108,12 +115,7 @@ class SlashMusic(commands.Cog):
         """Connect to Lavalink Nodes"""
 
         await self.bot.wait_until_ready()
-        await wavelink.NodePool.create_node(
-            bot=self.bot,
-            host=os.environ["LAVALINK_HOST"],
-            port=int(os.environ["LAVALINK_PORT"]),
-            password=os.environ["LAVALINK_PASSWORD"],
-        )
+        await lavalink.pool.connect(self.bot, lavalink.get_node_configs())
         self.node_pool_connected.set()
 
     async def get_voice_client(
@@ -121,24 +123,12 @@ class SlashMusic(commands.Cog):
     ) -> wavelink.Player:
         if ctx.voice_client:
             return ctx.voice_client  # type: ignore
-        return await ctx.author.voice.channel.connect(cls=wavelink.Player)  # type: ignore
+        return await ctx.author.voice.channel.connect(cls=lavalink.pool.create_player())  # type: ignore
 
     async def search_for_youtube_track(
         self, search_query: str
     ) -> wavelink.YouTubeTrack | None:
-        search_results = await wavelink.YouTubeTrack.search(search_query)
-
-        if re.match(
-            r"^(https?\:\/\/)?(www\.youtube\.com|youtu\.be)\/.+$", search_query
-        ):
-            for t in search_results:
-                if t.uri == search_query:
-                    return t
-
-        elif search_results:
-            return search_results[0]
-
-        return None
+        return await cache.tracks.search(search_query)
 
     async def process_song_queue(self, ctx: discord.ApplicationContext):
         guild_id: int = ctx.guild_id  # type: ignore
@@ -148,8 +138,7 @@ class SlashMusic(commands.Cog):
             await self.play_next[guild_id].wait()
 
             # Fetch next song...
-            next_track = await self.song_queues[guild_id].get()
-            self.currently_playing[guild_id] = next_track
+            next_track = await self.song_queues[guild_id].next()
 
             # ...and play it
             vc = await self.get_voice_client(ctx)
@@ -166,7 +155,6 @@ class SlashMusic(commands.Cog):
     ):
         # Next song should play now
         self.play_next[player.guild.id].set()
-        del self.currently_playing[player.guild.id]
 
     @music_group.command()
     async def join(self, ctx: discord.ApplicationContext):
@@ -200,7 +188,15 @@ class SlashMusic(commands.Cog):
             return
 
         # Add track to the song queue
-        await self.get_song_queue(ctx).put(search_track)
+        try:
+            self.get_song_queue(ctx).put(search_track)
+        except asyncio.QueueFull:
+            await ctx.respond(
+                f"The song queue is full, it can't have more than "
+                f"{MUSIC_QUEUE_MAX_SIZE} songs",
+                ephemeral=True,
+            )
+            return
 
         em = self.get_track_embed(search_track)
         em.title = "Added to Song Queue"
@@ -212,6 +208,7 @@ class SlashMusic(commands.Cog):
         Skip the currently playing song
         """
 
+        self.get_song_queue(ctx).skip()
         vc = await self.get_voice_client(ctx)
         await vc.stop()
         await ctx.respond("⏭️ Song has been skipped!")
@@ -287,7 +284,12 @@ class SlashMusic(commands.Cog):
             )
 
     @music_group.command()
-    async def queue(self, ctx: discord.ApplicationContext):
+    @discord.option(
+        "detailed",
+        description="Show one song per page with its thumbnail",
+        default=False,
+    )
+    async def queue(self, ctx: discord.ApplicationContext, detailed: bool):
         """
         View all the songs currently in the queue
         """
@@ -301,46 +303,202 @@ class SlashMusic(commands.Cog):
             )
             return
 
-        if not (
-            ctx.guild_id in self.song_queues
-            and ctx.guild_id in self.currently_playing
-        ):
+        guild_queue = self.song_queues.get(ctx.guild_id)
+
+        if guild_queue is None or guild_queue.current is None:
             await ctx.respond(
                 "The song queue is empty right now", ephemeral=True
             )
             return
 
-        guild_queue = self.song_queues[ctx.guild_id]
-        queue_list_copy: list[wavelink.YouTubeTrack] = []
+        if detailed:
+            view = LazyPaginatedEmbedView(
+                ctx.author.id,  # type: ignore
+                lambda: len(guild_queue) + 1,
+                lambda page: self.get_queue_track_page(guild_queue, page),
+            )
+        else:
+            view = LazyPaginatedEmbedView(
+                ctx.author.id,  # type: ignore
+                # The first page shows the current song even with none upcoming
+                lambda: max(ceil(len(guild_queue) / QUEUE_PAGE_SIZE), 1),
+                lambda page: self.get_queue_list_page(guild_queue, page),
+            )
 
-        # Flush all tracks in queue and add them to a list
-        while True:
-            try:
-                queue_list_copy.append(guild_queue.get_nowait())
-            except asyncio.QueueEmpty:
-                break
+        await view.respond(ctx)
 
-        # Re-add all tracks from list to original queue
-        for t in queue_list_copy:
-            guild_queue.put_nowait(t)
+    def get_queue_track_page(
+        self, guild_queue: MusicQueue[wavelink.YouTubeTrack], page: int
+    ) -> discord.Embed:
+        """
+        Page of the detailed queue, the current song followed by one page
+        per upcoming song.
+        """
 
-        queue_embeds = []
+        if page == 0 or not len(guild_queue):
+            if not (current := guild_queue.current):
+                return discord.Embed(
+                    title="Nothing is playing right now", color=THEME
+                )
 
-        # Add current Track
-        if current_track := self.currently_playing.get(ctx.guild_id):
-            em = self.get_track_embed(current_track)
+            em = self.get_track_embed(current)
             em.title = "Currently Playing"
-            queue_embeds.append(em)
+            return em
 
-        # Generate track embeds
-        for i, track in enumerate(queue_list_copy):
-            em = self.get_track_embed(track)
-            noun = "song" if i == 0 else "songs"
-            em.title = f"{i + 1} {noun} away..."
-            queue_embeds.append(em)
+        em = self.get_track_embed(guild_queue[page - 1])  # type: ignore
+        noun = "song" if page == 1 else "songs"
+        em.title = f"{page} {noun} away..."
+        return em
 
-        paginator = pages.Paginator(pages=queue_embeds)
-        await paginator.respond(ctx.interaction)
+    def get_queue_list_page(
+        self, guild_queue: MusicQueue[wavelink.YouTubeTrack], page: int
+    ) -> discord.Embed:
+        """
+        Page of the compact queue, the current song followed by up to
+        `QUEUE_PAGE_SIZE` upcoming songs as one line each.
+        """
+
+        start = page * QUEUE_PAGE_SIZE
+        lines = [
+            f"`{position}.` {self.get_track_line(track)}"
+            for position, track in enumerate(
+                guild_queue[start : start + QUEUE_PAGE_SIZE], start=start + 1
+            )
+        ]
+
+        em = discord.Embed(
+            title="Song Queue",
+            color=THEME,
+            description="\n".join(lines) or "No upcoming songs",
+        )
+
+        if current := guild_queue.current:
+            em.insert_field_at(
+                0, name="Currently Playing", value=self.get_track_line(current)
+            )
+
+        em.set_footer(text=f"{len(guild_queue)} upcoming songs")
+        return em
+
+    def get_track_line(self, track: wavelink.YouTubeTrack) -> str:
+        clean_title = discord.utils.escape_markdown(track.title)
+        duration_str = self.format_duration(track.duration)
+
+        if uri := track.uri:
+            clean_title = f"[{clean_title}]({uri})"
+
+        return f"{clean_title} - {track.author} `{duration_str}`"
+
+    async def get_upcoming_queue(
+        self, ctx: discord.ApplicationContext
+    ) -> MusicQueue[wavelink.YouTubeTrack] | None:
+        """
+        Get the guild's song queue if it has upcoming songs, otherwise
+        respond saying that it's empty.
+        """
+
+        guild_queue = self.song_queues.get(ctx.guild_id)  # type: ignore
+
+        if guild_queue is None or not len(guild_queue):
+            await ctx.respond(
+                "There aren't any songs in the queue", ephemeral=True
+            )
+            return None
+
+        return guild_queue
+
+    @music_group.command()
+    @discord.option(
+        "position",
+        description="Position of the song in the queue, 1 is the next song",
+        min_value=1,
+    )
+    async def remove(self, ctx: discord.ApplicationContext, position: int):
+        """
+        Remove a song from the queue
+        """
+
+        if (guild_queue := await self.get_upcoming_queue(ctx)) is None:
+            return
+
+        if position > len(guild_queue):
+            await ctx.respond(
+                f"There are only {len(guild_queue)} songs in the queue",
+                ephemeral=True,
+            )
+            return
+
+        track = guild_queue.remove(position - 1)
+        await ctx.respond(
+            f"Removed `{track.title.replace('`', '')}` from the queue"
+        )
+
+    @music_group.command()
+    @discord.option(
+        "position",
+        description="Position of the song in the queue, 1 is the next song",
+        min_value=1,
+    )
+    @discord.option(
+        "new_position",
+        description="Position to move the song to",
+        min_value=1,
+    )
+    async def move(
+        self,
+        ctx: discord.ApplicationContext,
+        position: int,
+        new_position: int,
+    ):
+        """
+        Move a song to a different position in the queue
+        """
+
+        if (guild_queue := await self.get_upcoming_queue(ctx)) is None:
+            return
+
+        if max(position, new_position) > len(guild_queue):
+            await ctx.respond(
+                f"There are only {len(guild_queue)} songs in the queue",
+                ephemeral=True,
+            )
+            return
+
+        track = guild_queue.move(position - 1, new_position - 1)
+        await ctx.respond(
+            f"Moved `{track.title.replace('`', '')}` to position "
+            f"{new_position} in the queue"
+        )
+
+    @music_group.command()
+    async def shuffle(self, ctx: discord.ApplicationContext):
+        """
+        Shuffle the songs in the queue
+        """
+
+        if (guild_queue := await self.get_upcoming_queue(ctx)) is None:
+            return
+
+        guild_queue.shuffle()
+        await ctx.respond(f"🔀 Shuffled {len(guild_queue)} songs!")
+
+    @music_group.command()
+    @discord.option(
+        "mode",
+        description="What to loop",
+        choices=[mode.name.lower() for mode in LoopMode],
+    )
+    async def loop(self, ctx: discord.ApplicationContext, mode: str):
+        """
+        Loop the current song or the whole queue
+        """
+
+        if not ctx.guild_id:
+            return
+
+        loop_mode = LoopMode[mode.upper()]
+        self.get_song_queue(ctx).loop_mode = loop_mode
+        await ctx.respond(f"🔁 {loop_mode.value}")
 
     @playlist_group.command(name="create")
     async def create_playlist(
@@ -353,7 +511,7 @@ class SlashMusic(commands.Cog):
         if not ctx.author:
             return
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             new_playlist_id = uuid.uuid4()
             new_playlist = models.Playlist(
                 id=new_playlist_id.hex, owner_id=ctx.author.id, name=name
@@ -381,52 +539,55 @@ class SlashMusic(commands.Cog):
         if not ctx.author:
             return
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             query = (
                 select(models.Playlist)
                 .where(models.Playlist.id == playlist_id)
                 .where(models.Playlist.owner_id == ctx.author.id)
-                .options(selectinload(models.Playlist.songs))
             )
             playlist: models.Playlist | None = await session.scalar(query)
 
-            if not playlist:
-                await ctx.respond(
-                    "The playlist with the given ID doesn't exist or isn't owned by you.",
-                    ephemeral=True,
+            if playlist:
+                query = select(func.count()).where(
+                    models.PlaylistSong.playlist_id == playlist.id
                 )
-                return
+                songs_count: int = await session.scalar(query)
 
-            em = discord.Embed(
-                title="Delete Playlist?",
-                color=THEME,
-                description="This action cannot be undone!",
+        if not playlist:
+            await ctx.respond(
+                "The playlist with the given ID doesn't exist or isn't owned by you.",
+                ephemeral=True,
             )
-            em.add_field(name="Playlist ID", value=f"`{playlist.id}`")
-            em.add_field(name="Playlist Name", value=str(playlist.name))
-            em.add_field(name="Songs Count", value=str(len(playlist.songs)))
+            return
 
-            confirm_view = ConfirmView(
-                ctx.author.id,
-                confirm_msg="Playlist has been deleted!",
-                cancel_msg="Cancelling playlist deletion...",
-            )
-            await ctx.respond(embed=em, view=confirm_view)
+        em = discord.Embed(
+            title="Delete Playlist?",
+            color=THEME,
+            description="This action cannot be undone!",
+        )
+        em.add_field(name="Playlist ID", value=f"`{playlist.id}`")
+        em.add_field(name="Playlist Name", value=str(playlist.name))
+        em.add_field(name="Songs Count", value=str(songs_count))
+
+        confirm_view = ConfirmView(
+            ctx.author.id,
+            confirm_msg="Playlist has been deleted!",
+            cancel_msg="Cancelling playlist deletion...",
+        )
+        await ctx.respond(embed=em, view=confirm_view)
 
-            # Delete original message if view timed out
-            if await confirm_view.wait():
-                await ctx.delete()
-                return
+        # Delete original message if view timed out
+        if await confirm_view.wait():
+            await ctx.delete()
+            return
 
-            if confirm_view.do_action:
-                # Delete all songs from playlist first...
-                await asyncio.gather(
-                    session.delete(song) for song in playlist.songs
+        if confirm_view.do_action:
+            # The playlist's songs are deleted with it by the database
+            async with scoped_session() as session:
+                query = delete(models.Playlist).where(
+                    models.Playlist.id == playlist.id
                 )
-
-                # ...then delete the playlist itself
-                await session.delete(playlist)
-
+                await session.execute(query)
                 await session.commit()
 
     @playlist_group.command(name="add")
@@ -458,7 +619,7 @@ class SlashMusic(commands.Cog):
             )
             return
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             playlist_query = (
                 select(models.Playlist)
                 .where(models.Playlist.id == playlist_id)
@@ -529,7 +690,7 @@ class SlashMusic(commands.Cog):
             )
             return
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             playlist_song_query = (
                 select(models.PlaylistSong)
                 .join(models.Playlist)
@@ -576,7 +737,7 @@ class SlashMusic(commands.Cog):
         Play all the songs in a particular custom playlist
         """
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             query = (
                 select(models.Playlist)
                 .where(models.Playlist.id == playlist_id)
@@ -591,28 +752,86 @@ class SlashMusic(commands.Cog):
                 )
                 return
 
-            em = discord.Embed(title="Playing Playlist", color=THEME)
-            em.add_field(name="Playlist ID", value=f"`{playlist.id}`")
-            em.add_field(name="Playlist Name", value=str(playlist.name))
-            em.add_field(name="Song Count", value=str(len(playlist.songs)))
+            playlist_name = str(playlist.name)
+            song_uris = [song.uri for song in playlist.songs]
 
-            track_search_tasks = [
-                self.search_for_youtube_track(song.uri)
-                for song in playlist.songs
-            ]
+        if shuffle:
+            random.shuffle(song_uris)
 
-        tracks: list[wavelink.YouTubeTrack] = await asyncio.gather(
-            *track_search_tasks
-        )
+        em = discord.Embed(title="Loading Playlist", color=THEME)
+        em.add_field(name="Playlist ID", value=f"`{playlist_id}`")
+        em.add_field(name="Playlist Name", value=playlist_name)
+        em.add_field(name="Songs Added", value=f"0/{len(song_uris)}")
+        await ctx.respond(embed=em)
+
+        # Songs are queued in playlist order as soon as they're found, so
+        # the first one starts playing while the rest are still loading
         guild_queue = self.get_song_queue(ctx)
+        added = not_found = 0
+        queue_full = False
+        last_update = time.monotonic()
+
+        # Closed on break, so the searches still running are cancelled
+        # right away instead of whenever the generator is collected
+        async with aclosing(
+            map_in_order(
+                self.search_for_playlist_song,
+                song_uris,
+                PLAYLIST_SEARCH_CONCURRENCY,
+                self.playlist_search_limit,
+            )
+        ) as results:
+            async for track in results:
+                if track is None:
+                    not_found += 1
+                    continue
+
+                try:
+                    guild_queue.put(track)
+                except asyncio.QueueFull:
+                    queue_full = True
+                    break
+
+                added += 1
+
+                if (
+                    time.monotonic() - last_update
+                    >= PLAYLIST_PROGRESS_INTERVAL
+                ):
+                    last_update = time.monotonic()
+                    em.set_field_at(
+                        2,
+                        name="Songs Added",
+                        value=f"{added}/{len(song_uris)}",
+                    )
+                    await ctx.edit(embed=em)
 
-        if shuffle:
-            random.shuffle(tracks)
+        em.title = "Playing Playlist"
+        em.set_field_at(
+            2, name="Songs Added", value=f"{added}/{len(song_uris)}"
+        )
+
+        if queue_full:
+            em.set_footer(
+                text=(
+                    f"Only {added} songs were added, the song queue can't "
+                    f"have more than {MUSIC_QUEUE_MAX_SIZE} songs"
+                )
+            )
+        elif not_found:
+            em.set_footer(text=f"{not_found} songs couldn't be found")
 
-        for track in tracks:
-            await guild_queue.put(track)
+        await ctx.edit(embed=em)
 
-        await ctx.respond(embed=em)
+    async def search_for_playlist_song(
+        self, uri: str
+    ) -> wavelink.YouTubeTrack | None:
+        # One missing song shouldn't stop the rest of the playlist loading
+        try:
+            return await self.search_for_youtube_track(uri)
+        except Exception as e:
+            print(f"Failed to load playlist song {uri}: {e!r}")
+            return None
 
     @playlist_group.command(name="view")
     @discord.option(
@@ -625,7 +844,7 @@ class SlashMusic(commands.Cog):
         View all the songs inside a custom playlist
         """
 
-        async with async_session() as session:
+        async with scoped_session() as session:
             query = (
                 select(models.Playlist)
                 .where(models.Playlist.id == playlist_id)
@@ -640,17 +859,24 @@ class SlashMusic(commands.Cog):
                 )
                 return
 
-            track_search_tasks = [
-                self.search_for_youtube_track(song.uri)
-                for song in playlist.songs
-            ]
+            song_uris = [song.uri for song in playlist.songs]
+
+        async with aclosing(
+            map_in_order(
+                self.search_for_playlist_song,
+                song_uris,
+                PLAYLIST_SEARCH_CONCURRENCY,
+                self.playlist_search_limit,
+            )
+        ) as results:
+            tracks = [track async for track in results]
 
-        tracks: list[wavelink.YouTubeTrack] = await asyncio.gather(
-            *track_search_tasks
-        )
         embeds = []
 
         for i, track in enumerate(tracks):
+            if track is None:
+                continue
+
             em = self.get_track_embed(track)
             em.title = f"Song #{i + 1} in {playlist.name}"
             em.description += f"\nPlaylist ID: `{playlist.id}`"  # type: ignore
@@ -4,7 +4,7 @@ from discord.ext import commands
 from emoji import emojize
 from sqlalchemy.future import select
 
-from bot import TESTING_GUILDS, THEME, db
+from bot import TESTING_GUILDS, THEME, cache, db
 from bot.db import models
 from bot.utils import dbl_vote_required
 
@@ -17,70 +17,66 @@ class SlashReactionRoles(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        bot.loop.create_task(cache.reaction_roles.load())
+
+    async def get_reaction_member(
+        self, guild: discord.Guild, payload: discord.RawReactionActionEvent
+    ) -> discord.Member:
+        if payload.member:
+            return payload.member
+
+        if member := guild.get_member(payload.user_id):
+            return member
+
+        return await guild.fetch_member(payload.user_id)
 
     @commands.Cog.listener()
     async def on_raw_reaction_add(
         self, payload: discord.RawReactionActionEvent
     ):
-        if not payload.guild_id:
+        if not payload.guild_id or payload.user_id == self.bot.user.id:
             return
 
-        guild: discord.Guild = await self.bot.fetch_guild(payload.guild_id)
-        member: discord.Member = await guild.fetch_member(payload.user_id)
-        emoji: str | None = str(payload.emoji.id or payload.emoji.name)
+        emoji = str(payload.emoji.id or payload.emoji.name)
+        role_ids = await cache.reaction_roles.get_role_ids(
+            payload.guild_id, payload.channel_id, payload.message_id, emoji
+        )
 
-        if member == self.bot.user or not emoji:
+        if not role_ids or not (guild := self.bot.get_guild(payload.guild_id)):
             return
 
-        async with db.async_session() as session:
-            q = (
-                select(models.ReactionRole)
-                .where(models.ReactionRole.guild_id == guild.id)
-                .where(models.ReactionRole.channel_id == payload.channel_id)
-                .where(models.ReactionRole.message_id == payload.message_id)
-                .where(models.ReactionRole.emoji == emoji)
-            )
-            result = await session.execute(q)
-            rr: models.ReactionRole = result.scalar()
+        member = await self.get_reaction_member(guild, payload)
 
-            if rr:
-                if role := guild.get_role(rr.role_id):  # type: ignore
-                    await member.add_roles(role, reason="Reaction Role")
-                    await member.send(
-                        f"You have been given the **{role}** role in **{guild}**"
-                    )
+        for role_id in role_ids:
+            if role := guild.get_role(role_id):
+                await member.add_roles(role, reason="Reaction Role")
+                await member.send(
+                    f"You have been given the **{role}** role in **{guild}**"
+                )
 
     @commands.Cog.listener()
     async def on_raw_reaction_remove(
         self, payload: discord.RawReactionActionEvent
     ):
-        if not payload.guild_id:
+        if not payload.guild_id or payload.user_id == self.bot.user.id:
             return
 
-        guild: discord.Guild = await self.bot.fetch_guild(payload.guild_id)
-        member: discord.Member = await guild.fetch_member(payload.user_id)
-        emoji: str | None = str(payload.emoji.id or payload.emoji.name)
+        emoji = str(payload.emoji.id or payload.emoji.name)
+        role_ids = await cache.reaction_roles.get_role_ids(
+            payload.guild_id, payload.channel_id, payload.message_id, emoji
+        )
 
-        if member == self.bot.user or not emoji:
+        if not role_ids or not (guild := self.bot.get_guild(payload.guild_id)):
             return
 
-        async with db.async_session() as session:
-            q = (
-                select(models.ReactionRole)
-                .where(models.ReactionRole.guild_id == guild.id)
-                .where(models.ReactionRole.channel_id == payload.channel_id)
-                .where(models.ReactionRole.message_id == payload.message_id)
-                .where(models.ReactionRole.emoji == emoji)
-            )
-            result = await session.execute(q)
-            rr: models.ReactionRole = result.scalar()
+        member = await self.get_reaction_member(guild, payload)
 
-            if rr:
-                if role := guild.get_role(rr.role_id):  # type: ignore
-                    await member.remove_roles(role, reason="Reaction Role")
-                    await member.send(
-                        f"Your **{role}** role in **{guild}** has been removed"
-                    )
+        for role_id in role_ids:
+            if role := guild.get_role(role_id):
+                await member.remove_roles(role, reason="Reaction Role")
+                await member.send(
+                    f"Your **{role}** role in **{guild}** has been removed"
+                )
 
     @commands.slash_command(name="addreactionrole", guild_ids=TESTING_GUILDS)
     @commands.bot_has_guild_permissions(manage_roles=True, add_reactions=True)
@@ -115,7 +111,7 @@ class SlashReactionRoles(commands.Cog):
 
         await ctx.defer()
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = (
                 select(models.ReactionRole)
                 .where(models.ReactionRole.guild_id == ctx.guild_id)
@@ -138,7 +134,7 @@ class SlashReactionRoles(commands.Cog):
                 await message.add_reaction(original_emoji)
                 new_rr_id = uuid4()
 
-                async with db.async_session() as session:
+                async with db.scoped_session() as session:
                     new_rr = models.ReactionRole(
                         id=new_rr_id.hex,
                         guild_id=ctx.guild_id,
@@ -150,6 +146,9 @@ class SlashReactionRoles(commands.Cog):
                     session.add(new_rr)
                     await session.commit()
 
+                cache.reaction_roles.add(new_rr)
+                await cache.reaction_roles.publish(new_rr.id)
+
                 await ctx.respond(
                     f"Reaction Role with ID `{new_rr_id.hex}` for {role.mention} has been created with {original_emoji}.\n\nJump to message: {message.jump_url}",
                     allowed_mentions=discord.AllowedMentions.none(),
@@ -175,12 +174,14 @@ class SlashReactionRoles(commands.Cog):
         Remove a reaction role
         """
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             rr = await session.get(models.ReactionRole, id)
 
             if rr:
                 await session.delete(rr)
                 await session.commit()
+                cache.reaction_roles.remove(rr.id)
+                await cache.reaction_roles.publish(rr.id)
                 await ctx.respond(
                     f"Reaction Role with ID `{id}` has been removed"
                 )
@@ -197,7 +198,7 @@ class SlashReactionRoles(commands.Cog):
 
         await ctx.defer()
 
-        async with db.async_session() as session:
+        async with db.scoped_session() as session:
             q = select(models.ReactionRole).where(
                 models.ReactionRole.guild_id == ctx.guild_id
             )
@@ -218,10 +219,13 @@ class SlashReactionRoles(commands.Cog):
         for rr in reaction_roles:
 
             async def delete_rr():
-                async with db.async_session() as session:
+                async with db.scoped_session() as session:
                     await session.delete(rr)
                     await session.commit()
 
+                cache.reaction_roles.remove(rr.id)
+                await cache.reaction_roles.publish(rr.id)
+
             try:
                 rr_channel: discord.TextChannel = (
                     await ctx.guild.fetch_channel(rr.channel_id)
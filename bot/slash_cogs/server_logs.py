@@ -2,7 +2,7 @@ import discord
 import datetime
 from discord.ext import commands
 
-from bot import THEME
+from bot import THEME, MyBot
 
 
 class SlashServerLogs(commands.Cog):
@@ -12,7 +12,7 @@ class SlashServerLogs(commands.Cog):
 
     logs_channel = 843726111360024586
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: MyBot):
         self.bot = bot
 
     @commands.Cog.listener()
@@ -25,7 +25,7 @@ class SlashServerLogs(commands.Cog):
         )
         embed.add_field(
             name=f"This Guild Has {guild.member_count} Members!",
-            value=f"Yay Another Server! We Are Now At {len(self.bot.guilds)} Guilds!",
+            value=f"Yay Another Server! We Are Now At {self.bot.guild_count()} Guilds!",
         )
         await self.bot.get_channel(self.logs_channel).send(embed=embed)
 
@@ -38,7 +38,7 @@ class SlashServerLogs(commands.Cog):
             color=THEME,
         )
         embed.add_field(
-            name=f"We Are Now At {len(self.bot.guilds)} Guilds!", value="T-T"
+            name=f"We Are Now At {self.bot.guild_count()} Guilds!", value="T-T"
         )
         await self.bot.get_channel(self.logs_channel).send(embed=embed)
 
@@ -2,8 +2,7 @@ import aiohttp
 import discord
 from discord.ext import commands
 
-from bot import TESTING_GUILDS, THEME, db
-from bot.db import models
+from bot import TESTING_GUILDS, THEME, cache
 
 
 class SlashSettings(commands.Cog):
@@ -20,20 +19,7 @@ class SlashSettings(commands.Cog):
         Set a role to give to people when you mute them
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            if guild:
-                guild.mute_role = role.id
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, mute_role=role.id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild_id, mute_role=role.id)
 
         await ctx.respond(
             f"The mute role has been set to {role.mention}",
@@ -49,20 +35,7 @@ class SlashSettings(commands.Cog):
         Change the welcome message of your server. Variables you can use: [mention], [member], [server]
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            if guild:
-                guild.welcome_message = message
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, welcome_message=message
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild_id, welcome_message=message)
 
         if message:
             await ctx.respond(
@@ -82,20 +55,7 @@ class SlashSettings(commands.Cog):
         Change the leave message of your server. Variables you can use: [member], [server]
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            if guild:
-                guild.leave_message = message
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, leave_message=message
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild_id, leave_message=message)
 
         if message:
             await ctx.respond(
@@ -117,22 +77,8 @@ class SlashSettings(commands.Cog):
         Change the channel where welcome messages are sent (don't pass a channel to disable welcome message)
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            ch = str(channel.id) if channel else "disabled"
-
-            if guild:
-                guild.welcome_channel = ch
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, welcome_channel=ch
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        ch = str(channel.id) if channel else "disabled"
+        await cache.guilds.update(ctx.guild_id, welcome_channel=ch)
 
         if channel:
             await ctx.respond(
@@ -152,22 +98,8 @@ class SlashSettings(commands.Cog):
         Change the channel where leave messages are sent (don't pass a channel to disable leave message)
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            ch = str(channel.id) if channel else "disabled"
-
-            if guild:
-                guild.leave_channel = ch
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, leave_channel=ch
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        ch = str(channel.id) if channel else "disabled"
+        await cache.guilds.update(ctx.guild_id, leave_channel=ch)
 
         if channel:
             await ctx.respond(
@@ -185,22 +117,8 @@ class SlashSettings(commands.Cog):
         Set a role to give to new members who join your server
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            role_id = role.id if role else None
-
-            if guild:
-                guild.auto_role = role_id
-            else:
-                new_guild_data = models.Guild(
-                    id=ctx.guild_id, auto_role=role_id
-                )
-                session.add(new_guild_data)
-
-            await session.commit()
+        role_id = role.id if role else None
+        await cache.guilds.update(ctx.guild_id, auto_role=role_id)
 
         if role:
             await ctx.respond(
@@ -356,18 +274,7 @@ class SlashSettings(commands.Cog):
         Set the maximum number of messages that can be cleared using /clear
         """
 
-        async with db.async_session() as session:
-            guild: models.Guild | None = await session.get(
-                models.Guild, ctx.guild_id
-            )
-
-            if guild:
-                guild.clear_cap = limit
-            else:
-                new_guild_data = models.Guild(id=ctx.guild_id, clear_cap=limit)
-                session.add(new_guild_data)
-
-            await session.commit()
+        await cache.guilds.update(ctx.guild_id, clear_cap=limit)
 
         if limit:
             await ctx.respond(
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 
 from bot import TESTING_GUILDS, THEME
+from bot.snipes import snipes
 
 
 class SlashSnipe(commands.Cog):
@@ -9,39 +10,24 @@ class SlashSnipe(commands.Cog):
     Commands to snipe out messages that people try to hide
     """
 
-    deleted_msgs = {}
-    edited_msgs = {}
-    snipe_limit = 7
+    snipe_limit = snipes.limit
 
     @commands.Cog.listener()
     async def on_message_delete(self, message: discord.Message):
-        ch_id = message.channel.id
-
-        if not message.author.bot:
-            if message.content:
-                if ch_id not in self.deleted_msgs:
-                    self.deleted_msgs[ch_id] = []
-
-                self.deleted_msgs[ch_id].append(message)
-
-            if len(self.deleted_msgs[ch_id]) > self.snipe_limit:
-                self.deleted_msgs[ch_id].pop(0)
+        if not message.author.bot and message.content:
+            snipes.record_delete(message)
 
     @commands.Cog.listener()
     async def on_message_edit(
         self, before: discord.Message, after: discord.Message
     ):
-        ch_id = before.channel.id
-
-        if not before.author.bot:
-            if before.content and after.content:
-                if ch_id not in self.edited_msgs:
-                    self.edited_msgs[ch_id] = []
-
-                self.edited_msgs[ch_id].append((before, after))
-
-            if len(self.edited_msgs[ch_id]) > self.snipe_limit:
-                self.edited_msgs[ch_id].pop(0)
+        if (
+            not before.author.bot
+            and before.content
+            and after.content
+            and before.content != after.content
+        ):
+            snipes.record_edit(before, after)
 
     @commands.slash_command(guild_ids=TESTING_GUILDS)
     async def snipe(self, ctx: discord.ApplicationContext, limit: int = 1):
@@ -55,35 +41,30 @@ class SlashSnipe(commands.Cog):
             )
             return
 
-        try:
-            msgs: list[discord.Message] = self.deleted_msgs[ctx.channel.id][
-                ::-1
-            ][:limit]
-            snipe_embed = discord.Embed(title="Message Snipe", color=THEME)
+        msgs = snipes.deleted(ctx.channel.id, limit)
 
-            if msgs:
-                await ctx.defer()
-                top_author: discord.Member = await ctx.bot.get_or_fetch_user(
-                    msgs[0].author.id
-                )
-
-                if top_author:
-                    snipe_embed.set_thumbnail(
-                        url=top_author.display_avatar.url
-                    )
+        if not msgs:
+            await ctx.respond(
+                "There's nothing to snipe here...", ephemeral=True
+            )
+            return
 
-            for msg in msgs:
-                snipe_embed.add_field(
-                    name=str(msg.author), value=msg.content, inline=False
-                )
+        await ctx.defer()
+        snipe_embed = discord.Embed(title="Message Snipe", color=THEME)
+        top_author: discord.User = await ctx.bot.get_or_fetch_user(
+            msgs[0].author_id
+        )
 
-            await ctx.respond(embed=snipe_embed)
+        if top_author:
+            snipe_embed.set_thumbnail(url=top_author.display_avatar.url)
 
-        except KeyError:
-            await ctx.respond(
-                "There's nothing to snipe here...", ephemeral=True
+        for msg in msgs:
+            snipe_embed.add_field(
+                name=msg.author_name, value=msg.content, inline=False
             )
 
+        await ctx.respond(embed=snipe_embed)
+
     @commands.slash_command(name="editsnipe", guild_ids=TESTING_GUILDS)
     async def edit_snipe(
         self, ctx: discord.ApplicationContext, limit: int = 1
@@ -98,35 +79,32 @@ class SlashSnipe(commands.Cog):
             )
             return
 
-        try:
-            msgs = self.edited_msgs[ctx.channel.id][::-1][:limit]
-            editsnipe_embed = discord.Embed(title="Edit Snipe", color=THEME)
+        msgs = snipes.edited(ctx.channel.id, limit)
 
-            if msgs:
-                await ctx.defer()
-                top_author: discord.Member = await ctx.bot.get_or_fetch_user(
-                    msgs[0][0].author.id
-                )
-
-                if top_author:
-                    editsnipe_embed.set_thumbnail(
-                        url=top_author.display_avatar.url
-                    )
+        if not msgs:
+            await ctx.respond(
+                "There's nothing to snipe here...", ephemeral=True
+            )
+            return
 
-            for msg in msgs:
-                editsnipe_embed.add_field(
-                    name=str(msg[0].author),
-                    value=f"{msg[0].content} **-->** {msg[1].content}",
-                    inline=False,
-                )
+        await ctx.defer()
+        editsnipe_embed = discord.Embed(title="Edit Snipe", color=THEME)
+        top_author: discord.User = await ctx.bot.get_or_fetch_user(
+            msgs[0].author_id
+        )
 
-            await ctx.respond(embed=editsnipe_embed)
+        if top_author:
+            editsnipe_embed.set_thumbnail(url=top_author.display_avatar.url)
 
-        except KeyError:
-            await ctx.respond(
-                "There's nothing to snipe here...", ephemeral=True
+        for msg in msgs:
+            editsnipe_embed.add_field(
+                name=msg.author_name,
+                value=f"{msg.content} **-->** {msg.edited_content}",
+                inline=False,
             )
 
+        await ctx.respond(embed=editsnipe_embed)
+
 
 def setup(bot):
     bot.add_cog(SlashSnipe())
@@ -1,6 +1,8 @@
 import discord
 from discord.ext import commands, tasks
 
+from bot import MyBot
+
 
 class SlashStatus(commands.Cog):
     """
@@ -18,12 +20,13 @@ class SlashStatus(commands.Cog):
     ]
     status_index = 0
 
-    def __init__(self, bot: commands.Bot):
+    def __init__(self, bot: MyBot):
         self.bot = bot
 
     @commands.Cog.listener()
     async def on_ready(self):
-        self.status_task.start()
+        if not self.status_task.is_running():
+            self.status_task.start()
 
     def cog_unload(self):
         self.status_task.cancel()
@@ -35,11 +38,23 @@ class SlashStatus(commands.Cog):
         activ_msg = activity[1]
 
         if "[guild_count]" in activ_msg:
-            guild_count = len(self.bot.guilds)
+            guild_count = self.bot.guild_count()
             activ_msg = activ_msg.replace("[guild_count]", str(guild_count))
 
         activ = discord.Activity(type=activ_type, name=activ_msg)
-        await self.bot.change_presence(activity=activ)
+
+        # Set each shard's presence separately, so a shard that's
+        # reconnecting doesn't stop the others from being updated
+        for shard_id, shard in self.bot.shards.items():
+            if shard.is_closed():
+                continue
+
+            try:
+                await self.bot.change_presence(
+                    activity=activ, shard_id=shard_id
+                )
+            except (discord.ConnectionClosed, ConnectionError) as e:
+                print(f"Failed to set presence of shard {shard_id}: {e!r}")
 
         self.status_index += 1
         if self.status_index >= len(self.status_msgs):
@@ -1,11 +1,7 @@
-import asyncio
-import os
 import discord
 from discord.ext import commands
-from PIL import Image, ImageFont, ImageDraw
 
-from bot import db
-from bot.db import models
+from bot import cache, welcome_card
 
 
 class SlashWelcomeLeave(commands.Cog):
@@ -13,37 +9,12 @@ class SlashWelcomeLeave(commands.Cog):
     Welcome and leave message sender
     """
 
-    assets_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
-        "assets",
-    )
-    cache_dir = os.path.join(
-        os.path.dirname(os.path.dirname(os.path.realpath(__file__))),
-        "cache",
-    )
-
-    def __init__(self):
-        # Make sure that cache dir exists
-        if "cache" not in os.listdir(os.path.dirname(self.cache_dir)):
-            os.mkdir(self.cache_dir)
-
     def default_welcome_msg(self, guild: discord.Guild) -> str:
         return f"Hello [mention], welcome to {guild.name}!"
 
     def default_leave_msg(self, guild: discord.Guild) -> str:
         return f"Goodbye [member], thanks for staying at {guild.name}!"
 
-    def get_asset(self, asset_name: str) -> str:
-        return os.path.join(self.assets_dir, asset_name)
-
-    def center_to_corner(
-        self, center_pos: tuple[int], size: tuple[int]
-    ) -> tuple[int]:
-        return (
-            center_pos[0] - size[0] // 2,
-            center_pos[1] - size[1] // 2,
-        )
-
     async def find_welcome_channel(
         self, guild: discord.Guild
     ) -> discord.TextChannel or None:
@@ -70,23 +41,10 @@ class SlashWelcomeLeave(commands.Cog):
     async def on_member_join(self, member: discord.Member):
         guild: discord.Guild = member.guild
 
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                welcome_message = guild_data.welcome_message
-                welcome_channel_id = guild_data.welcome_channel
-                auto_role_id = guild_data.auto_role
-            else:
-                new_guild_data = models.Guild(id=guild.id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                welcome_message = new_guild_data.welcome_message
-                welcome_channel_id = new_guild_data.welcome_channel
-                auto_role_id = new_guild_data.auto_role
+        guild_data = await cache.guilds.get(guild.id)
+        welcome_message = guild_data.welcome_message
+        welcome_channel_id = guild_data.welcome_channel
+        auto_role_id = guild_data.auto_role
 
         if welcome_channel_id == "disabled":
             return
@@ -114,120 +72,12 @@ class SlashWelcomeLeave(commands.Cog):
         welcome_message = welcome_message.replace("[member]", str(member))
         welcome_message = welcome_message.replace("[server]", str(guild))
 
-        # Get user's avatar
-        avatar_path = os.path.join(self.cache_dir, "pfp.jpg")
-        await member.display_avatar.save(avatar_path)
-
-        # Welcome image variables
-        avatar_center_pos = (1920, 867)
-        username_center_pos = (1920, 150)
-        welcome_msg = "Welcome To"
-        welcome_msg_center_pos = (1920, 1600)
-        server_center_pos = (1920, 1900)
-
-        # Prepare circle avatar
-        im = Image.open(avatar_path)
-        im = im.convert("RGB")
-        im = im.resize((1024, 1024))
-        bigsize = (im.size[0] * 3, im.size[1] * 3)
-        mask = Image.new("L", bigsize, 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0) + bigsize, fill=255)
-        mask = mask.resize(im.size, Image.Resampling.BILINEAR)
-        im.putalpha(mask)
-        im.save(os.path.join(self.cache_dir, "lol.png"))
-
-        # output = ImageOps.fit(im, mask.size, centering=(0.5, 0.5))
-        # output.putalpha(mask)
-        # output.save(os.path.join(self.cache_dir, 'circle_pfp.png'))
-
-        # Prepare welcome image
-        w_img_path = os.path.join(self.cache_dir, "welcome.jpg")
-        w_img = Image.open(self.get_asset("welcome_image.jpg"))
-        avatar_corner_pos = self.center_to_corner(avatar_center_pos, im.size)
-
-        # If error occurs during paste function try again
-        error_count = 0
-        while True:
-            if error_count > 5:
-                # just don't send a welcome message if paste shits itself
-                # multiple times in a row
-                return
-
-            try:
-                w_img.paste(im, avatar_corner_pos, im)
-                break
-            except MemoryError:
-                error_count += 1
-                continue
-
-        w_img_draw = ImageDraw.Draw(w_img)
-        username_font = ImageFont.truetype(
-            self.get_asset("montserrat_extrabold.otf"), 165
+        card = await welcome_card.renderer.render(
+            member.display_avatar, str(member), guild.name
         )
-        welcome_font = ImageFont.truetype(
-            self.get_asset("earthorbiterxtrabold.ttf"), 250
-        )
-        server_font_size = 285
-
-        # Make sure that server name doesnt overflow
-        while True:
-            server_font = ImageFont.truetype(
-                self.get_asset("earthorbiterxtrabold.ttf"), server_font_size
-            )
-            server_length = server_font.getlength(guild.name)
-
-            # Check whether text overflows
-            if server_length >= w_img.size[0]:
-                server_font_size -= 5
-            else:
-                break
-
-        # Add username to image
-        username_bbox = username_font.getbbox(str(member))
-        username_size = (username_bbox[2] - username_bbox[0], username_bbox[3] - username_bbox[1])
-        username_corner_pos = self.center_to_corner(
-            username_center_pos, username_size
-        )
-        w_img_draw.text(
-            username_corner_pos,
-            str(member),
-            fill=(255, 255, 255),
-            font=username_font,
-        )
-
-        # Add welcome message to image
-        welcome_msg_bbox = welcome_font.getbbox(welcome_msg)
-        welcome_msg_size = (welcome_msg_bbox[2] - welcome_msg_bbox[0], welcome_msg_bbox[3] - welcome_msg_bbox[1])
-        welcome_msg_corner_pos = self.center_to_corner(
-            welcome_msg_center_pos, welcome_msg_size
-        )
-        w_img_draw.text(
-            welcome_msg_corner_pos,
-            welcome_msg,
-            fill=(255, 255, 255),
-            font=welcome_font,
-        )
-
-        # Add server name to image
-        server_bbox = server_font.getbbox(guild.name)
-        server_size = (server_bbox[2] - server_bbox[0], server_bbox[3] - server_bbox[1])
-        server_corner_pos = self.center_to_corner(
-            server_center_pos, server_size
-        )
-        w_img_draw.text(
-            server_corner_pos,
-            guild.name,
-            fill=(255, 255, 255),
-            font=server_font,
-        )
-
-        # Save the image to cache
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, w_img.save, w_img_path)
 
         await welcome_channel.send(
-            welcome_message, file=discord.File(w_img_path)
+            welcome_message, file=discord.File(card, "welcome.jpg")
         )
 
         # Give auto role to new member if they are not a bot
@@ -238,21 +88,9 @@ class SlashWelcomeLeave(commands.Cog):
     async def on_member_remove(self, member: discord.Member):
         guild: discord.Guild = member.guild
 
-        async with db.async_session() as session:
-            guild_data: models.Guild | None = await session.get(
-                models.Guild, guild.id
-            )
-
-            if guild_data:
-                leave_message = guild_data.leave_message
-                leave_channel_id = guild_data.leave_channel
-            else:
-                new_guild_data = models.Guild(id=guild.id)
-                session.add(new_guild_data)
-                await session.commit()
-
-                leave_message = new_guild_data.leave_message
-                leave_channel_id = new_guild_data.leave_channel
+        guild_data = await cache.guilds.get(guild.id)
+        leave_message = guild_data.leave_message
+        leave_channel_id = guild_data.leave_channel
 
         if leave_channel_id == "disabled":
             return
@@ -0,0 +1,118 @@
+import os
+from collections import deque
+from datetime import datetime
+
+import discord
+
+from bot.cache import TTLCache
+
+
+class SnipedMessage:
+    """
+    The parts of a deleted or edited message that snipe commands show.
+    Keeping these instead of `discord.Message` objects avoids holding on to
+    authors, channels, embeds and attachments.
+    """
+
+    __slots__ = (
+        "author_id",
+        "author_name",
+        "content",
+        "edited_content",
+        "timestamp",
+    )
+
+    def __init__(
+        self,
+        author_id: int,
+        author_name: str,
+        content: str,
+        timestamp: datetime,
+        edited_content: str | None = None,
+    ):
+        self.author_id = author_id
+        self.author_name = author_name
+        self.content = content
+        self.timestamp = timestamp
+        self.edited_content = edited_content
+
+
+class SnipeStore:
+    """
+    Recently deleted and edited messages of each channel, shared by the
+    prefix and slash snipe cogs. Every channel keeps at most `limit`
+    messages in a ring buffer, and only the `max_channels` most recently
+    active channels are tracked, each for at most `ttl` seconds.
+
+    Args:
+        limit (int): Maximum number of messages kept per channel.
+        max_channels (int): Maximum number of channels tracked at once.
+        ttl (float): Seconds after the latest snipe to forget a channel.
+    """
+
+    def __init__(self, limit: int, max_channels: int, ttl: float):
+        self.limit = limit
+        self._deleted: TTLCache[int, deque[SnipedMessage]] = TTLCache(
+            ttl, max_channels
+        )
+        self._edited: TTLCache[int, deque[SnipedMessage]] = TTLCache(
+            ttl, max_channels
+        )
+
+    def _record(
+        self,
+        buffers: TTLCache[int, deque[SnipedMessage]],
+        channel_id: int,
+        sniped: SnipedMessage,
+    ):
+        buffer = buffers.get(channel_id)
+
+        if buffer is None:
+            buffer = deque(maxlen=self.limit)
+
+        buffer.append(sniped)
+
+        # Setting the buffer again refreshes the channel's expiry
+        buffers.set(channel_id, buffer)
+
+    def record_delete(self, message: discord.Message):
+        sniped = SnipedMessage(
+            message.author.id,
+            str(message.author),
+            message.content,
+            message.created_at,
+        )
+        self._record(self._deleted, message.channel.id, sniped)
+
+    def record_edit(self, before: discord.Message, after: discord.Message):
+        sniped = SnipedMessage(
+            before.author.id,
+            str(before.author),
+            before.content,
+            after.edited_at or before.created_at,
+            edited_content=after.content,
+        )
+        self._record(self._edited, before.channel.id, sniped)
+
+    def deleted(self, channel_id: int, limit: int) -> list[SnipedMessage]:
+        """
+        Get up to `limit` deleted messages of a channel, newest first.
+        """
+
+        buffer = self._deleted.get(channel_id) or ()
+        return list(reversed(buffer))[:limit]
+
+    def edited(self, channel_id: int, limit: int) -> list[SnipedMessage]:
+        """
+        Get up to `limit` edited messages of a channel, newest first.
+        """
+
+        buffer = self._edited.get(channel_id) or ()
+        return list(reversed(buffer))[:limit]
+
+
+snipes = SnipeStore(
+    limit=7,
+    max_channels=int(os.getenv("SNIPE_MAX_CHANNELS", 5_000)),
+    ttl=float(os.getenv("SNIPE_TTL", 3600)),
+)
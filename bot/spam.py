@@ -0,0 +1,81 @@
+import time
+from collections import deque
+
+
+class MentionSpamDetector:
+    """
+    Sliding window counter of messages with mentions, kept per guild member.
+    Each member only keeps the timestamps of their last `threshold` messages
+    with mentions, so checking a message is O(1).
+
+    Args:
+        window (float, optional): Length of the window in seconds. Defaults to 5.
+        threshold (int, optional): Number of messages with mentions inside the window that count as spam. Defaults to 2.
+        sweep_interval (float, optional): Seconds between removals of idle members. Defaults to 60.
+    """
+
+    def __init__(
+        self,
+        window: float = 5,
+        threshold: int = 2,
+        sweep_interval: float = 60,
+    ):
+        self.window = window
+        self.threshold = threshold
+        self.sweep_interval = sweep_interval
+        self._hits: dict[tuple[int, int], deque[float]] = {}
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+    def hit(
+        self, guild_id: int, author_id: int, now: float | None = None
+    ) -> bool:
+        """
+        Record a message with mentions and check whether its author is
+        spamming mentions.
+
+        Args:
+            guild_id (int): ID of the guild the message was sent in.
+            author_id (int): ID of the message's author.
+            now (float, optional): Monotonic time of the message. Defaults to the current time.
+
+        Returns:
+            bool: Whether the author has hit the threshold inside the window.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        key = (guild_id, author_id)
+
+        if (hits := self._hits.get(key)) is None:
+            hits = self._hits[key] = deque(maxlen=self.threshold)
+
+        hits.append(now)
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self.sweep(now)
+
+        return len(hits) >= self.threshold and now - hits[0] < self.window
+
+    def sweep(self, now: float | None = None):
+        """
+        Forget members whose latest message with mentions is outside the
+        window.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        expired = [
+            key
+            for key, hits in self._hits.items()
+            if now - hits[-1] >= self.window
+        ]
+
+        for key in expired:
+            del self._hits[key]
+
+        self._last_sweep = now
@@ -1,6 +1,9 @@
+import asyncio
+import itertools
 import re
 import sys
-from typing import Any
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, TypeVar
 from datetime import timedelta
 import aiohttp
 import discord
@@ -9,6 +12,9 @@ from discord.ext import commands
 from bot import MyBot
 from bot.errors import DBLVoteRequired
 
+T = TypeVar("T")
+R = TypeVar("R")
+
 
 def get_time(
     key: str, string: str
@@ -99,3 +105,52 @@ async def search_youtube(query: str) -> str:
     video_ids = re.findall(r"watch\?v=(\S{11})", html)
     first_result = yt_video_url + video_ids[0]
     return first_result
+
+
+async def map_in_order(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    limit: int,
+    semaphore: asyncio.Semaphore | None = None,
+) -> AsyncIterator[R]:
+    """
+    Call `func` on each item, with at most `limit` calls running at once, and
+    yield the results in the order of the items as soon as each is ready.
+    Calls that haven't finished are cancelled if the iteration is stopped.
+
+    Args:
+        func (Callable): Coroutine function to call on each item.
+        items (Iterable): Items to call `func` on.
+        limit (int): Maximum number of calls to run at once.
+        semaphore (asyncio.Semaphore, optional): Semaphore every call also
+            waits for, to limit the calls made by all callers together.
+            Defaults to None.
+
+    Yields:
+        Any: The result of each call.
+    """
+
+    async def call(item: T) -> R:
+        if semaphore is None:
+            return await func(item)
+
+        async with semaphore:
+            return await func(item)
+
+    items = iter(items)
+    pending: deque[asyncio.Task] = deque(
+        asyncio.create_task(call(item))
+        for item in itertools.islice(items, max(limit, 1))
+    )
+
+    try:
+        while pending:
+            result = await pending.popleft()
+
+            for item in itertools.islice(items, 1):
+                pending.append(asyncio.create_task(call(item)))
+
+            yield result
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,6 +1,6 @@
-import asyncio
 from math import ceil
 import discord
+from typing import Callable
 from discord import ButtonStyle
 
 
@@ -118,6 +118,11 @@ class PollButton(discord.ui.Button):
 
 
 class PollView(discord.ui.View):
+    """
+    Buttons to vote in a poll with. The poll is ended by the scheduler, the
+    view's timeout only ends it if the scheduled end was lost.
+    """
+
     def __init__(self, options: list[str], poll_length: float):
         self.options = options
 
@@ -130,13 +135,7 @@ class PollView(discord.ui.View):
             button = PollButton(number)
             children.append(button)
 
-        length_seconds = int(poll_length * 60)
-        super().__init__(*children, timeout=None)
-        asyncio.create_task(self.stop_poll(length_seconds))
-
-    async def stop_poll(self, time: int):
-        await asyncio.sleep(time)
-        self.stop()
+        super().__init__(*children, timeout=poll_length * 60 + 60)
 
     async def user_vote(self, interaction: discord.Interaction, number: int):
         if not interaction.user:
@@ -341,3 +340,67 @@ class PaginatedEmbedView(discord.ui.View):
         if interaction.id == self.author_id:
             await interaction.message.delete()
             self.stop()
+
+
+class LazyPaginatedEmbedView(discord.ui.View):
+    """
+    Paginated embeds that are only built when their page is shown, so
+    sending the view costs the same however many pages there are.
+
+    Args:
+        author_id (int): ID of the user who issued the command which instances this view
+        page_count (Callable[[], int]): Returns the number of pages. It's called again on every page change, since the pages may come from data that changes while paging.
+        get_page (Callable[[int], discord.Embed]): Builds the embed of a page, given its index.
+    """
+
+    current_page = 0
+
+    def __init__(
+        self,
+        author_id: int,
+        page_count: Callable[[], int],
+        get_page: Callable[[int], discord.Embed],
+    ):
+        super().__init__(disable_on_timeout=True)
+        self.author_id = author_id
+        self.page_count = page_count
+        self.get_page = get_page
+
+    def build_page(self) -> discord.Embed:
+        page_count = max(self.page_count(), 1)
+        self.current_page %= page_count
+        self.indicator.label = f"{self.current_page + 1}/{page_count}"
+        return self.get_page(self.current_page)
+
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message(
+                "This interaction is not for you", ephemeral=True
+            )
+            return
+
+        self.current_page = page
+        await interaction.response.edit_message(
+            embed=self.build_page(), view=self
+        )
+
+    @discord.ui.button(emoji="⏪")
+    async def previous(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        await self.show_page(interaction, self.current_page - 1)
+
+    @discord.ui.button(label="1/1", disabled=True)
+    async def indicator(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        pass
+
+    @discord.ui.button(emoji="⏩")
+    async def next(
+        self, button: discord.ui.Button, interaction: discord.Interaction
+    ):
+        await self.show_page(interaction, self.current_page + 1)
+
+    async def respond(self, ctx: discord.ApplicationContext):
+        await ctx.respond(embed=self.build_page(), view=self)
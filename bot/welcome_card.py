@@ -0,0 +1,204 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+import discord
+from PIL import Image, ImageDraw, ImageFont
+
+from bot.cache import TTLCache
+
+ASSETS_DIR = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "assets"
+)
+TEMPLATE = "welcome_image.jpg"
+
+AVATAR_SIZE = (1024, 1024)
+AVATAR_CENTER_POS = (1920, 867)
+USERNAME_CENTER_POS = (1920, 150)
+WELCOME_MSG = "Welcome To"
+WELCOME_MSG_CENTER_POS = (1920, 1600)
+SERVER_CENTER_POS = (1920, 1900)
+SERVER_FONT_SIZE = 285
+TEXT_COLOR = (255, 255, 255)
+
+# Assets of the worker process, loaded once by `_load_assets`
+_template: Image.Image | None = None
+_avatar_mask: Image.Image | None = None
+_username_font: ImageFont.FreeTypeFont | None = None
+_welcome_font: ImageFont.FreeTypeFont | None = None
+
+
+def get_asset(asset_name: str) -> str:
+    return os.path.join(ASSETS_DIR, asset_name)
+
+
+def center_to_corner(
+    center_pos: tuple[int, int], size: tuple[int, int]
+) -> tuple[int, int]:
+    return (
+        center_pos[0] - size[0] // 2,
+        center_pos[1] - size[1] // 2,
+    )
+
+
+def _load_assets():
+    global _template, _avatar_mask, _username_font, _welcome_font
+
+    _template = Image.open(get_asset(TEMPLATE))
+    _template.load()
+
+    # Draw the circle at 3x and scale it down, for smooth edges
+    bigsize = (AVATAR_SIZE[0] * 3, AVATAR_SIZE[1] * 3)
+    mask = Image.new("L", bigsize, 0)
+    ImageDraw.Draw(mask).ellipse((0, 0) + bigsize, fill=255)
+    _avatar_mask = mask.resize(AVATAR_SIZE, Image.Resampling.BILINEAR)
+
+    _username_font = ImageFont.truetype(
+        get_asset("montserrat_extrabold.otf"), 165
+    )
+    _welcome_font = ImageFont.truetype(
+        get_asset("earthorbiterxtrabold.ttf"), 250
+    )
+
+
+@lru_cache(maxsize=64)
+def _server_font(size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(get_asset("earthorbiterxtrabold.ttf"), size)
+
+
+def _draw_centered(
+    draw: ImageDraw.ImageDraw,
+    center_pos: tuple[int, int],
+    text: str,
+    font: ImageFont.FreeTypeFont,
+):
+    bbox = font.getbbox(text)
+    size = (bbox[2] - bbox[0], bbox[3] - bbox[1])
+    draw.text(
+        center_to_corner(center_pos, size), text, fill=TEXT_COLOR, font=font
+    )
+
+
+def render_card(avatar: bytes, username: str, guild_name: str) -> bytes:
+    """
+    Compose a welcome card and encode it as JPEG. Runs in a worker process,
+    after `_load_assets`.
+    """
+
+    avatar_img = Image.open(BytesIO(avatar)).convert("RGB").resize(AVATAR_SIZE)
+    avatar_img.putalpha(_avatar_mask)
+
+    card = _template.copy()
+    card.paste(
+        avatar_img,
+        center_to_corner(AVATAR_CENTER_POS, AVATAR_SIZE),
+        avatar_img,
+    )
+
+    # Make sure that server name doesnt overflow
+    server_font_size = SERVER_FONT_SIZE
+    while _server_font(server_font_size).getlength(guild_name) >= card.width:
+        server_font_size -= 5
+
+    draw = ImageDraw.Draw(card)
+    _draw_centered(draw, USERNAME_CENTER_POS, username, _username_font)
+    _draw_centered(draw, WELCOME_MSG_CENTER_POS, WELCOME_MSG, _welcome_font)
+    _draw_centered(
+        draw, SERVER_CENTER_POS, guild_name, _server_font(server_font_size)
+    )
+
+    buffer = BytesIO()
+    card.save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+class WelcomeCardRenderer:
+    """
+    Renders welcome cards in a pool of worker processes, so join bursts
+    don't block the event loop. Each worker loads the template, fonts and
+    avatar mask once, when it starts. Rendered cards are cached by avatar
+    hash, username, server name and template, so members rejoining in a
+    loop don't cost a render each time.
+
+    Args:
+        workers (int): Number of worker processes.
+        cache_size (int): Number of rendered cards to keep, 0 to disable.
+        cache_ttl (float): Seconds to keep a rendered card.
+    """
+
+    def __init__(self, workers: int, cache_size: int, cache_ttl: float):
+        self.workers = workers
+        self._executor: ProcessPoolExecutor | None = None
+        self._cards: TTLCache[tuple[str, ...], bytes] | None = (
+            TTLCache(cache_ttl, cache_size) if cache_size > 0 else None
+        )
+
+    def start(self):
+        """
+        Start the worker processes. Must be called before the bot starts
+        any thread, since a process forked while another thread holds a lock
+        can deadlock. Does nothing if they're already started.
+        """
+
+        if self._executor is not None:
+            return
+
+        # Fork where possible, since a freshly started worker would have to
+        # import the whole bot to unpickle `render_card`
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None
+        )
+        self._executor = ProcessPoolExecutor(
+            self.workers, mp_context=context, initializer=_load_assets
+        )
+
+        # Forked workers are only started by the first task, all at once
+        self._executor.submit(os.getpid)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        self.start()
+        return self._executor
+
+    async def render(
+        self, avatar: discord.Asset, username: str, guild_name: str
+    ) -> BytesIO:
+        """
+        Render a welcome card, reading the avatar into memory only when the
+        card isn't cached.
+        """
+
+        key = (avatar.key, username, guild_name, TEMPLATE)
+
+        if self._cards is not None and (data := self._cards.get(key)):
+            return BytesIO(data)
+
+        avatar_data = await avatar.read()
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(
+            self._get_executor(),
+            render_card,
+            avatar_data,
+            username,
+            guild_name,
+        )
+
+        if self._cards is not None:
+            self._cards.set(key, data)
+
+        return BytesIO(data)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+renderer = WelcomeCardRenderer(
+    workers=int(os.getenv("WELCOME_CARD_WORKERS", 2)),
+    cache_size=int(os.getenv("WELCOME_CARD_CACHE_SIZE", 16)),
+    cache_ttl=float(os.getenv("WELCOME_CARD_CACHE_TTL", 3600)),
+)
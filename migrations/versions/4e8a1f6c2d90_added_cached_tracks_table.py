@@ -0,0 +1,41 @@
+"""Added cached tracks table
+
+Revision ID: 4e8a1f6c2d90
+Revises: c7a41e9d3b58
+Create Date: 2026-10-18 21:14:05.283917
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "4e8a1f6c2d90"
+down_revision = "c7a41e9d3b58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "cached_tracks",
+        sa.Column("query", sa.String(), nullable=False),
+        sa.Column("track_id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("author", sa.String(), nullable=True),
+        sa.Column("length", sa.BigInteger(), nullable=False),
+        sa.Column("identifier", sa.String(), nullable=True),
+        sa.Column("uri", sa.String(), nullable=True),
+        sa.Column("is_stream", sa.Boolean(), nullable=False),
+        sa.Column(
+            "cached_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("query"),
+    )
+
+
+def downgrade():
+    op.drop_table("cached_tracks")
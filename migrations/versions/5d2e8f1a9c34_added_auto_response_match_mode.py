@@ -0,0 +1,32 @@
+"""Added auto response match mode
+
+Revision ID: 5d2e8f1a9c34
+Revises: ef4c153dc7d7
+Create Date: 2026-10-18 16:20:11.284913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5d2e8f1a9c34"
+down_revision = "ef4c153dc7d7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "auto_responses",
+        sa.Column(
+            "match_mode",
+            sa.String(),
+            server_default="exact",
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column("auto_responses", "match_mode")
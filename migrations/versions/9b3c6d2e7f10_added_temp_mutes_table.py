@@ -0,0 +1,34 @@
+"""Added temp mutes table
+
+Revision ID: 9b3c6d2e7f10
+Revises: 5d2e8f1a9c34
+Create Date: 2026-10-18 18:02:47.519306
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9b3c6d2e7f10"
+down_revision = "5d2e8f1a9c34"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "temp_mutes",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("guild_id", sa.BigInteger(), nullable=False),
+        sa.Column("channel_id", sa.BigInteger(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("role_id", sa.BigInteger(), nullable=False),
+        sa.Column("start", sa.DateTime(), nullable=False),
+        sa.Column("due", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("temp_mutes")
@@ -0,0 +1,78 @@
+"""Added hot path indexes
+
+Revision ID: c7a41e9d3b58
+Revises: 9b3c6d2e7f10
+Create Date: 2026-10-18 19:11:05.836214
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c7a41e9d3b58"
+down_revision = "9b3c6d2e7f10"
+branch_labels = None
+depends_on = None
+
+
+def delete_duplicates(table: str, columns: list[str]):
+    # Keep one row of each group of duplicates, so that the unique index can
+    # be created
+    matching_columns = " AND ".join(f"a.{c} = b.{c}" for c in columns)
+    op.execute(
+        sa.text(
+            f"DELETE FROM {table} a USING {table} b "
+            f"WHERE {matching_columns} AND a.id > b.id"
+        )
+    )
+
+
+def upgrade():
+    delete_duplicates("auto_responses", ["guild_id", "activation"])
+    op.create_index(
+        "ix_auto_responses_activation",
+        "auto_responses",
+        ["guild_id", "activation"],
+        unique=True,
+    )
+
+    reaction_role_columns = [
+        "guild_id",
+        "channel_id",
+        "message_id",
+        "emoji",
+        "role_id",
+    ]
+    delete_duplicates("reaction_roles", reaction_role_columns)
+    op.create_index(
+        "ix_reaction_roles_message",
+        "reaction_roles",
+        reaction_role_columns,
+        unique=True,
+    )
+
+    op.create_index(
+        "ix_infractions_guild_user", "infractions", ["guild_id", "user_id"]
+    )
+    op.create_index(
+        "ix_impersonation_logs_guild_timestamp",
+        "impersonation_logs",
+        ["guild_id", "timestamp"],
+    )
+    op.create_index("ix_playlists_owner", "playlists", ["owner_id"])
+    op.create_index("ix_reminders_due", "reminders", ["due", "id"])
+    op.create_index("ix_temp_mutes_due", "temp_mutes", ["due", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_temp_mutes_due", table_name="temp_mutes")
+    op.drop_index("ix_reminders_due", table_name="reminders")
+    op.drop_index("ix_playlists_owner", table_name="playlists")
+    op.drop_index(
+        "ix_impersonation_logs_guild_timestamp",
+        table_name="impersonation_logs",
+    )
+    op.drop_index("ix_infractions_guild_user", table_name="infractions")
+    op.drop_index("ix_reaction_roles_message", table_name="reaction_roles")
+    op.drop_index("ix_auto_responses_activation", table_name="auto_responses")
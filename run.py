@@ -1,7 +1,503 @@
+import argparse
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import time
+import urllib.request
+
 import dotenv
 
+# Seconds to wait before restarting a crashed cluster, doubled on every
+# crash until the cluster stays up for STABLE_UPTIME seconds
+RESTART_DELAY = 1
+MAX_RESTART_DELAY = 60
+STABLE_UPTIME = 60
+
+# Discord allows one identify every 5 seconds, so clusters are started
+# staggered by the number of shards they identify
+IDENTIFY_INTERVAL = 5
+
+STATS_INTERVAL = 30
+
+# Clusters only know their own guilds, so the supervisor posts the total to
+# Top.gg, as often as its client autoposts
+TOPGG_POST_INTERVAL = 900
+
+FAKE_GUILDS_PER_SHARD = 1000
+FAKE_EVENT_RATE = 50
+
+
+def shard_ranges(shard_count: int, clusters: int) -> list[range]:
+    """
+    Split the shards into contiguous ranges, one for each cluster, whose
+    sizes differ by at most one.
+    """
+
+    if not 0 < clusters <= shard_count:
+        raise ValueError(
+            f"Can't split {shard_count} shards into {clusters} clusters"
+        )
+
+    size, extra = divmod(shard_count, clusters)
+    ranges = []
+    start = 0
+
+    for cluster_id in range(clusters):
+        end = start + size + (cluster_id < extra)
+        ranges.append(range(start, end))
+        start = end
+
+    return ranges
+
+
+def get_shard_count(token: str) -> int:
+    """
+    Get the number of shards Discord recommends for the bot.
+    """
+
+    request = urllib.request.Request(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={
+            "Authorization": f"Bot {token}",
+            "User-Agent": "DiscordBot (SpartaBot)",
+        },
+    )
+
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)["shards"]
+
+
+def post_topgg_stats(token: str, guild_count: int, shard_count: int):
+    """
+    Post the bot's server and shard counts to Top.gg.
+    """
+
+    request = urllib.request.Request(
+        "https://top.gg/api/bots/stats",
+        data=json.dumps(
+            {"server_count": guild_count, "shard_count": shard_count}
+        ).encode(),
+        headers={"Authorization": token, "Content-Type": "application/json"},
+        method="POST",
+    )
+
+    with urllib.request.urlopen(request, timeout=10):
+        pass
+
+
+async def fake_shard(shard_id: int, events: dict[int, int], lag: dict):
+    """
+    Receive events at random, at FAKE_EVENT_RATE events per second on
+    average, recording how late the latest ones were handled.
+    """
+
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+
+    while True:
+        due += random.expovariate(FAKE_EVENT_RATE)
+        await asyncio.sleep(max(due - loop.time(), 0))
+        lag[shard_id] = max(lag[shard_id], loop.time() - due)
+        events[shard_id] += 1
+
+
+async def fake_load():
+    """
+    Block the event loop like a burst of synchronous image rendering would.
+    """
+
+    while True:
+        await asyncio.sleep(5)
+        end = time.perf_counter() + 1
+
+        while time.perf_counter() < end:
+            math.factorial(1000)
+
+
+async def fake_cluster(
+    cluster_id: int, shard_ids: list[int], stats, load: bool, interval=10
+):
+    """
+    Stand in for the bot, to try the launcher locally without connecting
+    to Discord. Reports stats in the same format as the bot, with the
+    longest lag of event handling since the last report as the shards'
+    latency.
+    """
+
+    events = dict.fromkeys(shard_ids, 0)
+    lag = dict.fromkeys(shard_ids, 0.0)
+    tasks = [
+        asyncio.create_task(fake_shard(shard_id, events, lag))
+        for shard_id in shard_ids
+    ]
+
+    if load:
+        tasks.append(asyncio.create_task(fake_load()))
+
+    last_events = dict(events)
+
+    while True:
+        await asyncio.sleep(interval)
+        shards = [
+            {
+                "id": shard_id,
+                "latency": lag[shard_id],
+                "event_rate": (events[shard_id] - last_events[shard_id])
+                / interval,
+                "events": events[shard_id],
+                "guilds": FAKE_GUILDS_PER_SHARD,
+                "closed": False,
+            }
+            for shard_id in shard_ids
+        ]
+        last_events = dict(events)
+        lag.update(dict.fromkeys(shard_ids, 0.0))
+
+        stats.put(
+            (
+                cluster_id,
+                {
+                    "guilds": FAKE_GUILDS_PER_SHARD * len(shard_ids),
+                    "shards": shards,
+                },
+            )
+        )
+
+
+def run_cluster(
+    cluster_id: int,
+    shard_ids: list[int],
+    shard_count: int,
+    stats,
+    total_guilds,
+    fake_gateway: bool,
+    load: bool,
+):
+    """
+    Entrypoint of a cluster's process.
+    """
+
+    if fake_gateway:
+        asyncio.run(fake_cluster(cluster_id, shard_ids, stats, load))
+        return
+
+    # The bot reads its shards when it's imported
+    os.environ["CLUSTER_ID"] = str(cluster_id)
+    os.environ["SHARD_COUNT"] = str(shard_count)
+    os.environ["SHARD_IDS"] = ",".join(map(str, shard_ids))
+    import bot
+
+    bot.main(stats, total_guilds)
+
+
+class Cluster:
+    def __init__(self, cluster_id: int, shard_ids: list[int]):
+        self.id = cluster_id
+        self.shard_ids = shard_ids
+        self.process: multiprocessing.Process | None = None
+        self.started_at = 0.0
+        self.start_at = 0.0
+        self.restart_delay = RESTART_DELAY
+        self.restarts = 0
+        self.stats: dict | None = None
+
+
+class Supervisor:
+    """
+    Runs the bot's shards in a process per cluster, each cluster running a
+    contiguous range of shards, and restarts clusters that crash.
+
+    Args:
+        shard_count (int): Total number of shards.
+        clusters (int): Number of clusters to split the shards into.
+        fake_gateway (bool, optional): Run fake clusters that simulate
+            events instead of connecting to Discord. Defaults to False.
+        fake_load (bool, optional): Make the first fake cluster
+            periodically block its event loop. Defaults to False.
+        topgg_token (str | None, optional): Top.gg token to post the total
+            guild count with, once every cluster reported its stats.
+            Defaults to None.
+    """
+
+    def __init__(
+        self,
+        shard_count: int,
+        clusters: int,
+        fake_gateway: bool = False,
+        fake_load: bool = False,
+        topgg_token: str | None = None,
+    ):
+        self.shard_count = shard_count
+        self.fake_gateway = fake_gateway
+        self.fake_load = fake_load
+        self.topgg_token = topgg_token
+        self.clusters = [
+            Cluster(cluster_id, list(shards))
+            for cluster_id, shards in enumerate(
+                shard_ranges(shard_count, clusters)
+            )
+        ]
+
+        # Spawn rather than fork, so workers start from a clean interpreter
+        # and import the bot with their own shards
+        self._context = multiprocessing.get_context("spawn")
+        self._stats = self._context.Queue()
+        # Guild count of all clusters, shown by each cluster's presence
+        self._total_guilds = self._context.Value("q", 0)
+
+        if not fake_gateway:
+            start_at = time.monotonic()
+
+            for cluster in self.clusters:
+                cluster.start_at = start_at
+                start_at += len(cluster.shard_ids) * IDENTIFY_INTERVAL
+
+    def start_cluster(self, cluster: Cluster):
+        print(f"Starting cluster {cluster.id} with shards {cluster.shard_ids}")
+        cluster.process = self._context.Process(
+            target=run_cluster,
+            args=(
+                cluster.id,
+                cluster.shard_ids,
+                self.shard_count,
+                self._stats,
+                self._total_guilds,
+                self.fake_gateway,
+                self.fake_load and cluster.id == 0,
+            ),
+            name=f"cluster-{cluster.id}",
+        )
+        cluster.process.start()
+        cluster.started_at = time.monotonic()
+
+    def check_clusters(self):
+        """
+        Start clusters that are due to start, and schedule the restart of
+        clusters that exited.
+        """
+
+        now = time.monotonic()
+
+        for cluster in self.clusters:
+            process = cluster.process
+
+            if process is None:
+                if now >= cluster.start_at:
+                    self.start_cluster(cluster)
+
+                continue
+
+            if process.is_alive():
+                continue
+
+            uptime = now - cluster.started_at
+
+            if uptime >= STABLE_UPTIME:
+                cluster.restart_delay = RESTART_DELAY
+
+            print(
+                f"Cluster {cluster.id} exited with code {process.exitcode} "
+                f"after {uptime:.0f}s, restarting in "
+                f"{cluster.restart_delay}s"
+            )
+
+            cluster.process = None
+            cluster.stats = None
+            cluster.restarts += 1
+            cluster.start_at = now + cluster.restart_delay
+            cluster.restart_delay = min(
+                cluster.restart_delay * 2, MAX_RESTART_DELAY
+            )
+
+    def collect_stats(self):
+        while True:
+            try:
+                cluster_id, stats = self._stats.get_nowait()
+            except queue.Empty:
+                return
+
+            cluster = self.clusters[cluster_id]
+
+            if cluster.process is not None:
+                cluster.stats = stats
+
+            if all(cluster.stats for cluster in self.clusters):
+                self._total_guilds.value = self.aggregate_stats()["guilds"]
+
+    def aggregate_stats(self) -> dict:
+        """
+        Get the totals of the latest stats reported by all clusters.
+        """
+
+        shards = [
+            shard
+            for cluster in self.clusters
+            if cluster.stats
+            for shard in cluster.stats["shards"]
+        ]
+        latencies = [
+            shard["latency"]
+            for shard in shards
+            if not math.isnan(shard["latency"])
+        ]
+
+        return {
+            "clusters": len(self.clusters),
+            "running": sum(
+                cluster.process is not None for cluster in self.clusters
+            ),
+            "restarts": sum(cluster.restarts for cluster in self.clusters),
+            "shards": len(shards),
+            "closed_shards": sum(shard["closed"] for shard in shards),
+            "guilds": sum(
+                cluster.stats["guilds"]
+                for cluster in self.clusters
+                if cluster.stats
+            ),
+            "event_rate": sum(shard["event_rate"] for shard in shards),
+            "max_latency": max(latencies, default=0.0),
+        }
+
+    def print_stats(self):
+        for cluster in self.clusters:
+            if not cluster.stats:
+                print(f"Cluster {cluster.id}: no stats yet")
+                continue
+
+            shards = cluster.stats["shards"]
+            event_rate = sum(shard["event_rate"] for shard in shards)
+            latency = max(
+                (
+                    shard["latency"]
+                    for shard in shards
+                    if not math.isnan(shard["latency"])
+                ),
+                default=0.0,
+            )
+            print(
+                f"Cluster {cluster.id}: {cluster.stats['guilds']} guilds, "
+                f"{event_rate:.1f} events/s, "
+                f"{latency * 1000:.0f}ms max latency, "
+                f"{cluster.restarts} restarts"
+            )
+
+        stats = self.aggregate_stats()
+        print(
+            f"Total: {stats['running']}/{stats['clusters']} clusters, "
+            f"{stats['shards'] - stats['closed_shards']}/{self.shard_count} "
+            f"shards connected, {stats['guilds']} guilds, "
+            f"{stats['event_rate']:.1f} events/s"
+        )
+
+    def post_stats(self) -> bool:
+        """
+        Post the total guild count to Top.gg, if every cluster reported its
+        stats. Returns whether it was posted.
+        """
+
+        if not all(cluster.stats for cluster in self.clusters):
+            return False
+
+        try:
+            post_topgg_stats(
+                self.topgg_token,
+                self.aggregate_stats()["guilds"],
+                self.shard_count,
+            )
+        except Exception as e:
+            print(f"Failed to post stats to Top.gg: {e!r}")
+
+        return True
+
+    def stop(self):
+        for cluster in self.clusters:
+            if cluster.process is not None:
+                cluster.process.terminate()
+
+        for cluster in self.clusters:
+            if cluster.process is not None:
+                cluster.process.join()
+
+    def run(self):
+        next_report = time.monotonic() + STATS_INTERVAL
+        next_post = time.monotonic()
+
+        try:
+            while True:
+                self.check_clusters()
+                self.collect_stats()
+
+                if time.monotonic() >= next_report:
+                    self.print_stats()
+                    next_report += STATS_INTERVAL
+
+                if (
+                    self.topgg_token
+                    and time.monotonic() >= next_post
+                    and self.post_stats()
+                ):
+                    next_post = time.monotonic() + TOPGG_POST_INTERVAL
+
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            print("Stopping clusters...")
+            self.stop()
+
+
 if __name__ == "__main__":
     dotenv.load_dotenv()
-    import bot
 
-    bot.main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clusters",
+        type=int,
+        help="run the shards in this many processes",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="total number of shards, defaults to SHARD_COUNT or the "
+        "number recommended by Discord",
+    )
+    parser.add_argument(
+        "--fake-gateway",
+        action="store_true",
+        help="run clusters that simulate events instead of the bot",
+    )
+    parser.add_argument(
+        "--fake-load",
+        action="store_true",
+        help="make the first fake cluster block its event loop regularly",
+    )
+
+    # Other arguments, like --debug, are read by the bot
+    args, _ = parser.parse_known_args()
+
+    if args.clusters is None and not args.fake_gateway:
+        import bot
+
+        bot.main()
+    else:
+        clusters = args.clusters or 1
+        shard_count = args.shards or int(os.getenv("SHARD_COUNT", 0))
+
+        if not shard_count:
+            shard_count = (
+                clusters
+                if args.fake_gateway
+                else get_shard_count(os.environ["TOKEN"])
+            )
+
+        Supervisor(
+            shard_count,
+            clusters,
+            args.fake_gateway,
+            args.fake_load,
+            None if args.fake_gateway else os.getenv("DBL_TOKEN"),
+        ).run()
@@ -0,0 +1,141 @@
+"""
+Print the query plans of the bot's hot path lookups on seeded tables, first
+without and then with the indexes declared in bot/db/models.py.
+
+Usage: python scripts/bench_query_plans.py [rows]
+
+DB_URI must point to a PostgreSQL database. The tables are created in a
+scratch schema, which is never committed.
+"""
+
+import asyncio
+import os
+import sys
+
+import dotenv
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+dotenv.load_dotenv()
+from bot.db.models import Base  # noqa: E402
+
+SCHEMA = "query_plan_bench"
+
+# Seeds each table with rows numbered from 1 to :rows
+SEEDS = {
+    "auto_responses": """
+        INSERT INTO auto_responses
+            (id, guild_id, activation, response, match_mode)
+        SELECT md5(i::text), i % 1000, 'activation ' || i, 'response', 'exact'
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+    "reaction_roles": """
+        INSERT INTO reaction_roles
+            (id, guild_id, channel_id, message_id, emoji, role_id)
+        SELECT md5(i::text), i % 1000, i % 5000, i, 'emoji', i
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+    "infractions": """
+        INSERT INTO infractions
+            (id, guild_id, user_id, moderator_id, reason)
+        SELECT md5(i::text), i % 1000, i % 20000, 1, 'reason'
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+    "impersonation_logs": """
+        INSERT INTO impersonation_logs
+            (id, guild_id, channel_id, message_id, user_id, impersonator_id,
+            message, timestamp)
+        SELECT md5(i::text), i % 1000, 1, i, i, 1, 'message',
+            now() - i * interval '1 second'
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+    "playlists": """
+        INSERT INTO playlists (id, owner_id, name)
+        SELECT md5(i::text), i % 50000, 'playlist'
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+    "reminders": """
+        INSERT INTO reminders (id, user_id, message, start, due)
+        SELECT md5(i::text), i, 'message', now(),
+            now() + i * interval '1 minute'
+        FROM generate_series(1, CAST(:rows AS integer)) AS i
+    """,
+}
+
+QUERIES = {
+    "Auto response by activation": """
+        SELECT * FROM auto_responses
+        WHERE guild_id = 42 AND activation = 'activation 42042'
+    """,
+    "Reaction role by message and emoji": """
+        SELECT * FROM reaction_roles
+        WHERE guild_id = 42 AND channel_id = 42 AND message_id = 5042
+            AND emoji = 'emoji'
+    """,
+    "Infractions of a member": """
+        SELECT * FROM infractions WHERE guild_id = 42 AND user_id = 42
+    """,
+    "Impersonation logs of a server": """
+        SELECT * FROM impersonation_logs
+        WHERE guild_id = 42 ORDER BY timestamp DESC
+    """,
+    "Playlists of a user": """
+        SELECT * FROM playlists WHERE owner_id = 42
+    """,
+    "Next page of due reminders": """
+        SELECT id, due FROM reminders
+        WHERE due <= now() + interval '1 hour'
+        ORDER BY due, id LIMIT 500
+    """,
+}
+
+
+async def print_plans(conn: AsyncConnection, title: str):
+    print(f"\n===== {title} =====")
+
+    for name, query in QUERIES.items():
+        result = await conn.execute(text(f"EXPLAIN ANALYZE {query}"))
+        print(f"\n{name}:")
+
+        for (line,) in result:
+            print(f"    {line}")
+
+
+async def main(rows: int):
+    engine = create_async_engine(os.environ["DB_URI"])
+    tables = [Base.metadata.tables[name] for name in SEEDS]
+
+    async with engine.connect() as conn:
+        await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        await conn.execute(text(f"SET search_path TO {SCHEMA}"))
+
+        try:
+            for table in tables:
+                await conn.run_sync(table.create)
+
+                for index in table.indexes:
+                    await conn.run_sync(index.drop)
+
+                await conn.execute(text(SEEDS[table.name]), {"rows": rows})
+                await conn.execute(text(f"ANALYZE {table.name}"))
+
+            await print_plans(conn, "Without indexes")
+
+            for table in tables:
+                for index in table.indexes:
+                    await conn.run_sync(index.create)
+
+                await conn.execute(text(f"ANALYZE {table.name}"))
+
+            await print_plans(conn, "With indexes")
+        finally:
+            # Everything ran in one transaction, rolling it back drops the
+            # scratch schema
+            await conn.rollback()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000))
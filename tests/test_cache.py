@@ -0,0 +1,288 @@
+import asyncio
+import sys
+import os
+import time
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.cache import (
+    AFKUsers,
+    AutoResponseMatcher,
+    ReactionRoleIndex,
+    ReadThroughCache,
+    TrackCache,
+    TTLCache,
+)
+from bot import db, lavalink
+from bot.db import models
+from bot.invalidation import LocalBus
+
+
+def test_ttl_cache_expiry(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+
+    cache = TTLCache(ttl=10)
+    cache.set("prefix", "s!")
+    assert cache.get("prefix") == "s!"
+    assert "prefix" in cache
+
+    now += 11
+    assert cache.get("prefix") is None
+    assert "prefix" not in cache
+    assert len(cache) == 0
+
+
+def test_ttl_cache_lru_eviction():
+    cache = TTLCache(ttl=60, max_size=2)
+    cache.set(1, "a")
+    cache.set(2, "b")
+
+    # Touch 1 so that 2 becomes the least recently used entry
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+
+    assert 2 not in cache
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache.pop(3) == "c"
+    assert cache.get(3, "missing") == "missing"
+
+
+def test_auto_response_matcher():
+    def auto_resp(activation: str, response: str, mode: str):
+        return models.AutoResponse(
+            activation=activation, response=response, match_mode=mode
+        )
+
+    matcher = AutoResponseMatcher(
+        [
+            auto_resp("hello", "exact hello", "exact"),
+            auto_resp("gm", "good morning", "word"),
+            auto_resp("gm all", "good morning everyone", "word"),
+            auto_resp("lol", "haha", "substring"),
+        ]
+    )
+
+    assert matcher.match("hello") == "exact hello"
+    assert matcher.match("hello there") is None
+    assert matcher.match("gm!") == "good morning"
+    assert matcher.match("gm all") == "good morning everyone"
+    assert matcher.match("gmail") is None
+    assert matcher.match("trololol") == "haha"
+    assert matcher.match("nothing to see") is None
+
+
+def test_reaction_role_index():
+    def reaction_role(id: str, emoji: str, role_id: int):
+        return models.ReactionRole(
+            id=id, message_id=1, emoji=emoji, role_id=role_id
+        )
+
+    index = ReactionRoleIndex()
+    index.loaded = True
+    index.add(reaction_role("a", "👍", 10))
+    index.add(reaction_role("b", "👍", 11))
+    index.add(reaction_role("c", "👎", 12))
+
+    def role_ids(emoji: str):
+        return asyncio.run(index.get_role_ids(5, 6, 1, emoji))
+
+    assert role_ids("👍") == [10, 11]
+    index.remove("a")
+    assert role_ids("👍") == [11]
+    index.remove("c")
+    index.remove("c")
+    assert role_ids("👎") == []
+    assert asyncio.run(index.get_role_ids(5, 6, 2, "👍")) == []
+
+
+def test_read_through_cache_invalidated_by_other_process():
+    class Cache(ReadThroughCache[int, str]):
+        async def _fetch(self, key: int) -> str:
+            return f"fetched {key}"
+
+    bus_a = LocalBus()
+    bus_b = LocalBus()
+    bus_a.peers.append(bus_b)
+    bus_b.peers.append(bus_a)
+    cache_a = Cache(10, topic="guilds", bus=bus_a)
+    cache_b = Cache(10, topic="guilds", bus=bus_b)
+
+    async def main():
+        await cache_b.get(1)
+        await cache_b.get(2)
+
+        cache_a.put(1, "updated")
+        await cache_a.publish(1)
+        assert await cache_a.get(1) == "updated"
+        assert 1 not in cache_b._cache
+        assert 2 in cache_b._cache
+
+        bus_b._deliver_all()
+        assert len(cache_b._cache) == 0
+
+    asyncio.run(main())
+
+
+def test_track_cache_skips_lavalink_on_hit(monkeypatch):
+    url = "https://www.youtube.com/watch?v=abc"
+    searches = []
+
+    async def search(cls, query):
+        searches.append(query)
+        info = {"title": "Song", "length": 60_000, "uri": url}
+        return [cls("encoded", info)]
+
+    monkeypatch.setattr(lavalink.pool, "search", search)
+    tracks = TrackCache(60)
+
+    async def main():
+        track = await tracks.search("  Some   SONG ")
+        assert track.uri == url
+
+        # Same query once normalized, and the URL the search found
+        assert await tracks.search("some song") is track
+        assert await tracks.search(url) is track
+
+    asyncio.run(main())
+    assert searches == ["some song"]
+
+
+def test_reaction_role_index_retries_load(monkeypatch):
+    attempts = []
+
+    async def query(*where):
+        attempts.append(where)
+
+        if len(attempts) < 3:
+            raise ConnectionError("database is down")
+
+        return [
+            models.ReactionRole(id="a", message_id=1, emoji="👍", role_id=10)
+        ]
+
+    index = ReactionRoleIndex()
+    monkeypatch.setattr(index, "_query", query)
+
+    async def main():
+        await index.load(max_delay=0)
+        assert index.loaded
+        assert await index.get_role_ids(5, 6, 1, "👍") == [10]
+
+    asyncio.run(main())
+    assert len(attempts) == 3
+
+
+def test_reaction_role_index_falls_back_to_queries(monkeypatch):
+    queries = []
+
+    async def query(*where):
+        queries.append(where)
+
+        if not where:
+            raise ConnectionError("database is down")
+
+        return [
+            models.ReactionRole(id="a", message_id=1, emoji="👍", role_id=10)
+        ]
+
+    index = ReactionRoleIndex()
+    monkeypatch.setattr(index, "_query", query)
+
+    async def main():
+        await index.load(max_delay=0, max_attempts=2)
+        assert not index.loaded
+        assert await index.get_role_ids(5, 6, 1, "👍") == [10]
+
+    asyncio.run(main())
+    assert len(queries) == 3
+
+    # Filtered by the leading columns of the unique index
+    columns = [condition.left.name for condition in queries[-1]]
+    assert columns == ["guild_id", "channel_id", "message_id", "emoji"]
+
+
+def test_afk_users_synced_across_processes(monkeypatch):
+    bus_a = LocalBus()
+    bus_b = LocalBus()
+    bus_a.peers.append(bus_b)
+    afk_a = AFKUsers(bus=bus_a)
+    afk_b = AFKUsers(bus=bus_b)
+    rows = {1, 2}
+
+    async def query(*where) -> set[int]:
+        return rows if not where else rows & {where[0].right.value}
+
+    monkeypatch.setattr(afk_b, "_query", query)
+
+    async def main():
+        afk_a.add(1)
+        await afk_a.publish(1)
+        rows.discard(2)
+        await afk_a.publish(2)
+        await asyncio.sleep(0)
+        assert afk_b.user_ids == {1}
+
+        rows.add(3)
+        bus_b._deliver_all()
+        await asyncio.sleep(0)
+        assert afk_b.user_ids == {1, 3}
+        assert afk_b.loaded
+
+    asyncio.run(main())
+
+
+def test_track_cache_prunes_expired_rows(monkeypatch):
+    statements = []
+
+    class Session:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc_info):
+            pass
+
+        async def scalar(self, q):
+            return None
+
+        async def execute(self, q):
+            statements.append(q.__visit_name__)
+
+        async def commit(self):
+            pass
+
+    async def search(cls, query):
+        return [cls("encoded", {"title": query, "length": 60_000})]
+
+    monkeypatch.setattr(db, "async_session", Session)
+    monkeypatch.setattr(lavalink.pool, "search", search)
+    tracks = TrackCache(60, persist=True)
+
+    async def main():
+        await tracks.search("one")
+        await tracks.search("two")
+
+    asyncio.run(main())
+
+    # Expired rows are only deleted once per prune interval
+    assert statements == ["insert", "delete", "insert"]
+
+
+def test_track_cache_forgets_missing_tracks_sooner(monkeypatch):
+    searches = []
+
+    async def search(cls, query):
+        searches.append(query)
+        return []
+
+    monkeypatch.setattr(lavalink.pool, "search", search)
+    tracks = TrackCache(60, not_found_ttl=0)
+
+    async def main():
+        assert await tracks.search("missing") is None
+        assert await tracks.search("missing") is None
+
+    asyncio.run(main())
+    assert searches == ["missing", "missing"]
@@ -0,0 +1,66 @@
+import sys
+import os
+
+import pytest
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+import run
+from run import Supervisor, shard_ranges
+
+
+def test_shard_ranges_are_contiguous_and_balanced():
+    assert shard_ranges(10, 3) == [range(0, 4), range(4, 7), range(7, 10)]
+    assert shard_ranges(2, 2) == [range(0, 1), range(1, 2)]
+
+    with pytest.raises(ValueError):
+        shard_ranges(2, 3)
+
+
+def test_supervisor_aggregates_cluster_stats():
+    supervisor = Supervisor(4, 2, fake_gateway=True)
+    shard = {"latency": 0.1, "event_rate": 2.5, "closed": False}
+    supervisor.clusters[0].stats = {
+        "guilds": 10,
+        "shards": [{**shard, "id": 0}, {**shard, "id": 1}],
+    }
+    supervisor.clusters[1].restarts = 1
+
+    stats = supervisor.aggregate_stats()
+
+    assert stats["guilds"] == 10
+    assert stats["shards"] == 2
+    assert stats["event_rate"] == 5.0
+    assert stats["restarts"] == 1
+    assert stats["running"] == 0
+
+
+def test_supervisor_posts_total_once_every_cluster_reported(monkeypatch):
+    posts = []
+    monkeypatch.setattr(
+        run, "post_topgg_stats", lambda *args: posts.append(args)
+    )
+
+    supervisor = Supervisor(4, 2, topgg_token="token")
+    supervisor.clusters[0].stats = {"guilds": 10, "shards": []}
+    assert not supervisor.post_stats()
+
+    supervisor.clusters[1].stats = {"guilds": 5, "shards": []}
+    assert supervisor.post_stats()
+    assert posts == [("token", 15, 4)]
+
+
+def test_supervisor_shares_total_guild_count():
+    supervisor = Supervisor(4, 2, fake_gateway=True)
+    supervisor._stats.put((0, {"guilds": 10, "shards": []}))
+    supervisor._stats.put((1, {"guilds": 5, "shards": []}))
+
+    # Stats of clusters that aren't running are dropped
+    for cluster in supervisor.clusters:
+        cluster.process = object()
+
+    while supervisor._total_guilds.value == 0:
+        supervisor.collect_stats()
+
+    assert supervisor._total_guilds.value == 15
@@ -0,0 +1,78 @@
+import asyncio
+import sys
+import types
+import os
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot import db
+from bot.invalidation import PostgresBus
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def close(self):
+        self.closed = True
+
+    async def execute(self, q):
+        pass
+
+    async def scalars(self, q):
+        return types.SimpleNamespace(first=lambda: None, one=lambda: None)
+
+    async def commit(self):
+        self.committed = True
+
+
+def test_scoped_session(monkeypatch):
+    monkeypatch.setattr(db, "async_session", FakeSession)
+
+    async def child_session() -> FakeSession:
+        async with db.scoped_session() as session:
+            return session
+
+    async def main():
+        async with db.scoped_session() as outer:
+            async with db.scoped_session() as inner:
+                assert inner is outer
+
+            # Other tasks never share the session
+            assert await asyncio.create_task(child_session()) is not outer
+            assert not outer.closed
+
+        assert outer.closed
+
+    asyncio.run(main())
+
+
+def test_publish_never_commits_callers_session(monkeypatch):
+    monkeypatch.setattr(db, "async_session", FakeSession)
+
+    async def main():
+        async with db.scoped_session() as session:
+            await PostgresBus().publish("guilds", 1)
+            assert not session.committed
+
+    asyncio.run(main())
+
+
+def test_guild_helpers_never_commit_callers_session(monkeypatch):
+    monkeypatch.setattr(db, "async_session", FakeSession)
+
+    async def main():
+        async with db.scoped_session() as session:
+            await db.ensure_guilds([1, 2])
+            await db.upsert_guild(1, prefix="!")
+            assert not session.committed
+
+    asyncio.run(main())
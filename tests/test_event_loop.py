@@ -0,0 +1,34 @@
+import asyncio
+import sys
+import os
+import time
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.event_loop import LoopLagMonitor, new_event_loop
+
+
+def test_loop_lag_monitor_reports_blocking_calls(capsys):
+    def render_synchronously():
+        time.sleep(0.3)
+
+    async def main():
+        monitor = LoopLagMonitor(interval=0.05, threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.1)
+        render_synchronously()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+        return monitor
+
+    loop = new_event_loop()
+
+    try:
+        monitor = loop.run_until_complete(main())
+    finally:
+        loop.close()
+
+    assert monitor.blocked == 1
+    assert monitor.max_lag >= 0.25
+    assert "render_synchronously" in capsys.readouterr().out
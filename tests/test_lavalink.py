@@ -0,0 +1,173 @@
+import asyncio
+import sys
+import os
+import types
+
+import wavelink
+from aiohttp import web
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.lavalink import NodeConfig, NodeHealth, NodePool, parse_nodes
+
+
+class FakeLavalink:
+    """
+    Local stand-in for a Lavalink server, which sends its stats on connect
+    and records the operations it receives.
+    """
+
+    def __init__(self, system_load: float = 0.0):
+        self.system_load = system_load
+        self.ops: list[dict] = []
+        self.sockets: list[web.WebSocketResponse] = []
+        self.port = 0
+        self._runner: web.AppRunner | None = None
+
+    async def _websocket(self, request: web.Request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        await ws.send_json(
+            {
+                "op": "stats",
+                "uptime": 0,
+                "players": 0,
+                "playingPlayers": 0,
+                "memory": {
+                    "free": 0,
+                    "used": 0,
+                    "allocated": 0,
+                    "reservable": 0,
+                },
+                "cpu": {
+                    "cores": 1,
+                    "systemLoad": self.system_load,
+                    "lavalinkLoad": self.system_load,
+                },
+            }
+        )
+
+        async for msg in ws:
+            self.ops.append(msg.json())
+
+        return ws
+
+    async def _load_tracks(self, request: web.Request):
+        info = {"title": request.query["identifier"], "length": 60_000}
+        return web.json_response(
+            {
+                "loadType": "SEARCH_RESULT",
+                "tracks": [{"track": "encoded", "info": info}],
+            }
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/", self._websocket)
+        app.router.add_get("/loadtracks", self._load_tracks)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for ws in self.sockets:
+            await ws.close()
+
+        await self._runner.cleanup()
+
+
+def test_parse_nodes():
+    configs = parse_nodes("a@one:2333, two:2334,", "default")
+    assert [(c.host, c.port, c.password) for c in configs] == [
+        ("one", 2333, "a"),
+        ("two", 2334, "default"),
+    ]
+
+
+def test_node_pool_balances_and_moves_players():
+    bot = types.SimpleNamespace(
+        user=types.SimpleNamespace(id=1),
+        dispatch=lambda *args, **kwargs: None,
+        get_guild=lambda guild_id: None,
+    )
+    guild = types.SimpleNamespace(id=10)
+    channel = types.SimpleNamespace(id=20, guild=guild)
+
+    async def main():
+        busy, idle = FakeLavalink(system_load=0.9), FakeLavalink()
+        await busy.start()
+        await idle.start()
+
+        pool = NodePool(check_interval=60)
+        await pool.connect(
+            bot,
+            [
+                NodeConfig("127.0.0.1", busy.port, "pw"),
+                NodeConfig("127.0.0.1", idle.port, "pw"),
+            ],
+        )
+
+        try:
+            # Wait for the stats that are sent on connect
+            while not all(node.stats for node in pool.nodes.values()):
+                await asyncio.sleep(0.01)
+
+            busy_node, idle_node = pool.nodes.values()
+            assert pool.get_node() is idle_node
+
+            tracks = await pool.search(wavelink.YouTubeTrack, "song")
+            assert tracks[0].title == "ytsearch:song"
+
+            # A player that was playing on the node that goes down
+            player = wavelink.Player(bot, channel, node=busy_node)
+            player._connected = True
+            player._voice_state = {"sessionId": "s", "event": {"token": "t"}}
+            await player.play(tracks[0])
+            await player.set_volume(50)
+
+            await busy.stop()
+
+            while busy_node.is_connected():
+                await asyncio.sleep(0.01)
+
+            await pool.check()
+            assert player.node is idle_node
+            assert player in idle_node.players
+            assert [op["op"] for op in idle.ops][-3:] == [
+                "voiceUpdate",
+                "play",
+                "volume",
+            ]
+
+            report = {node["id"]: node for node in pool.report()}
+            assert report[busy_node.identifier]["disconnects"] == 1
+            assert report[busy_node.identifier]["migrated_players"] == 1
+        finally:
+            pool.stop()
+
+            for node in list(pool.nodes.values()):
+                await node.cleanup()
+
+            await idle.stop()
+
+    asyncio.run(main())
+
+
+def test_node_pool_check_survives_nodes_added_meanwhile():
+    pool = NodePool(check_interval=60)
+    down = types.SimpleNamespace(is_connected=lambda: False, players=[])
+    pool.nodes["down"] = down
+    pool.health["down"] = NodeHealth()
+
+    async def reconnect(node):
+        # What connect does while check waits on a reconnect
+        pool.nodes["new"] = down
+        pool.health["new"] = NodeHealth()
+
+    pool._reconnect = reconnect
+    asyncio.run(pool.check())
+    assert "new" in pool.nodes
@@ -0,0 +1,50 @@
+import sys
+import os
+
+import pytest
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot import metrics
+
+
+def test_track_records_time_errors_and_in_flight(monkeypatch):
+    registry = metrics.Registry()
+    histogram = registry.register(
+        metrics.Histogram("test_seconds", "Test.", ("kind", "handler"))
+    )
+    errors = registry.register(
+        metrics.Counter("test_errors_total", "Test.", ("kind", "handler"))
+    )
+    in_flight = registry.register(
+        metrics.Gauge("test_in_flight", "Test.", ("kind", "handler"))
+    )
+    monkeypatch.setattr(metrics, "handler_seconds", histogram)
+    monkeypatch.setattr(metrics, "handler_errors", errors)
+    monkeypatch.setattr(metrics, "handlers_in_flight", in_flight)
+
+    labels = ("listener", 'Cog."on_message"')
+
+    with metrics.track(*labels):
+        assert in_flight.values[labels] == 1
+
+    with pytest.raises(ValueError):
+        with metrics.track(*labels):
+            raise ValueError
+
+    assert in_flight.values[labels] == 0
+    assert errors.values[labels] == 1
+    assert histogram.values[labels].count == 2
+    assert histogram.quantile(labels, 0.5) == 0.001
+
+    text = registry.render()
+    assert "# TYPE test_seconds histogram" in text
+    assert (
+        'test_seconds_bucket{kind="listener",'
+        'handler="Cog.\\"on_message\\"",le="+Inf"} 2.0'
+    ) in text
+    assert (
+        'test_errors_total{kind="listener",handler="Cog.\\"on_message\\""} '
+        "1.0"
+    ) in text
@@ -0,0 +1,56 @@
+import asyncio
+import sys
+import os
+
+import pytest
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.enums import LoopMode
+from bot.music_queue import MusicQueue
+
+
+def test_music_queue_edits_in_place():
+    queue = MusicQueue(max_size=5)
+    queue.put("a")
+    assert queue.extend("bcdefg") == 4
+    assert list(queue) == ["a", "b", "c", "d", "e"]
+
+    with pytest.raises(asyncio.QueueFull):
+        queue.put("f")
+
+    assert queue.peek() == "a"
+    assert queue[1:3] == ["b", "c"]
+    assert queue.remove(0) == "a"
+    assert queue.move(3, 0) == "e"
+    assert list(queue) == ["e", "b", "c", "d"]
+
+    queue.shuffle()
+    assert sorted(queue) == ["b", "c", "d", "e"]
+
+
+def test_music_queue_loop_modes():
+    async def main():
+        queue = MusicQueue()
+        waiter = asyncio.create_task(queue.next())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        queue.extend(["a", "b"])
+        assert await waiter == "a"
+        assert queue.current == "a"
+
+        queue.loop_mode = LoopMode.TRACK
+        assert await queue.next() == "a"
+        queue.skip()
+        assert await queue.next() == "b"
+
+        queue.loop_mode = LoopMode.QUEUE
+        queue.put("c")
+        assert await queue.next() == "c"
+        assert list(queue) == ["b"]
+        assert await queue.next() == "b"
+        assert list(queue) == ["c"]
+
+    asyncio.run(main())
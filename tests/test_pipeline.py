@@ -0,0 +1,51 @@
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.pipeline import MessageContext, MessagePipeline
+
+
+def test_message_pipeline_runs_stages_in_order_until_stopped():
+    ran: list[str] = []
+
+    async def automod(ctx: MessageContext):
+        ran.append("automod")
+
+        if "spam" in ctx.message.content:
+            ctx.stop()
+
+    async def broken(ctx: MessageContext):
+        ran.append("broken")
+        raise RuntimeError
+
+    async def commands(ctx: MessageContext):
+        ran.append("commands")
+
+    pipeline = MessagePipeline()
+    pipeline.add_stage(40, commands)
+    pipeline.add_stage(10, automod)
+    pipeline.add_stage(20, broken)
+
+    def message(content: str, bot: bool = False):
+        author = SimpleNamespace(bot=bot)
+        return SimpleNamespace(content=content, author=author, guild=None)
+
+    asyncio.run(pipeline.run(message("hello")))
+    assert ran == ["automod", "broken", "commands"]
+
+    ran.clear()
+    asyncio.run(pipeline.run(message("spam")))
+    assert ran == ["automod"]
+
+    ran.clear()
+    asyncio.run(pipeline.run(message("hello", bot=True)))
+    assert ran == []
+
+    ran.clear()
+    pipeline.remove_stage(broken)
+    asyncio.run(pipeline.run(message("hello")))
+    assert ran == ["automod", "commands"]
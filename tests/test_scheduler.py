@@ -0,0 +1,290 @@
+import asyncio
+import sys
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot import db
+from bot.db import models
+from bot.invalidation import LocalBus
+from bot.scheduler import Scheduler
+
+
+class FakeResult(list):
+    def first(self):
+        return self[0] if self else None
+
+
+class FakeSession:
+    """
+    Session that runs queries on an in-memory SQLite database, in place of
+    Postgres.
+    """
+
+    engine = None
+    streams = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        pass
+
+    async def execute(self, q) -> FakeResult:
+        with self.engine.connect() as conn:
+            return FakeResult(conn.execute(q).all())
+
+    async def stream(self, q):
+        FakeSession.streams += 1
+        rows = await self.execute(q)
+
+        async def result():
+            for row in rows:
+                yield row
+
+        return result()
+
+
+@pytest.fixture
+def add_row(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    models.Reminder.__table__.create(engine)
+    models.TempMute.__table__.create(engine)
+    monkeypatch.setattr(FakeSession, "engine", engine)
+    monkeypatch.setattr(FakeSession, "streams", 0)
+    monkeypatch.setattr(db, "async_session", FakeSession)
+
+    def add(model, job_id: str, due: datetime, **columns):
+        row = {"id": job_id, "due": due, "start": due, **columns}
+
+        with engine.begin() as conn:
+            conn.execute(insert(model).values(**row))
+
+    return add
+
+
+def test_scheduler_runs_due_jobs_in_order():
+    ran: list[str] = []
+
+    async def handler(job_id: str):
+        ran.append(job_id)
+
+    async def main():
+        scheduler = Scheduler(timedelta(minutes=1))
+        scheduler.register("test", handler)
+        scheduler.start()
+        scheduler.start()
+
+        now = datetime.now()
+        scheduler.schedule("test", "late", now + timedelta(seconds=0.2))
+        scheduler.schedule("test", "early", now + timedelta(seconds=0.1))
+        scheduler.schedule("test", "early", now + timedelta(seconds=0.1))
+        scheduler.schedule("test", "cancelled", now + timedelta(seconds=0.1))
+        scheduler.cancel("test", "cancelled")
+        scheduler.schedule("test", "overdue", now - timedelta(seconds=1))
+        assert len(scheduler) == 3
+
+        await asyncio.sleep(0.3)
+        scheduler.stop()
+        assert len(scheduler) == 0
+
+    asyncio.run(main())
+    assert ran == ["overdue", "early", "late"]
+
+
+def test_scheduler_rejects_duplicate_handlers():
+    async def handler(job_id: str):
+        pass
+
+    scheduler = Scheduler(timedelta(minutes=1))
+    scheduler.register("test", handler)
+
+    with pytest.raises(ValueError):
+        scheduler.register("test", handler)
+
+
+def test_scheduler_waits_until_ready():
+    ran: list[str] = []
+    ready = asyncio.Event()
+
+    async def handler(job_id: str):
+        ran.append(job_id)
+
+    async def main():
+        scheduler = Scheduler(timedelta(minutes=1))
+        scheduler.register("test", handler)
+        scheduler.start(ready.wait)
+        scheduler.schedule("test", "overdue", datetime.now())
+
+        await asyncio.sleep(0.05)
+        assert ran == []
+
+        ready.set()
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        assert ran == ["overdue"]
+
+    asyncio.run(main())
+
+
+def test_scheduler_retries_failed_jobs():
+    attempts: list[str] = []
+
+    async def handler(job_id: str):
+        attempts.append(job_id)
+
+        if job_id == "broken" or len(attempts) < 3:
+            raise RuntimeError("Discord is down")
+
+    async def main():
+        scheduler = Scheduler(
+            timedelta(minutes=1), retry_delay=0.01, max_attempts=3
+        )
+        scheduler.register("test", handler)
+        scheduler.start()
+        scheduler.schedule("test", "flaky", datetime.now())
+
+        await asyncio.sleep(0.2)
+        assert attempts == ["flaky"] * 3
+
+        attempts.clear()
+        scheduler.schedule("test", "broken", datetime.now())
+
+        await asyncio.sleep(0.2)
+        scheduler.stop()
+        assert attempts == ["broken"] * 3
+        assert len(scheduler) == 0
+
+    asyncio.run(main())
+
+
+def test_scheduler_skips_reloaded_running_jobs():
+    ran: list[str] = []
+    release = asyncio.Event()
+
+    async def handler(job_id: str):
+        ran.append(job_id)
+        await release.wait()
+
+    async def main():
+        scheduler = Scheduler(timedelta(minutes=1))
+        scheduler.register("test", handler)
+        scheduler.start()
+
+        due = datetime.now()
+        scheduler.schedule("test", "slow", due)
+        await asyncio.sleep(0.05)
+
+        # A reload sees the job's row until its handler is done
+        scheduler._push("test", "slow", due)
+        await asyncio.sleep(0.05)
+        assert len(scheduler) == 0
+
+        release.set()
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+
+    asyncio.run(main())
+    assert ran == ["slow"]
+
+
+def test_scheduler_pages_in_persistent_jobs(add_row):
+    ran: list[str] = []
+
+    async def handler(job_id: str):
+        ran.append(job_id)
+
+    now = datetime.now()
+
+    for job_id, due in [
+        ("b", now - timedelta(minutes=2)),
+        ("a", now - timedelta(minutes=2)),
+        ("c", now - timedelta(minutes=1)),
+        ("d", now + timedelta(seconds=0.1)),
+        ("later", now + timedelta(hours=2)),
+    ]:
+        add_row(models.Reminder, job_id, due, user_id=1, message="hi")
+
+    async def main():
+        scheduler = Scheduler(timedelta(minutes=1), page_size=2)
+        scheduler.register("reminder", handler, model=models.Reminder)
+        scheduler.start()
+
+        await asyncio.sleep(0.3)
+        assert ran == ["a", "b", "c", "d"]
+        # Two full pages, then an empty one
+        assert FakeSession.streams == 3
+
+        # Jobs beyond the horizon are left to the next load
+        scheduler.schedule("reminder", "later", now + timedelta(hours=2))
+        assert len(scheduler) == 0
+
+        scheduler.horizon = timedelta(hours=3)
+        await scheduler._extend_horizon()
+        assert len(scheduler) == 1
+        scheduler.stop()
+
+    asyncio.run(main())
+
+
+def test_scheduler_hands_filtered_jobs_to_their_process(add_row):
+    ran: dict[int, list[str]] = {1: [], 2: []}
+    bus_a = LocalBus()
+    bus_b = LocalBus()
+    bus_a.peers.append(bus_b)
+    bus_b.peers.append(bus_a)
+
+    def scheduler_for(guild_id: int, bus: LocalBus) -> Scheduler:
+        async def handler(job_id: str):
+            ran[guild_id].append(job_id)
+
+        scheduler = Scheduler(timedelta(minutes=1), bus=bus)
+        scheduler.register(
+            "temp_mute",
+            handler,
+            model=models.TempMute,
+            where=models.TempMute.guild_id == guild_id,
+        )
+        return scheduler
+
+    def add_mute(job_id: str, guild_id: int) -> datetime:
+        due = datetime.now()
+        add_row(
+            models.TempMute,
+            job_id,
+            due,
+            guild_id=guild_id,
+            channel_id=1,
+            user_id=1,
+            role_id=1,
+        )
+        return due
+
+    async def main():
+        scheduler_a = scheduler_for(1, bus_a)
+        scheduler_b = scheduler_for(2, bus_b)
+        scheduler_a.start()
+        scheduler_b.start()
+        await asyncio.sleep(0.05)
+
+        # Scheduled by the process that doesn't have the guild
+        scheduler_a.schedule("temp_mute", "handed", add_mute("handed", 2))
+        await asyncio.sleep(0.05)
+        assert ran == {1: [], 2: ["handed"]}
+
+        # Missed while the bus was disconnected
+        add_mute("missed", 1)
+        bus_a._deliver_all()
+        await asyncio.sleep(0.05)
+        assert ran == {1: ["missed"], 2: ["handed"]}
+
+        scheduler_a.stop()
+        scheduler_b.stop()
+
+    asyncio.run(main())
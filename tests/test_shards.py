@@ -0,0 +1,36 @@
+import sys
+import os
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot import shards
+from bot.shards import EventRate
+
+
+def test_event_rate_counts_events_in_window():
+    rate = EventRate(window=10)
+
+    for now in (100.1, 100.5, 101.2, 105.0):
+        rate.record(now)
+
+    assert rate.rate(105.5) == 0.4
+    assert rate.rate(110.9) == 0.2
+    assert rate.rate(111.0) == 0.1
+    assert rate.rate(115.0) == 0.0
+    assert rate.total == 4
+
+
+def test_guild_ownership_follows_shards(monkeypatch):
+    from bot.db import models
+
+    # Shard 1 of 2 gets the guilds whose ID has an odd timestamp
+    monkeypatch.setattr(shards, "SHARD_COUNT", 2)
+    monkeypatch.setattr(shards, "SHARD_IDS", [1])
+    assert shards.owns_guild(1 << 22)
+    assert not shards.owns_guild(2 << 22)
+    assert "guild_id >>" in str(shards.guild_filter(models.TempMute.guild_id))
+
+    monkeypatch.setattr(shards, "SHARD_IDS", None)
+    assert shards.owns_guild(2 << 22)
+    assert shards.guild_filter(models.TempMute.guild_id) is None
@@ -0,0 +1,42 @@
+import sys
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.snipes import SnipeStore
+
+
+def fake_message(channel_id: int, content: str):
+    author = SimpleNamespace(id=1, __str__=lambda self: "user")
+    return SimpleNamespace(
+        author=author,
+        channel=SimpleNamespace(id=channel_id),
+        content=content,
+        created_at=datetime.now(),
+        edited_at=None,
+    )
+
+
+def test_snipe_store_ring_buffer():
+    store = SnipeStore(limit=3, max_channels=10, ttl=60)
+
+    for i in range(5):
+        store.record_delete(fake_message(1, f"msg {i}"))
+
+    contents = [m.content for m in store.deleted(1, 3)]
+    assert contents == ["msg 4", "msg 3", "msg 2"]
+    assert len(store.deleted(1, 2)) == 2
+    assert store.deleted(2, 3) == []
+
+
+def test_snipe_store_channel_cap():
+    store = SnipeStore(limit=3, max_channels=2, ttl=60)
+
+    for channel_id in (1, 2, 3):
+        store.record_delete(fake_message(channel_id, "hi"))
+
+    assert store.deleted(1, 1) == []
+    assert len(store.deleted(3, 1)) == 1
@@ -0,0 +1,33 @@
+import sys
+import os
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.spam import MentionSpamDetector
+
+
+def test_mention_spam_window():
+    detector = MentionSpamDetector(window=5, threshold=3)
+
+    assert not detector.hit(1, 10, now=0)
+    assert not detector.hit(1, 10, now=1)
+    assert detector.hit(1, 10, now=2)
+
+    # Same author in another guild is counted separately
+    assert not detector.hit(2, 10, now=2)
+
+    # Oldest hit inside the window is now at t=2
+    assert not detector.hit(1, 10, now=6.5)
+    assert detector.hit(1, 10, now=6.9)
+
+
+def test_mention_spam_sweep():
+    detector = MentionSpamDetector(window=5, threshold=2, sweep_interval=10)
+
+    detector.hit(1, 10, now=0)
+    detector.hit(1, 11, now=8)
+    assert len(detector) == 2
+
+    detector.sweep(now=12)
+    assert len(detector) == 1
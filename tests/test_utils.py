@@ -1,10 +1,11 @@
+import asyncio
 import sys
 import os
 
 path = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, path + "/../")
 
-from bot.utils import get_time
+from bot.utils import get_time, map_in_order
 
 
 def test_get_time():
@@ -19,3 +20,22 @@ def test_get_time():
     assert get_time("h", time2_str) == 17
     assert get_time("m", time2_str) == 32
     assert get_time("s", time2_str) == 46
+
+
+def test_map_in_order():
+    running = peak = 0
+
+    async def search(n: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        # Later items finish first
+        await asyncio.sleep(0.01 * (5 - n % 5))
+        running -= 1
+        return n
+
+    async def main():
+        return [n async for n in map_in_order(search, range(12), 3)]
+
+    assert asyncio.run(main()) == list(range(12))
+    assert peak == 3
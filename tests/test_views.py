@@ -0,0 +1,41 @@
+import asyncio
+import sys
+import os
+
+import discord
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from bot.views import LazyPaginatedEmbedView
+
+
+def test_lazy_paginated_embed_view_builds_shown_page_only():
+    async def main():
+        items = list(range(25))
+        built = []
+
+        def get_page(page: int) -> discord.Embed:
+            built.append(page)
+            return discord.Embed(
+                description=str(items[page * 10 : page * 10 + 10])
+            )
+
+        view = LazyPaginatedEmbedView(
+            0, lambda: -(-len(items) // 10), get_page
+        )
+        assert view.build_page().description == str(list(range(10)))
+        assert view.indicator.label == "1/3"
+
+        # Going back from the first page wraps around to the last one
+        view.current_page = -1
+        view.build_page()
+        assert view.indicator.label == "3/3"
+
+        # Pages follow the data when it shrinks while paging
+        del items[10:]
+        view.build_page()
+        assert view.indicator.label == "1/1"
+        assert built == [0, 2, 0]
+
+    asyncio.run(main())
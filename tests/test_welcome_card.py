@@ -0,0 +1,53 @@
+import asyncio
+import sys
+import os
+from io import BytesIO
+
+path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, path + "/../")
+
+from PIL import Image
+
+from bot import welcome_card
+
+
+def test_render_card():
+    avatar = BytesIO()
+    Image.new("RGB", (128, 128), (255, 0, 0)).save(avatar, format="PNG")
+
+    welcome_card._load_assets()
+    card = welcome_card.render_card(
+        avatar.getvalue(), "member#0001", "A" * 100
+    )
+
+    img = Image.open(BytesIO(card))
+    assert img.format == "JPEG"
+    assert img.size == welcome_card._template.size
+
+
+def test_renderer_caches_cards(monkeypatch):
+    class FakeAsset:
+        key = "avatar-hash"
+        reads = 0
+
+        async def read(self) -> bytes:
+            self.reads += 1
+            return b"avatar"
+
+    monkeypatch.setattr(
+        welcome_card, "render_card", lambda *args: repr(args).encode()
+    )
+    renderer = welcome_card.WelcomeCardRenderer(1, cache_size=2, cache_ttl=60)
+    monkeypatch.setattr(renderer, "_get_executor", lambda: None)
+    avatar = FakeAsset()
+
+    async def render(username: str) -> bytes:
+        card = await renderer.render(avatar, username, "guild")
+        return card.getvalue()
+
+    first = asyncio.run(render("member"))
+    assert asyncio.run(render("member")) == first
+    assert avatar.reads == 1
+
+    assert asyncio.run(render("other member")) != first
+    assert avatar.reads == 2